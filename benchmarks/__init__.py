@@ -0,0 +1,6 @@
+#!/usr/bin/python3
+#
+# Description: Benchmarks for the MyPL implementation. Run the
+# modules in this package from the repository root, for example
+#     python3 -m benchmarks.lexer_tables
+# --------------------------------------------------------
@@ -0,0 +1,57 @@
+#!/usr/bin/python3
+#
+# Description: Size, encode time and decode time of the binary AST
+# encoding against pickle, on generated programs, and the time to
+# read one statement through a MappedProgram against decoding the
+# whole program.
+#     python3 -m benchmarks.ast_codec [size]
+# --------------------------------------------------------
+
+import io
+import os
+import pickle
+import sys
+import tempfile
+
+import mypl_ast_codec as codec
+import mypl_lexer as lexer
+import mypl_parser as parser
+from benchmarks import generator
+from benchmarks import pipeline
+
+
+def main(size=400):
+    source = generator.generate(size, max_depth=6)
+    stmt_list = parser.Parser(lexer.Lexer(io.StringIO(source))).parse()
+    encoders = [('pickle', lambda tree: pickle.dumps(tree, pickle.HIGHEST_PROTOCOL),
+                 pickle.loads),
+                ('codec', codec.encode, codec.decode)]
+    print('%i bytes of source, %i AST nodes' % (len(source), pipeline.count_nodes(stmt_list)))
+    for name, dump, load in encoders:
+        dump_time, data = pipeline.best_time(dump, stmt_list, 3)
+        load_time, _ = pipeline.best_time(load, data, 3)
+        print('%-7s %9i bytes   encode %7.4f s   decode %7.4f s'
+              % (name, len(data), dump_time, load_time))
+    fd, path = tempfile.mkstemp(suffix='.ast')
+    try:
+        with os.fdopen(fd, 'wb') as ast_file:
+            ast_file.write(codec.encode(stmt_list))
+        with codec.MappedProgram(path) as program:
+            middle = len(program) // 2
+            one_time, _ = pipeline.best_time(program.__getitem__, middle, 3)
+            all_time, _ = pipeline.best_time(lambda p: p.stmt_list(), program, 3)
+        print('mmap    statement %i of %i %7.4f s   whole program %7.4f s'
+              % (middle, len(program), one_time, all_time))
+    finally:
+        os.remove(path)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        sys.exit('Usage: %s [size]' % sys.argv[0])
+    # pickle recurses once per nested node
+    sys.setrecursionlimit(20000)
+    if len(sys.argv) == 2:
+        main(int(sys.argv[1]))
+    else:
+        main()
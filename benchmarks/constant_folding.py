@@ -0,0 +1,62 @@
+#!/usr/bin/python3
+#
+# Description: Run time of generated programs on the interpreter and
+# the VM with and without the ConstantFolder, and the time the
+# folding itself takes.
+#     python3 -m benchmarks.constant_folding [size]
+# --------------------------------------------------------
+
+import io
+import sys
+import time
+
+import mypl_interpreter as interpreter
+import mypl_lexer as lexer
+import mypl_optimizer as optimizer
+import mypl_parser as parser
+import mypl_type_checker as type_checker
+import mypl_vm as vm
+from benchmarks import generator
+
+
+def checked(source):
+    stmt_list = parser.Parser(lexer.Lexer(io.StringIO(source))).parse()
+    stmt_list.accept(type_checker.TypeChecker())
+    return stmt_list
+
+
+def run(stmt_list, use_vm):
+    output_stream = io.StringIO()
+    start = time.perf_counter()
+    if use_vm:
+        vm.VM(vm.Compiler().compile(stmt_list), output_stream, io.StringIO()).run()
+    else:
+        interpreter.Interpreter(output_stream, io.StringIO()).run(stmt_list)
+    return time.perf_counter() - start, output_stream.getvalue()
+
+
+def main(size=200):
+    source = generator.generate(size)
+    folder = optimizer.ConstantFolder()
+    folded = checked(source)
+    start = time.perf_counter()
+    folded.accept(folder)
+    fold_time = time.perf_counter() - start
+    print('%i lines: %i operations folded, %i branches pruned in %.4f s'
+          % (source.count('\n'), folder.folded, folder.pruned, fold_time))
+    for name, use_vm in (('interpreter', False), ('vm', True)):
+        plain_time, plain_output = min(run(checked(source), use_vm) for _ in range(3))
+        folded_time, folded_output = min(run(folded, use_vm) for _ in range(3))
+        assert plain_output == folded_output
+        print('%-12s %8.4f s   folded %8.4f s   speedup %5.2fx'
+              % (name, plain_time, folded_time, plain_time / folded_time))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        sys.exit('Usage: %s [size]' % sys.argv[0])
+    sys.setrecursionlimit(20000)
+    if len(sys.argv) == 2:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,59 @@
+#!/usr/bin/python3
+#
+# Description: Type checking time and encoded (cached) AST size of
+# generated programs as parsed against after the DeadCodeEliminator
+# removed their unused functions, structs and variables, and the time
+# the elimination itself takes.
+#     python3 -m benchmarks.dead_code [size]
+# --------------------------------------------------------
+
+import io
+import sys
+
+import mypl_ast_codec as codec
+import mypl_lexer as lexer
+import mypl_optimizer as optimizer
+import mypl_parser as parser
+import mypl_type_checker as type_checker
+from benchmarks import generator
+from benchmarks import pipeline
+
+
+def parsed(source):
+    return parser.Parser(lexer.Lexer(io.StringIO(source))).parse()
+
+
+def pruned(source):
+    stmt_list = parsed(source)
+    optimizer.DeadCodeEliminator().eliminate(stmt_list)
+    return stmt_list
+
+
+def check(stmt_list):
+    stmt_list.accept(type_checker.TypeChecker())
+
+
+def main(size=400):
+    source = generator.generate(size)
+    eliminator = optimizer.DeadCodeEliminator()
+    prune_time, _ = pipeline.best_time(eliminator.eliminate, parsed(source), 1)
+    print('%i lines: %i functions, %i structs, %i variables, %i statements removed'
+          ' in %.4f s' % (source.count('\n'), eliminator.functions, eliminator.structs,
+                          eliminator.variables, eliminator.statements, prune_time))
+    for name, stage in (('parsed', parsed), ('pruned', pruned)):
+        stmt_list = stage(source)
+        nodes = pipeline.count_nodes(stmt_list)
+        encoded = len(codec.encode(stmt_list))
+        check_time, _ = pipeline.best_time(check, stmt_list, 3)
+        print('%-8s %8i nodes %9i bytes   check %7.4f s'
+              % (name, nodes, encoded, check_time))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        sys.exit('Usage: %s [size]' % sys.argv[0])
+    sys.setrecursionlimit(20000)
+    if len(sys.argv) == 2:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,270 @@
+#!/usr/bin/python3
+#
+# Description: A seeded generator of random, type correct MyPL
+# programs with structs, functions, nested ifs and whiles, and
+# long expressions. The same seed and settings always give the
+# same program. Loops count up to small bounds and function bodies
+# only call builtins, so the programs also run (quickly).
+#     python3 -m benchmarks.generator [size [seed]]
+# --------------------------------------------------------
+
+import random
+import sys
+
+
+VALUE_TYPES = ['int', 'float', 'string', 'bool']
+
+
+class Generator(object):
+    """Generates MyPL source text. size is the number of top level
+    declarations and statements, max_depth the nesting depth of
+    if/while blocks and expr_length the most operands in a chain"""
+
+    def __init__(self, seed=0, max_depth=3, expr_length=8):
+        self.rand = random.Random(seed)
+        self.max_depth = max_depth
+        self.expr_length = expr_length
+        self.lines = []
+        self.names = 0
+        self.structs = []       # (name, {field: type})
+        self.functions = []     # (name, [param types], return type)
+        self.scopes = []        # list of {variable: type}
+        self.counters = set()   # loop counters, never assigned to
+
+    def program(self, size):
+        self.scopes.append({})
+        for _ in range(size):
+            choice = self.rand.random()
+            if choice < 0.15 or not self.structs:
+                self.struct_decl()
+            elif choice < 0.45:
+                self.fun_decl()
+            else:
+                self.stmt(0, 0)
+        self.scopes.pop()
+        return '\n'.join(self.lines) + '\n'
+
+    def name(self, prefix):
+        self.names += 1
+        return '%s%i' % (prefix, self.names)
+
+    def emit(self, indent, line):
+        self.lines.append('    ' * indent + line)
+
+    def variables(self, var_type):
+        """Names of the visible variables of the given type"""
+        found = []
+        for scope in self.scopes:
+            found.extend(name for name, t in scope.items() if t == var_type)
+        return found
+
+    def declare(self, indent, name, var_type, expr):
+        if self.rand.random() < 0.5:
+            self.emit(indent, 'var %s: %s = %s;' % (name, var_type, expr))
+        else:
+            self.emit(indent, 'var %s = %s;' % (name, expr))
+        self.scopes[-1][name] = var_type
+
+    # declarations
+
+    def struct_decl(self):
+        name = self.name('S')
+        fields = {}
+        self.emit(0, 'struct %s' % name)
+        for _ in range(self.rand.randint(1, 6)):
+            field = self.name('f')
+            field_type = self.rand.choice(VALUE_TYPES)
+            self.emit(1, 'var %s: %s = %s;' % (field, field_type, self.literal(field_type)))
+            fields[field] = field_type
+        if self.structs and self.rand.random() < 0.5:
+            other = self.rand.choice(self.structs)[0]
+            self.emit(1, 'var %s: %s = nil;' % (self.name('f'), other))
+        self.emit(0, 'end')
+        self.structs.append((name, fields))
+
+    def fun_decl(self):
+        name = self.name('g')
+        return_type = self.rand.choice(VALUE_TYPES)
+        params = {}
+        for _ in range(self.rand.randint(0, 4)):
+            params[self.name('p')] = self.rand.choice(VALUE_TYPES)
+        self.emit(0, 'fun %s %s(%s)' % (return_type, name, ', '.join(
+            '%s: %s' % (param, param_type) for param, param_type in params.items())))
+        # functions only see their own parameters and locals, and call
+        # no other functions (nested calls would multiply the run time)
+        saved_scopes, saved_functions = self.scopes, self.functions
+        self.scopes, self.functions = [dict(params)], []
+        for _ in range(self.rand.randint(1, 6)):
+            self.stmt(1, 1)
+        self.emit(1, 'return %s;' % self.expr(return_type))
+        self.scopes, self.functions = saved_scopes, saved_functions
+        self.emit(0, 'end')
+        self.functions.append((name, list(params.values()), return_type))
+
+    # statements
+
+    def stmt(self, indent, depth):
+        choice = self.rand.random()
+        nested = depth < self.max_depth
+        if choice < 0.3:
+            var_type = self.rand.choice(VALUE_TYPES)
+            self.declare(indent, self.name('v'), var_type, self.expr(var_type))
+        elif choice < 0.4:
+            struct_name = self.rand.choice(self.structs)[0]
+            self.declare(indent, self.name('v'), struct_name, 'new %s' % struct_name)
+        elif choice < 0.6:
+            self.assign_stmt(indent)
+        elif choice < 0.72 and nested:
+            self.if_stmt(indent, depth)
+        elif choice < 0.82 and nested:
+            self.while_stmt(indent, depth)
+        else:
+            self.emit(indent, 'print(%s);' % self.expr('string'))
+
+    def assign_stmt(self, indent):
+        var_type = self.rand.choice(VALUE_TYPES)
+        targets = [name for name in self.variables(var_type) if name not in self.counters]
+        targets += self.fields(var_type)
+        if not targets:
+            self.emit(indent, 'print(%s);' % self.expr('string'))
+            return
+        # keep values from growing without bound when loops repeat the
+        # assignment: ints are taken mod 1000, strings read no variables
+        if var_type == 'int':
+            rhs = '(%s) %% 1000' % self.expr(var_type)
+        else:
+            rhs = self.expr(var_type, plain=(var_type == 'string'))
+        self.emit(indent, 'set %s = %s;' % (self.rand.choice(targets), rhs))
+
+    def block(self, indent, depth):
+        self.scopes.append({})
+        for _ in range(self.rand.randint(1, 4)):
+            self.stmt(indent, depth)
+        self.scopes.pop()
+
+    def if_stmt(self, indent, depth):
+        self.emit(indent, 'if %s then' % self.bool_expr())
+        self.block(indent + 1, depth + 1)
+        for _ in range(self.rand.randint(0, 2)):
+            self.emit(indent, 'elif %s then' % self.bool_expr())
+            self.block(indent + 1, depth + 1)
+        if self.rand.random() < 0.5:
+            self.emit(indent, 'else')
+            self.block(indent + 1, depth + 1)
+        self.emit(indent, 'end')
+
+    def while_stmt(self, indent, depth):
+        counter = self.name('i')
+        self.emit(indent, 'var %s = 0;' % counter)
+        self.scopes[-1][counter] = 'int'
+        self.counters.add(counter)
+        self.emit(indent, 'while %s < %i and %s do'
+                  % (counter, self.rand.randint(1, 4), self.bool_expr()))
+        self.block(indent + 1, depth + 1)
+        self.emit(indent + 1, 'set %s = %s + 1;' % (counter, counter))
+        self.emit(indent, 'end')
+
+    # expressions
+
+    def fields(self, var_type):
+        """Paths to the visible struct fields of the given type"""
+        paths = []
+        for scope in self.scopes:
+            for name, struct_name in scope.items():
+                for struct in self.structs:
+                    if struct[0] == struct_name:
+                        paths.extend('%s.%s' % (name, field)
+                                     for field, t in struct[1].items() if t == var_type)
+        return paths
+
+    def literal(self, var_type):
+        if var_type == 'int':
+            return str(self.rand.randint(0, 1000))
+        if var_type == 'float':
+            return '%i.%i' % (self.rand.randint(0, 100), self.rand.randint(0, 99))
+        if var_type == 'string':
+            return '"%s"' % self.name('s')
+        return self.rand.choice(['true', 'false'])
+
+    def operand(self, var_type, nesting, plain=False):
+        choice = self.rand.random()
+        if choice < 0.3:
+            return self.literal(var_type)
+        if choice < 0.6:
+            if plain:
+                return self.literal(var_type)
+            names = self.variables(var_type) + self.fields(var_type)
+            if names:
+                return self.rand.choice(names)
+        elif choice < 0.75:
+            calls = [fun for fun in self.functions if fun[2] == var_type]
+            if calls and nesting < 3:
+                name, param_types, _ = self.rand.choice(calls)
+                return '%s(%s)' % (name, ', '.join(
+                    self.expr(t, nesting + 1, 2, plain) for t in param_types))
+        elif choice < 0.85 and nesting < 3:
+            if var_type == 'int':
+                return 'length(%s)' % self.expr('string', nesting + 1, 2, plain)
+            if var_type == 'float':
+                return 'itof(%s)' % self.expr('int', nesting + 1, 2, plain)
+            if var_type == 'string':
+                return 'itos(%s)' % self.expr('int', nesting + 1, 2, plain)
+        elif var_type != 'bool' and nesting < 3:
+            return '(%s)' % self.expr(var_type, nesting + 1, None, plain)
+        return self.literal(var_type)
+
+    def expr(self, var_type, nesting=0, length=None, plain=False):
+        """A chain of operands of the given type. A plain expression
+        reads no variables"""
+        if length is None:
+            length = self.expr_length
+        operands = [self.operand(var_type, nesting, plain)]
+        if var_type == 'bool':
+            return operands[0]
+        for _ in range(self.rand.randint(0, max(length - 1, 0))):
+            if var_type == 'string':
+                operator = '+'
+            elif var_type == 'int':
+                operator = self.rand.choice(['+', '-', '*', '/', '%'])
+            else:
+                operator = self.rand.choice(['+', '-', '*', '/'])
+            if operator in ('/', '%'):
+                # chains nest to the right, so the divisor is everything
+                # after the operator: end the chain with a non-zero literal
+                operands.append(operator)
+                operands.append(str(self.rand.randint(1, 9)))
+                if var_type == 'float':
+                    operands[-1] += '.5'
+                break
+            operands.append(operator)
+            operands.append(self.operand(var_type, nesting, plain))
+        return ' '.join(operands)
+
+    def bool_expr(self):
+        terms = []
+        for _ in range(self.rand.randint(1, 3)):
+            var_type = self.rand.choice(VALUE_TYPES)
+            if var_type == 'bool':
+                term = self.operand('bool', 2)
+            else:
+                operator = self.rand.choice(['==', '!=', '<', '<=', '>', '>='])
+                # a '(' at the start would be read as a nested condition
+                term = '%s %s %s' % (self.expr(var_type, 3, 3), operator,
+                                     self.expr(var_type, 2, 3))
+            if self.rand.random() < 0.2:
+                term = 'not (%s)' % term
+            terms.append(term)
+        return (' %s ' % self.rand.choice(['and', 'or'])).join(terms)
+
+
+def generate(size, seed=0, max_depth=3, expr_length=8):
+    """Source text of a random program with size top level parts"""
+    return Generator(seed, max_depth, expr_length).program(size)
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 3:
+        sys.exit('Usage: %s [size [seed]]' % sys.argv[0])
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    seed = int(sys.argv[2]) if len(sys.argv) > 2 else 0
+    sys.stdout.write(generate(size, seed))
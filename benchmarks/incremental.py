@@ -0,0 +1,82 @@
+#!/usr/bin/python3
+#
+# Description: Time of an edit through mypl_incremental.Document
+# against a full lex and parse of the edited source, and of a type
+# check with an IncrementalChecker against a full TypeChecker run,
+# on a large generated program. The edits change an int literal,
+# insert a line and delete it again at points spread over the file.
+#     python3 -m benchmarks.incremental [size]
+# --------------------------------------------------------
+
+import io
+import re
+import sys
+import time
+
+import mypl_incremental as incremental
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_type_checker as type_checker
+from benchmarks import generator
+
+
+def edits(source, count=20):
+    """(start, end, text) edits spread over source; applied in order
+    they leave the source as it was"""
+    result = []
+    literals = [match.start() for match in re.finditer(r'\b[1-9][0-9]*\b', source)]
+    step = max(len(literals) // count, 1)
+    for offset in literals[::step][:count]:
+        line_start = source.rfind('\n', 0, offset) + 1
+        result.append((offset, offset + 1, '7'))
+        result.append((offset, offset + 1, source[offset]))
+        result.append((line_start, line_start, 'var inserted = 1;\n'))
+        result.append((line_start, line_start + len('var inserted = 1;\n'), ''))
+    return result
+
+
+def main(size=800):
+    source = generator.generate(size, max_depth=6)
+    document = incremental.Document(source)
+    checker = incremental.IncrementalChecker()
+    checker.check(document.stmt_list)
+    changes = edits(source)
+    edit_time = 0
+    check_time = 0
+    checked = 0
+    for change in changes:
+        start = time.perf_counter()
+        document.edit(*change)
+        middle = time.perf_counter()
+        checker.check(document.stmt_list)
+        edit_time += middle - start
+        check_time += time.perf_counter() - middle
+        checked += checker.checked
+    start = time.perf_counter()
+    for _ in range(3):
+        stmt_list = parser.Parser(lexer.Lexer(io.StringIO(document.source))).parse()
+    parse_time = (time.perf_counter() - start) / 3
+    start = time.perf_counter()
+    for _ in range(3):
+        stmt_list.accept(type_checker.TypeChecker())
+    full_check_time = (time.perf_counter() - start) / 3
+    edit_time /= len(changes)
+    check_time /= len(changes)
+    print('%i lines, %i tokens, %i top level statements'
+          % (source.count('\n'), len(document.tokens), len(document.stmts)))
+    print('full parse %8.4f s   incremental edit  %8.5f s   speedup %6.1fx'
+          % (parse_time, edit_time, parse_time / edit_time))
+    print('full check %8.4f s   incremental check %8.5f s   speedup %6.1fx'
+          ' (%.1f statements checked per edit)'
+          % (full_check_time, check_time, full_check_time / check_time,
+             checked / len(changes)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        sys.exit('Usage: %s [size]' % sys.argv[0])
+    sys.setrecursionlimit(20000)
+    if len(sys.argv) == 2:
+        main(int(sys.argv[1]))
+    else:
+        main()
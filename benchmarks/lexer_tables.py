@@ -0,0 +1,179 @@
+#!/usr/bin/python3
+#
+# Description: Micro-benchmark comparing the old if/elif token
+# classification chain with the table lookup used by the lexer,
+# measured on a large keyword-heavy MyPL source.
+#     python3 -m benchmarks.lexer_tables [lines]
+# --------------------------------------------------------
+
+import io
+import sys
+import time
+
+import mypl_lexer as lexer
+import mypl_token as token
+
+
+KEYWORD_LINES = [
+    'fun int f(a: int, b: bool)',
+    '    var x: int = 0;',
+    '    while not b and x < a or x >= 10 do',
+    '        if x == 1 then set x = x + 1; elif x != 2 then set x = x - 1;',
+    '        else set x = x * 2 / 3 % 4; end',
+    '    end',
+    '    var s: string = "keyword heavy";',
+    '    var f: float = 1.5;',
+    '    var n = new Node;',
+    '    var t = true; var u = false; var v = nil;',
+    '    return x;',
+    'end',
+]
+
+
+def keyword_source(lines):
+    """Build a source text of (about) the given number of lines"""
+    block = '\n'.join(KEYWORD_LINES) + '\n'
+    return block * max(1, lines // len(KEYWORD_LINES))
+
+
+def chain_type(item, tokentype):
+    """The classification chain the lexer used before the tables"""
+    if item == "=":
+        tokentype = token.ASSIGN
+    elif item == ",":
+        tokentype = token.COMMA
+    elif item == ":":
+        tokentype = token.COLON
+    elif item == "/":
+        tokentype = token.DIVIDE
+    elif item == ".":
+        tokentype = token.DOT
+    elif item == "==":
+        tokentype = token.EQUAL
+    elif item == ">":
+        tokentype = token.GREATER_THAN
+    elif item == ">=":
+        tokentype = token.GREATER_THAN_EQUAL
+    elif item == "<":
+        tokentype = token.LESS_THAN
+    elif item == "<=":
+        tokentype = token.LESS_THAN_EQUAL
+    elif item == "!=":
+        tokentype = token.NOT_EQUAL
+    elif item == "(":
+        tokentype = token.LPAREN
+    elif item == ")":
+        tokentype = token.RPAREN
+    elif item == "-":
+        tokentype = token.MINUS
+    elif item == "%":
+        tokentype = token.MODULO
+    elif item == "*":
+        tokentype = token.MULTIPLY
+    elif item == "+":
+        tokentype = token.PLUS
+    elif item == "true" or item == "false":
+        tokentype = token.BOOLVAL
+    elif item == ";":
+        tokentype = token.SEMICOLON
+    elif item == "bool":
+        tokentype = token.BOOLTYPE
+    elif item == "int":
+        tokentype = token.INTTYPE
+    elif item == "float":
+        tokentype = token.FLOATTYPE
+    elif item == "string":
+        tokentype = token.STRINGTYPE
+    elif item == "struct":
+        tokentype = token.STRUCTTYPE
+    elif item == "and":
+        tokentype = token.AND
+    elif item == "or":
+        tokentype = token.OR
+    elif item == "not":
+        tokentype = token.NOT
+    elif item == "while":
+        tokentype = token.WHILE
+    elif item == "do":
+        tokentype = token.DO
+    elif item == "if":
+        tokentype = token.IF
+    elif item == "then":
+        tokentype = token.THEN
+    elif item == "else":
+        tokentype = token.ELSE
+    elif item == "elif":
+        tokentype = token.ELIF
+    elif item == "end":
+        tokentype = token.END
+    elif item == "fun":
+        tokentype = token.FUN
+    elif item == "var":
+        tokentype = token.VAR
+    elif item == "set":
+        tokentype = token.SET
+    elif item == "return":
+        tokentype = token.RETURN
+    elif item == "new":
+        tokentype = token.NEW
+    elif item == "nil":
+        tokentype = token.NIL
+    return tokentype
+
+
+def table_type(item, tokentype):
+    """The classification the lexer uses now"""
+    return lexer.TOKEN_TYPES.get(item, tokentype)
+
+
+def lex_all(source):
+    """Lex the source and return the list of tokens (without EOS)"""
+    the_lexer = lexer.Lexer(io.StringIO(source))
+    tokens = []
+    the_token = the_lexer.next_token()
+    while the_token.tokentype != token.EOS:
+        tokens.append(the_token)
+        the_token = the_lexer.next_token()
+    return tokens
+
+
+def time_classifier(classify, lexemes, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for item in lexemes:
+            classify(item, token.ID)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main(lines=20000, repeat=5):
+    source = keyword_source(lines)
+    start = time.perf_counter()
+    tokens = lex_all(source)
+    lex_time = time.perf_counter() - start
+    lexemes = [t.lexeme for t in tokens if t.tokentype != token.STRINGVAL]
+
+    # both classifiers have to agree before the timings mean anything
+    for item in lexemes:
+        if chain_type(item, token.ID) != table_type(item, token.ID):
+            sys.exit('classifiers disagree on %r' % item)
+
+    chain_time = time_classifier(chain_type, lexemes, repeat)
+    table_time = time_classifier(table_type, lexemes, repeat)
+    print('source: %i lines, %i tokens' % (source.count('\n'), len(tokens)))
+    print('lexer:           %12.0f tokens/s' % (len(tokens) / lex_time))
+    print('if/elif chain:   %12.0f tokens/s' % (len(lexemes) / chain_time))
+    print('table lookup:    %12.0f tokens/s' % (len(lexemes) / table_time))
+    print('speedup:         %12.2fx' % (chain_time / table_time))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        sys.exit('Usage: %s [lines]' % sys.argv[0])
+    if len(sys.argv) == 2:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,85 @@
+#!/usr/bin/python3
+#
+# Description: Peak memory (tracemalloc) of lexing and parsing a
+# large corpus of programs with the __slots__ token and AST
+# classes, compared to the same classes rebuilt with a
+# per-instance __dict__.
+#     python3 -m benchmarks.memory [files]
+# --------------------------------------------------------
+
+import gc
+import io
+import sys
+import tracemalloc
+
+import mypl_ast as ast
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_token as token
+from benchmarks import lexer_tables
+
+
+def dict_class(cls):
+    """Copy of a slotted class whose instances carry a __dict__"""
+    namespace = {}
+    for name, value in cls.__dict__.items():
+        if name in ('__slots__', '__dict__', '__weakref__'):
+            continue
+        if name in getattr(cls, '__slots__', ()):
+            continue
+        namespace[name] = value
+    return type(cls.__name__, (object,), namespace)
+
+
+def slotted_classes():
+    classes = [(token, 'Token')]
+    for name, value in vars(ast).items():
+        if isinstance(value, type) and '__slots__' in value.__dict__:
+            classes.append((ast, name))
+    return classes
+
+
+def peak_parse(corpus):
+    """Peak traced memory while parsing every program in the corpus
+    (all of the resulting ASTs are kept alive)"""
+    gc.collect()
+    tracemalloc.start()
+    programs = []
+    for source in corpus:
+        the_parser = parser.Parser(lexer.Lexer(io.StringIO(source)))
+        programs.append(the_parser.parse())
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del programs
+    return peak
+
+
+def main(files=500, lines=120):
+    corpus = [lexer_tables.keyword_source(lines)] * files
+    slotted = peak_parse(corpus)
+
+    # swap in __dict__ versions of every class, then put the originals back
+    originals = slotted_classes()
+    saved = [(module, name, getattr(module, name)) for module, name in originals]
+    try:
+        for module, name, cls in saved:
+            setattr(module, name, dict_class(cls))
+        with_dict = peak_parse(corpus)
+    finally:
+        for module, name, cls in saved:
+            setattr(module, name, cls)
+
+    size = sum(len(source) for source in corpus)
+    print('corpus: %i files, %.1f MB' % (files, size / 1000000.0))
+    print('__dict__ classes: %8.1f MB peak' % (with_dict / 1000000.0))
+    print('__slots__ classes:%8.1f MB peak' % (slotted / 1000000.0))
+    print('reduction:        %8.1f %%' % (100.0 * (with_dict - slotted) / with_dict))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        sys.exit('Usage: %s [files]' % sys.argv[0])
+    if len(sys.argv) == 2:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,165 @@
+#!/usr/bin/python3
+#
+# Description: Times the lexer, the parser and the type checker
+# separately on generated programs of growing size, and reports
+# tokens/s, AST nodes/s and the peak memory of every stage. The
+# rows for the different sizes form the scaling curve; --json
+# writes them out so runs on two commits can be compared.
+#     python3 -m benchmarks.pipeline [--json FILE] [--seed N]
+#                                    [--repeat N] [size ...]
+# --------------------------------------------------------
+
+import argparse
+import gc
+import io
+import json
+import platform
+import sys
+import time
+import tracemalloc
+
+import mypl_ast as ast
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_token as token
+import mypl_token_buffer as token_buffer
+import mypl_type_checker as type_checker
+from benchmarks import generator
+
+
+SIZES = [50, 100, 200, 400, 800]
+
+
+def count_nodes(root):
+    """Number of AST nodes reachable from root"""
+    count = 0
+    work = [root]
+    while work:
+        node = work.pop()
+        if isinstance(node, list):
+            work.extend(node)
+        elif isinstance(node, ast.ASTNode):
+            count += 1
+            for cls in type(node).__mro__:
+                for name in cls.__dict__.get('__slots__', ()):
+                    work.append(getattr(node, name, None))
+    return count
+
+
+def lex(source):
+    the_lexer = lexer.Lexer(io.StringIO(source))
+    tokens = [the_lexer.next_token()]
+    while tokens[-1].tokentype != token.EOS:
+        tokens.append(the_lexer.next_token())
+    return tokens
+
+
+def parse(tokens):
+    return parser.Parser(token_buffer.TokenArray(tokens)).parse()
+
+
+def check(stmt_list):
+    stmt_list.accept(type_checker.TypeChecker())
+
+
+def best_time(stage, argument, repeat):
+    """Fastest of repeat runs of stage(argument), and its result"""
+    best = None
+    for _ in range(repeat):
+        gc.collect()
+        start = time.perf_counter()
+        result = stage(argument)
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best, result
+
+
+def peak_memory(stage, argument):
+    """Peak traced memory (bytes) while running stage(argument)"""
+    gc.collect()
+    tracemalloc.start()
+    result = stage(argument)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    del result
+    return peak
+
+
+def measure(size, seed=0, repeat=3):
+    source = generator.generate(size, seed)
+    lex_time, tokens = best_time(lex, source, repeat)
+    parse_time, stmt_list = best_time(parse, tokens, repeat)
+    check_time, _ = best_time(check, stmt_list, repeat)
+    nodes = count_nodes(stmt_list)
+    return {
+        'size': size,
+        'bytes': len(source),
+        'tokens': len(tokens),
+        'nodes': nodes,
+        'lex_seconds': lex_time,
+        'parse_seconds': parse_time,
+        'check_seconds': check_time,
+        'lex_tokens_per_second': len(tokens) / lex_time,
+        'parse_nodes_per_second': nodes / parse_time,
+        'check_nodes_per_second': nodes / check_time,
+        'lex_peak_bytes': peak_memory(lex, source),
+        'parse_peak_bytes': peak_memory(parse, tokens),
+        'check_peak_bytes': peak_memory(check, stmt_list),
+    }
+
+
+def report(results):
+    print('%6s %8s %8s %12s %12s %12s %9s %9s %9s'
+          % ('size', 'tokens', 'nodes', 'lex tok/s', 'parse node/s',
+             'check node/s', 'lex MB', 'parse MB', 'check MB'))
+    for row in results:
+        print('%6i %8i %8i %12.0f %12.0f %12.0f %9.2f %9.2f %9.2f'
+              % (row['size'], row['tokens'], row['nodes'],
+                 row['lex_tokens_per_second'], row['parse_nodes_per_second'],
+                 row['check_nodes_per_second'], row['lex_peak_bytes'] / 1e6,
+                 row['parse_peak_bytes'] / 1e6, row['check_peak_bytes'] / 1e6))
+    # time per token/node relative to the smallest size; flat means linear
+    first = results[0]
+    print('scaling (time per unit relative to size %i):' % first['size'])
+    for row in results:
+        print('%6i   lex %5.2f   parse %5.2f   check %5.2f'
+              % (row['size'],
+                 first['lex_tokens_per_second'] / row['lex_tokens_per_second'],
+                 first['parse_nodes_per_second'] / row['parse_nodes_per_second'],
+                 first['check_nodes_per_second'] / row['check_nodes_per_second']))
+
+
+def main(sizes=SIZES, seed=0, repeat=3, json_file=None):
+    results = [measure(size, seed, repeat) for size in sizes]
+    if json_file is None:
+        report(results)
+        return results
+    document = {
+        'python': platform.python_version(),
+        'seed': seed,
+        'repeat': repeat,
+        'results': results,
+    }
+    if json_file == '-':
+        json.dump(document, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        with open(json_file, 'w') as file_stream:
+            json.dump(document, file_stream, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        description='time the lexer, parser and type checker')
+    arg_parser.add_argument('sizes', nargs='*', type=int, default=SIZES,
+                            help='top level parts of the generated programs')
+    arg_parser.add_argument('--seed', type=int, default=0)
+    arg_parser.add_argument('--repeat', type=int, default=3,
+                            help='runs per stage (the fastest is kept)')
+    arg_parser.add_argument('--json', metavar='FILE', dest='json_file',
+                            help="write the results as JSON ('-' for stdout)")
+    args = arg_parser.parse_args()
+    sys.setrecursionlimit(10000)
+    main(args.sizes, args.seed, args.repeat, args.json_file)
@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+#
+# Description: Throughput of the two lexer backends on a large
+# generated source. The RegexLexer is also timed with the cyclic
+# garbage collector paused by the caller: tokens hold no cycles, so
+# a program lexing a big input at once may choose to do that.
+#     python3 -m benchmarks.regex_lexer [megabytes]
+# --------------------------------------------------------
+
+import gc
+import io
+import sys
+import time
+
+import mypl_lexer as lexer
+import mypl_regex_lexer as regex_lexer
+import mypl_token as token
+from benchmarks import lexer_tables
+
+
+def time_backend(lexer_backend, source, collect=True):
+    if not collect:
+        gc.disable()
+    try:
+        start = time.perf_counter()
+        the_lexer = lexer_backend(io.StringIO(source))
+        count = 1
+        while the_lexer.next_token().tokentype != token.EOS:
+            count += 1
+        return count, time.perf_counter() - start
+    finally:
+        gc.enable()
+
+
+def main(megabytes=2.0):
+    block = lexer_tables.keyword_source(len(lexer_tables.KEYWORD_LINES))
+    source = block * max(1, int(megabytes * 1000000 / len(block)))
+    print('source: %.1f MB' % (len(source) / 1000000.0))
+    for name, backend, collect in [('RegexLexer', regex_lexer.RegexLexer, True),
+                                   ('  gc paused', regex_lexer.RegexLexer, False),
+                                   ('Lexer', lexer.Lexer, True)]:
+        count, elapsed = time_backend(backend, source, collect)
+        print('%-12s %9i tokens %8.3f s %12.0f tokens/s %7.3f s/MB'
+              % (name, count, elapsed, count / elapsed,
+                 elapsed * 1000000.0 / len(source)))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        sys.exit('Usage: %s [megabytes]' % sys.argv[0])
+    if len(sys.argv) == 2:
+        main(float(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,66 @@
+#!/usr/bin/python3
+#
+# Description: Peak memory (tracemalloc) of type checking generated
+# programs of growing size, parsed as a whole with Parser.parse()
+# against streamed one top level statement at a time through
+# TypeChecker.check_stream(Parser.stream()).
+#     python3 -m benchmarks.streaming [size]
+# --------------------------------------------------------
+
+import gc
+import io
+import sys
+import time
+import tracemalloc
+
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_type_checker as type_checker
+from benchmarks import generator
+
+
+def whole(source_stream):
+    the_parser = parser.Parser(lexer.Lexer(source_stream, 1 << 16))
+    stmt_list = the_parser.parse()
+    stmt_list.accept(type_checker.TypeChecker())
+
+
+def streamed(source_stream):
+    the_parser = parser.Parser(lexer.Lexer(source_stream, 1 << 16))
+    for stmt in type_checker.TypeChecker().check_stream(the_parser.stream()):
+        pass
+
+
+def peak(check, source):
+    """Peak traced memory and time of checking source (the source
+    text itself is not counted, as for a file read from disk)"""
+    source_stream = io.StringIO(source)
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    check(source_stream)
+    seconds = time.perf_counter() - start
+    result = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, seconds
+
+
+def main(size=800):
+    print('%8s %8s   %-22s %-22s' % ('parts', 'lines', 'parse + check', 'streamed'))
+    for parts in (size // 8, size // 4, size // 2, size):
+        source = generator.generate(parts)
+        whole_peak, whole_seconds = peak(whole, source)
+        stream_peak, stream_seconds = peak(streamed, source)
+        print('%8i %8i   %7.1f MB %8.3f s   %7.1f MB %8.3f s'
+              % (parts, source.count('\n'), whole_peak / 1000000.0, whole_seconds,
+                 stream_peak / 1000000.0, stream_seconds))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        sys.exit('Usage: %s [size]' % sys.argv[0])
+    sys.setrecursionlimit(20000)
+    if len(sys.argv) == 2:
+        main(int(sys.argv[1]))
+    else:
+        main()
@@ -0,0 +1,72 @@
+#!/usr/bin/python3
+#
+# Description: Type checking time with the scope stack SymbolTable
+# and with the FlatSymbolTable, on deeply nested code (where every
+# lookup of a global walks the whole scope stack in SymbolTable)
+# and on ordinary generated programs.
+#     python3 -m benchmarks.symbol_table [depth]
+# --------------------------------------------------------
+
+import io
+import sys
+import time
+
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_symbol_table as symbol_table
+import mypl_type_checker as type_checker
+from benchmarks import generator
+
+
+def nested_source(depth, globals_count=20, repeat=4):
+    """Globals, then depth nested if/while blocks that each declare a
+    local and read globals and outer locals"""
+    lines = ['var g%i = %i;' % (i, i) for i in range(globals_count)]
+    for level in range(depth):
+        indent = '    ' * level
+        outer = 'x%i' % (level - 1) if level else 'g0'
+        if level % 2:
+            lines.append(indent + 'while %s < %i do' % (outer, level))
+        else:
+            lines.append(indent + 'if %s >= g%i then' % (outer, level % globals_count))
+        lines.append(indent + '    var x%i = %s + g%i;' % (level, outer, level % globals_count))
+        for i in range(repeat):
+            lines.append(indent + '    set g%i = x%i * g%i + %s;' % (
+                (level + i) % globals_count, level,
+                (level + 2 * i) % globals_count, outer))
+    for level in range(depth - 1, -1, -1):
+        lines.append('    ' * level + 'end')
+    return '\n'.join(lines) + '\n'
+
+
+def time_check(stmt_list, table_class, repeat=3):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        stmt_list.accept(type_checker.TypeChecker(table_class()))
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+
+def main(depth=200):
+    workloads = [('nested depth %i' % depth, nested_source(depth)),
+                 ('generated', generator.generate(400, max_depth=6))]
+    for name, source in workloads:
+        stmt_list = parser.Parser(lexer.Lexer(io.StringIO(source))).parse()
+        stack_time = time_check(stmt_list, symbol_table.SymbolTable)
+        flat_time = time_check(stmt_list, symbol_table.FlatSymbolTable)
+        print('%-18s SymbolTable %8.3f s   FlatSymbolTable %8.3f s   speedup %5.2fx'
+              % (name, stack_time, flat_time, stack_time / flat_time))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        sys.exit('Usage: %s [depth]' % sys.argv[0])
+    # the parser and the type checker recurse once per nested block
+    sys.setrecursionlimit(20000)
+    if len(sys.argv) == 2:
+        main(int(sys.argv[1]))
+    else:
+        main()
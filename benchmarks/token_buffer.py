@@ -0,0 +1,54 @@
+#!/usr/bin/python3
+#
+# Description: Time to parse a program straight from the lexer,
+# through a TokenBuffer / ThreadedTokenBuffer, and again and again
+# from a cached pre-lexed token array.
+#     python3 -m benchmarks.token_buffer [repeat]
+# --------------------------------------------------------
+
+import io
+import sys
+import time
+
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_token_buffer as token_buffer
+from benchmarks import lexer_tables
+
+
+def time_parses(parse, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        parse()
+    return time.perf_counter() - start
+
+
+def parse_threaded(source):
+    with token_buffer.ThreadedTokenBuffer(lexer.Lexer(io.StringIO(source))) as buffer:
+        return parser.Parser(buffer).parse()
+
+
+def main(repeat=10, lines=2400):
+    source = lexer_tables.keyword_source(lines)
+    tokens, lex_error = token_buffer.lex_all(lexer.Lexer(io.StringIO(source)))
+    runs = [
+        ('Lexer', lambda: parser.Parser(lexer.Lexer(io.StringIO(source))).parse()),
+        ('TokenBuffer', lambda: parser.Parser(token_buffer.TokenBuffer(
+            lexer.Lexer(io.StringIO(source)))).parse()),
+        ('ThreadedTokenBuffer', lambda: parse_threaded(source)),
+        ('cached TokenArray', lambda: parser.Parser(
+            token_buffer.TokenArray(tokens, lex_error)).parse()),
+    ]
+    print('%i parses of %i tokens' % (repeat, len(tokens)))
+    for name, parse in runs:
+        elapsed = time_parses(parse, repeat)
+        print('%-20s %8.3f s' % (name, elapsed))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        sys.exit('Usage: %s [repeat]' % sys.argv[0])
+    if len(sys.argv) == 2:
+        main(int(sys.argv[1]))
+    else:
+        main()
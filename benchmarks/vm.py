@@ -0,0 +1,88 @@
+#!/usr/bin/python3
+#
+# Description: Run time of the tree-walking interpreter and of the
+# bytecode VM on a loop heavy and a call heavy program.
+#     python3 -m benchmarks.vm [scale]
+# --------------------------------------------------------
+
+import io
+import sys
+import time
+
+import mypl_interpreter as interpreter
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_type_checker as type_checker
+import mypl_vm as vm
+
+
+LOOP_SOURCE = '''
+var total = 0;
+var i = 0;
+while i < %i do
+    var j = i %% 7;
+    if j == 3 or j == 5 then
+        set total = total + j * 2;
+    else
+        set total = total - 1;
+    end
+    set i = i + 1;
+end
+println(itos(total));
+'''
+
+CALL_SOURCE = '''
+fun int fib(n: int)
+    if n < 2 then
+        return n;
+    end
+    return fib(n - 1) + fib(n - 2);
+end
+println(itos(fib(%i)));
+'''
+
+
+def checked(source):
+    stmt_list = parser.Parser(lexer.Lexer(io.StringIO(source))).parse()
+    stmt_list.accept(type_checker.TypeChecker())
+    return stmt_list
+
+
+def time_interpreter(source):
+    stmt_list = checked(source)
+    output = io.StringIO()
+    start = time.perf_counter()
+    interpreter.Interpreter(output).run(stmt_list)
+    return output.getvalue(), time.perf_counter() - start
+
+
+def time_vm(source):
+    stmt_list = checked(source)
+    output = io.StringIO()
+    start = time.perf_counter()
+    program = vm.Compiler().compile(stmt_list)
+    vm.VM(program, output).run()
+    return output.getvalue(), time.perf_counter() - start
+
+
+def main(scale=1.0):
+    workloads = [('loop', LOOP_SOURCE % int(200000 * scale)),
+                 ('fib', CALL_SOURCE % (20 + int(scale).bit_length()))]
+    for name, source in workloads:
+        expected, interpreter_time = time_interpreter(source)
+        output, vm_time = time_vm(source)
+        if output != expected:
+            sys.exit('%s: VM printed %r, interpreter %r' % (name, output, expected))
+        print('%-5s interpreter %8.3f s   vm %8.3f s   speedup %5.2fx'
+              % (name, interpreter_time, vm_time, interpreter_time / vm_time))
+
+
+if __name__ == '__main__':
+    if len(sys.argv) > 2:
+        sys.exit('Usage: %s [scale]' % sys.argv[0])
+    # the interpreter recurses once per MyPL call
+    sys.setrecursionlimit(10000)
+    if len(sys.argv) == 2:
+        main(float(sys.argv[1]))
+    else:
+        main()
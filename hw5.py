@@ -2,6 +2,10 @@
 #  Author:
 #  Assignment: 5
 #  Description: Simple script to execute the MyPL type checker.
+#  With --all the parser recovers from syntax errors and the type
+#  checker goes on past type errors, so every error is reported.
+#  With --profile the time of each stage, token, AST node, visit and
+#  symbol table lookup counts are written to stdout as JSON.
 # ----------------------------------------------------------------------
 import mypl_error as error
 import mypl_lexer as lexer
@@ -9,13 +13,24 @@ import mypl_token as token
 import mypl_parser as parser
 import mypl_ast as ast
 import mypl_type_checker as type_checker
+import mypl_token_buffer as token_buffer
+import mypl_profile as profiler
+import json
 import sys
 
 
-def main(filename):
+def main(filename, report_all=False, profile=False):
     try:
         file_stream = open(filename, 'r')
-        hw5(file_stream)
+        if profile:
+            hw5_profile(file_stream)
+        elif report_all:
+            errors = hw5_all(file_stream)
+            if errors:
+                file_stream.close()
+                sys.exit('\n'.join(str(e) for e in errors))
+        else:
+            hw5(file_stream)
         file_stream.close()
     except FileNotFoundError:
         sys.exit('invalid filename %s' % filename)
@@ -32,7 +47,46 @@ def hw5(file_stream):
     stmt_list.accept(the_type_checker)
 
 
+# returns every syntax error and the type errors of the statements
+# that parsed, in source order
+def hw5_all(file_stream):
+    the_lexer = lexer.Lexer(file_stream)
+    the_parser = parser.Parser(the_lexer, recover=True)
+    stmt_list = the_parser.parse()
+    errors = the_parser.diagnostics + type_checker.check_all(stmt_list)
+    errors.sort(key=lambda e: (e.line, e.column))
+    return errors
+
+
+# type checks with every stage instrumented, and writes the profile
+# (also when a stage fails)
+def hw5_profile(file_stream):
+    profile = profiler.Profile()
+    try:
+        with profile.stage('lex'):
+            tokens, lex_error = token_buffer.lex_all(lexer.Lexer(file_stream))
+        profile.count_tokens(tokens)
+        with profile.stage('parse'):
+            the_parser = parser.Parser(token_buffer.TokenArray(tokens, lex_error))
+            stmt_list = the_parser.parse()
+        profile.count_nodes(stmt_list)
+        with profile.stage('type check'):
+            the_type_checker = profile.visitor(type_checker.TypeChecker,
+                                               profile.symbol_table())
+            stmt_list.accept(the_type_checker)
+    finally:
+        json.dump(profile.report(), sys.stdout, indent=2)
+        sys.stdout.write('\n')
+
+
 if __name__ == '__main__':
-    if len(sys.argv) != 2:
-        sys.exit('Usage: %s file' % sys.argv[0])
-    main(sys.argv[1])
\ No newline at end of file
+    args = sys.argv[1:]
+    report_all = '--all' in args
+    if report_all:
+        args.remove('--all')
+    profile = '--profile' in args
+    if profile:
+        args.remove('--profile')
+    if len(args) != 1 or (report_all and profile):
+        sys.exit('Usage: %s [--all | --profile] file' % sys.argv[0])
+    main(args[0], report_all, profile)
\ No newline at end of file
@@ -0,0 +1,80 @@
+#!/usr/bin/python3#
+#  Author:
+#  Assignment: 6
+#  Description: Simple script to execute a MyPL program. With --stream
+#  each top level statement is parsed, checked and run in turn, so the
+#  program is never held in memory as a whole (a type error further
+#  down then shows up after the statements above it ran). With
+#  --optimize the constant parts of the program are computed before it
+#  runs, and (unless streaming) its dead code and unused declarations
+#  are removed.
+# ----------------------------------------------------------------------
+import mypl_error as error
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_type_checker as type_checker
+import mypl_interpreter as interpreter
+import mypl_vm as vm
+import mypl_optimizer as optimizer
+import sys
+
+
+def main(filename, use_vm=False, stream=False, optimize=False):
+    try:
+        file_stream = open(filename, 'r')
+        if stream:
+            hw6_stream(file_stream, optimize)
+        else:
+            hw6(file_stream, use_vm, optimize)
+        file_stream.close()
+    except FileNotFoundError:
+        sys.exit('invalid filename %s' % filename)
+    except error.MyPLError as e:
+        file_stream.close()
+        sys.exit(e)
+
+
+def hw6(file_stream, use_vm=False, optimize=False):
+    the_lexer = lexer.Lexer(file_stream)
+    the_parser = parser.Parser(the_lexer)
+    stmt_list = the_parser.parse()
+    the_type_checker = type_checker.TypeChecker()
+    stmt_list.accept(the_type_checker)
+    if optimize:
+        stmt_list.accept(optimizer.ConstantFolder())
+        optimizer.DeadCodeEliminator().eliminate(stmt_list)
+    if use_vm:
+        program = vm.Compiler().compile(stmt_list)
+        vm.VM(program).run()
+    else:
+        the_interpreter = interpreter.Interpreter()
+        the_interpreter.run(stmt_list)
+
+
+def hw6_stream(file_stream, optimize=False):
+    the_lexer = lexer.Lexer(file_stream, 1 << 16)
+    the_parser = parser.Parser(the_lexer)
+    the_type_checker = type_checker.TypeChecker()
+    stmts = the_type_checker.check_stream(the_parser.stream())
+    if optimize:
+        stmts = optimizer.ConstantFolder().fold_stream(stmts)
+    the_interpreter = interpreter.Interpreter()
+    the_interpreter.run_stream(stmts)
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    use_vm = '--vm' in args
+    if use_vm:
+        args.remove('--vm')
+    stream = '--stream' in args
+    if stream:
+        args.remove('--stream')
+    optimize = '--optimize' in args
+    if optimize:
+        args.remove('--optimize')
+    if len(args) != 1 or (use_vm and stream):
+        sys.exit('Usage: %s [--vm | --stream] [--optimize] file' % sys.argv[0])
+    # each MyPL call is a handful of Python calls deep
+    sys.setrecursionlimit(10000)
+    main(args[0], use_vm, stream, optimize)
@@ -0,0 +1,152 @@
+#!/usr/bin/python3
+#
+# Description: Differential check of incremental parsing. Applies
+# chains of random edits to the given files (or to the lexer_diff
+# corpus and some generated programs) through a Document from
+# mypl_incremental, and after every edit compares its tokens, its
+# AST and its error against a full lex and parse of the edited
+# source. ASTs are compared through mypl_ast_codec, whose encoding
+# covers the type, lexeme, line and column of every token. The
+# result of an IncrementalChecker kept for every source is compared
+# against a TypeChecker run over the full parse.
+#     python3 incremental_diff.py [file ...]
+# ----------------------------------------------------------------------
+
+import io
+import random
+import sys
+
+import lexer_diff
+import mypl_ast_codec as ast_codec
+import mypl_error as error
+import mypl_incremental as incremental
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_token_buffer as token_buffer
+import mypl_type_checker as type_checker
+from benchmarks import generator
+
+
+def full_parse(source):
+    """(tokens, stmt_list, error) from lexing and parsing all of source"""
+    tokens, lex_error = token_buffer.lex_all(lexer.Lexer(io.StringIO(source)))
+    if lex_error is not None:
+        return None, None, str(lex_error)
+    try:
+        stmt_list = parser.Parser(token_buffer.TokenArray(tokens)).parse()
+    except error.MyPLError as e:
+        return tokens, None, str(e)
+    return tokens, stmt_list, None
+
+
+def type_check(check, stmt_list):
+    """The error (printed) of check(stmt_list), or None"""
+    try:
+        check(stmt_list)
+    except error.MyPLError as e:
+        return str(e)
+    except Exception as e:
+        # a crash of the checker itself has to be the same too
+        return '%s: %s' % (type(e).__name__, e)
+    return None
+
+
+def compare(document, checker):
+    """Returns None if document (and checker's result for it) matches a
+    full parse of its source, otherwise a description"""
+    tokens, stmt_list, expected_error = full_parse(document.source)
+    found_error = None if document.error is None else str(document.error)
+    if found_error != expected_error:
+        return 'error %r, full parse gave %r' % (found_error, expected_error)
+    if (tokens is None) != (document.tokens is None):
+        return 'tokens %s, full parse %s' % (
+            'missing' if document.tokens is None else 'present',
+            'failed' if tokens is None else 'lexed')
+    if tokens is not None:
+        expected = [str(next_token) for next_token in tokens]
+        found = [str(next_token) for next_token in document.tokens]
+        if expected != found:
+            for index in range(max(len(expected), len(found))):
+                lhs = expected[index] if index < len(expected) else '<missing>'
+                rhs = found[index] if index < len(found) else '<missing>'
+                if lhs != rhs:
+                    return 'token %i: full lex gave %s, Document has %s' % (index, lhs, rhs)
+    if stmt_list is not None:
+        if document.stmt_list is None:
+            return 'no AST, full parse succeeded'
+        if ast_codec.encode(stmt_list) != ast_codec.encode(document.stmt_list):
+            return 'AST differs from the full parse'
+        expected = type_check(lambda tree: tree.accept(type_checker.TypeChecker()), stmt_list)
+        found = type_check(checker.check, document.stmt_list)
+        if expected != found:
+            return 'type check gave %r, full check %r' % (found, expected)
+    return None
+
+
+def random_edit(rand, source):
+    """(start, end, text) of a random edit of source"""
+    start = rand.randint(0, len(source))
+    choice = rand.random()
+    if choice < 0.3:
+        # delete a few characters
+        return start, min(len(source), start + rand.randint(1, 8)), ''
+    if choice < 0.55:
+        return start, start, ''.join(rand.choice(lexer_diff.NOISE)
+                                     for _ in range(rand.randint(1, 3)))
+    lines = source.splitlines(True)
+    if not lines:
+        return 0, 0, rand.choice(lexer_diff.CORPUS)
+    line_start = source.rfind('\n', 0, start) + 1
+    if choice < 0.8:
+        # copy a whole line in front of the line of start
+        return line_start, line_start, rand.choice(lines)
+    # delete the line of start
+    line_end = source.find('\n', start)
+    return line_start, len(source) if line_end < 0 else line_end + 1, ''
+
+
+def main(filenames, edits=200, seed=0):
+    sources = []
+    for filename in filenames:
+        with open(filename, 'r') as file_stream:
+            sources.append((filename, file_stream.read()))
+    if not filenames:
+        sources = [('corpus[%i]' % i, src) for i, src in enumerate(lexer_diff.CORPUS)]
+        sources += [('generated[%i]' % i, generator.generate(20, seed=i)) for i in range(5)]
+    rand = random.Random(seed)
+    failures = 0
+    checked = 0
+    relexed = 0
+    reparsed = 0
+    rechecked = 0
+    for name, source in sources:
+        document = incremental.Document(source)
+        checker = incremental.IncrementalChecker()
+        message = compare(document, checker)
+        edit = None
+        for _ in range(edits):
+            if message is not None:
+                break
+            edit = random_edit(rand, document.source)
+            before = document.source
+            document.edit(*edit)
+            message = compare(document, checker)
+            checked += 1
+            relexed += document.relexed
+            reparsed += document.reparsed
+            rechecked += checker.checked
+        if message is not None:
+            failures += 1
+            print('%s: %s' % (name, message))
+            if edit is not None:
+                print('    edit %r of: %r' % (edit, before))
+    edits = max(checked, 1)
+    print('%i of %i sources differ (%i edits; per edit %.1f tokens lexed, %.1f statements'
+          ' parsed, %.1f checked)' % (failures, len(sources), checked, relexed / edits,
+                                      reparsed / edits, rechecked / edits))
+    return failures == 0
+
+
+if __name__ == '__main__':
+    if not main(sys.argv[1:]):
+        sys.exit(1)
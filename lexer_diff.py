@@ -0,0 +1,119 @@
+#!/usr/bin/python3
+#
+# Description: Differential check of the two lexer backends.
+# Runs mypl_lexer.Lexer and mypl_regex_lexer.RegexLexer over
+# the given files (or a built-in corpus of valid and invalid
+# programs plus random mutations of them) and reports every
+# place where the token streams or errors differ.
+# ----------------------------------------------------------------------
+
+import io
+import random
+import sys
+
+import mypl_error as error
+import mypl_lexer as lexer
+import mypl_regex_lexer as regex_lexer
+import mypl_token as token
+
+
+CORPUS = [
+    'struct Node\n    var val: int = 0;\n    var next: Node = nil;\nend\n',
+    'fun int add(x: int, y: int)\n    var z = x + y * 2 - 1;\n    return z;\nend\n',
+    'var n = new Node;\nset n.next.val = add(1, 2);\nvar f = 3.25 + 0.5;\n',
+    'if a >= 2 and not b == false then\n    print("big");\nelif (a <= 2) or a != 1 then\n'
+    '    print(itos(a));\nelse\n    print("small");\nend\n',
+    'while i < 10 do\n    set i = i + 1;   # comment at end\n    var k = i % 3;\nend\n',
+    'var x = 1;\n\tvar y = 2;  # c\n  # another\n   var z = x;\r\nvar w: int = 5;\n',
+    'var x = 1;\n#trailing comment',
+    'var x = 0;var y=x+1;string z',
+    "var a = 'x' ! y <= 3 >= 4 != 5;\nvar q = 2.50 ;\n",
+    'var s: string = "a # not a comment";\r\nend\r\n',
+    'var x = 01;\n',
+    'var x = 0"a";\n',
+    'var x = 1.;\n',
+    'var x = .5;\n',
+    'var x = "abc\n";\n',
+    'var x = "abc',
+    'var x = 12ab;\n',
+    'var x = 12a;\n',
+    'var x = 1.5a;\n',
+    'var x = 1.5"a";\n',
+    'var a = 1.2.3;\n',
+    'var a = 12"b";\n',
+    'var x = 10\r\n',
+    'var x = 1.5\r\n',
+    'var \xb2 = ١٢;\n',
+    '',
+    '# only a comment\n',
+]
+
+# characters used to mutate the corpus
+NOISE = ' \t\r\n#"\'.0123456789abez;,=<>!():+-*/%\xb2\x0c'
+
+
+def lex_all(lexer_backend, source, limit=100000):
+    """Returns the printed token stream (ending with EOS or the error)"""
+    the_lexer = lexer_backend(io.StringIO(source))
+    result = []
+    try:
+        for _ in range(limit):
+            next_token = the_lexer.next_token()
+            result.append(str(next_token))
+            if next_token.tokentype == token.EOS:
+                # one more call checks what happens after the end
+                result.append(str(the_lexer.next_token()))
+                break
+    except error.MyPLError as e:
+        result.append(str(e))
+    return result
+
+
+def compare(source):
+    """Returns None if both backends agree, otherwise a description"""
+    expected = lex_all(lexer.Lexer, source)
+    found = lex_all(regex_lexer.RegexLexer, source)
+    if expected == found:
+        return None
+    for index in range(max(len(expected), len(found))):
+        lhs = expected[index] if index < len(expected) else '<missing>'
+        rhs = found[index] if index < len(found) else '<missing>'
+        if lhs != rhs:
+            return 'token %i: Lexer gave %s, RegexLexer gave %s' % (index, lhs, rhs)
+
+
+def mutate(rand, source):
+    chars = list(source)
+    for _ in range(rand.randint(1, 4)):
+        index = rand.randint(0, len(chars))
+        if chars and rand.random() < 0.3:
+            del chars[min(index, len(chars) - 1)]
+        else:
+            chars.insert(index, rand.choice(NOISE))
+    return ''.join(chars)
+
+
+def main(filenames, mutations=2000, seed=0):
+    failures = 0
+    sources = []
+    for filename in filenames:
+        with open(filename, 'r') as file_stream:
+            sources.append((filename, file_stream.read()))
+    if not filenames:
+        sources = [('corpus[%i]' % i, src) for i, src in enumerate(CORPUS)]
+        rand = random.Random(seed)
+        for i in range(mutations):
+            sources.append(('mutation[%i]' % i, mutate(rand, rand.choice(CORPUS))))
+    for name, source in sources:
+        message = compare(source)
+        if message is not None:
+            failures += 1
+            print('%s: %s' % (name, message))
+            print('    source: %r' % source)
+    print('%i of %i sources differ' % (failures, len(sources)))
+    return failures == 0
+
+
+if __name__ == '__main__':
+    if not main(sys.argv[1:]):
+        sys.exit(1)
@@ -12,16 +12,22 @@ import mypl_token as token
 
 class ASTNode(object):
     """The base class for the abstract syntax tree."""
+    __slots__ = ()
+
     def accept(self, visitor): pass
 
 
 class Stmt(ASTNode):
     """The base class for all statement nodes."""
+    __slots__ = ()
+
     def accept(self, visitor): pass
 
 
 class StmtList(ASTNode):
     """A statement list consists of a list of statements."""
+    __slots__ = ('stmts',)
+
     def __init__(self):
         self.stmts = []
 
@@ -30,10 +36,14 @@ class StmtList(ASTNode):
 
 
 class Expr(ASTNode):
+    __slots__ = ()
+
     def accept(self, visitor): pass
 
 
 class ExprStmt(Stmt):
+    __slots__ = ('expr',)
+
     def __init__(self):
         self.expr = None
 
@@ -42,16 +52,21 @@ class ExprStmt(Stmt):
 
 
 class VarDeclStmt(Stmt):
+    __slots__ = ('var_id', 'var_type', 'var_expr', 'slot')
+
     def __init__(self):
         self.var_id = None  # Token (ID)
         self.var_type = None    # Token (STRINGTYPE, ..., ID)
         self.var_expr = None    # Expr node
+        self.slot = None    # frame slot of the variable (set by the resolver)
 
     def accept(self, visitor):
         visitor.visit_var_decl_stmt(self)
 
 
 class AssignStmt(Stmt):
+    __slots__ = ('lhs', 'rhs')
+
     def __init__(self):
         self.lhs = None
         self.rhs = None
@@ -61,6 +76,8 @@ class AssignStmt(Stmt):
 
 
 class StructDeclStmt(Stmt):
+    __slots__ = ('struct_id', 'var_decls')
+
     def __init__(self):
         self.struct_id = None
         self.var_decls = []
@@ -70,11 +87,14 @@ class StructDeclStmt(Stmt):
 
 
 class FunDeclStmt(Stmt):
+    __slots__ = ('fun_name', 'params', 'return_type', 'stmt_list', 'frame_size')
+
     def __init__(self):
         self.fun_name = None
         self.params = []
         self.return_type = None
         self.stmt_list = StmtList()
+        self.frame_size = 0     # slots in a call frame (set by the resolver)
 
     def accept(self, visitor):
 
@@ -82,6 +102,8 @@ class FunDeclStmt(Stmt):
 
 
 class ReturnStmt(Stmt):
+    __slots__ = ('return_expr', 'return_token')
+
     def __init__(self):
         self.return_expr = None
         self.return_token = None
@@ -90,7 +112,23 @@ class ReturnStmt(Stmt):
         visitor.visit_return_stmt(self)
 
 
+class ErrorStmt(Stmt):
+    """A statement that did not parse, left in its place by a parser in
+    recovery mode"""
+    __slots__ = ('error', 'first_token', 'declared_id')
+
+    def __init__(self):
+        self.error = None           # the MyPLError
+        self.first_token = None     # Token the statement started with
+        self.declared_id = None     # Token (ID) a failed var, fun or struct declares
+
+    def accept(self, visitor):
+        visitor.visit_error_stmt(self)
+
+
 class WhileStmt(Stmt):
+    __slots__ = ('bool_expr', 'stmt_list')
+
     def __init__(self):
         self.bool_expr = None
         self.stmt_list = StmtList()
@@ -100,6 +138,8 @@ class WhileStmt(Stmt):
 
 
 class IfStmt(Stmt):
+    __slots__ = ('if_part', 'elseifs', 'has_else', 'else_stmts')
+
     def __init__(self):
         self.if_part = BasicIf()
         self.elseifs = []
@@ -111,6 +151,8 @@ class IfStmt(Stmt):
 
 
 class SimpleExpr(Expr):
+    __slots__ = ('term',)
+
     def __init__(self):
         self.term = None
 
@@ -119,6 +161,8 @@ class SimpleExpr(Expr):
 
 
 class ComplexExpr(Expr):
+    __slots__ = ('first_operand', 'math_rel', 'rest')
+
     def __init__(self):
         self.first_operand = None
         self.math_rel = None
@@ -129,6 +173,9 @@ class ComplexExpr(Expr):
 
 
 class BoolExpr(ASTNode):
+    __slots__ = ('first_expr', 'bool_rel', 'second_expr', 'bool_connector',
+                 'rest', 'negated')
+
     def __init__(self):
         self.first_expr = None
         self.bool_rel = None
@@ -142,23 +189,33 @@ class BoolExpr(ASTNode):
 
 
 class LValue(ASTNode):
+    __slots__ = ('path', 'depth', 'slot', 'offsets')
+
     def __init__(self):
         self.path = []
+        self.depth = None   # frames out from the current one (set by the resolver)
+        self.slot = None    # frame slot of path[0] (set by the resolver)
+        self.offsets = None     # field offsets of path[1:] (set by the resolver)
 
     def accept(self, visitor):
         visitor.visit_lvalue(self)
 
 
 class FunParam(Stmt):
+    __slots__ = ('param_name', 'param_type', 'slot')
+
     def __init__(self):
         self.param_name = None
         self.param_type = None
+        self.slot = None    # frame slot of the parameter (set by the resolver)
 
     def accept(self, visitor):
         visitor.visit_fun_param(self)
 
 
 class BasicIf(object):
+    __slots__ = ('bool_expr', 'stmt_list')
+
     def __init__(self):
         self.bool_expr = None
         self.stmt_list = StmtList()
@@ -168,18 +225,25 @@ class BasicIf(object):
 
 
 class RValue(ASTNode):
+    __slots__ = ()
+
     def accept(self, visitor): pass
 
 
 class SimpleRValue(RValue):
+    __slots__ = ('val', 'value')
+
     def __init__(self):
         self.val = None
+        self.value = None   # Python value of the literal (set by the resolver)
 
     def accept(self, visitor):
         visitor.visit_simple_rvalue(self)
 
 
 class NewRValue(RValue):
+    __slots__ = ('struct_type',)
+
     def __init__(self):
         self.struct_type = None
 
@@ -188,9 +252,13 @@ class NewRValue(RValue):
 
 
 class CallRValue(RValue):
+    __slots__ = ('fun', 'args', 'depth', 'slot')
+
     def __init__(self):
         self.fun = None
         self.args = []
+        self.depth = None   # frames out to the global frame (set by the resolver)
+        self.slot = None    # index in the function table, None for builtins (set by the resolver)
 
     def accept(self, visitor):
         visitor.visit_call_rvalue(self)
@@ -198,8 +266,13 @@ class CallRValue(RValue):
 
 class IDRvalue(RValue):
     """An identifier rvalue consists of a path of one or more identifiers."""
+    __slots__ = ('path', 'depth', 'slot', 'offsets')
+
     def __init__(self):
         self.path = []          # List of Token (id)
+        self.depth = None       # frames out from the current one (set by the resolver)
+        self.slot = None        # frame slot of path[0] (set by the resolver)
+        self.offsets = None     # field offsets of path[1:] (set by the resolver)
 
     def accept(self, visitor):
         visitor.visit_id_rvalue(self)
@@ -207,7 +280,31 @@ class IDRvalue(RValue):
 
 class Visitor(object):
 
-    """The base class for AST visitors."""
+    """The base class for AST visitors. Besides node.accept(visitor),
+    visitor.visit(node) calls the visit method for the node's class
+    from a table built once per visitor class, and walk(node) visits a
+    whole tree with an explicit work stack instead of recursion."""
+
+    # the table of every subclass is built when the class is created
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls.dispatch = dispatch_table(cls)
+
+    def visit(self, node):
+        return self.dispatch[type(node)](self, node)
+
+    def walk(self, node):
+        """Visits node and every node below it in source order (each
+        node before its children). For visitors whose visit methods do
+        not visit the children themselves"""
+        dispatch = self.dispatch
+        work = [node]
+        while work:
+            node = work.pop()
+            cls = type(node)
+            dispatch[cls](self, node)
+            work.extend(reversed(children(node)))
+
     def visit_stmt_list(self, stmt_list): pass
 
     def visit_expr_stmt(self, expr_stmt): pass
@@ -222,6 +319,8 @@ class Visitor(object):
 
     def visit_return_stmt(self, return_stmt): pass
 
+    def visit_error_stmt(self, error_stmt): pass
+
     def visit_while_stmt(self, while_stmt): pass
 
     def visit_if_stmt(self, if_stmt): pass
@@ -244,4 +343,75 @@ class Visitor(object):
 
     def visit_id_rvalue(self, id_rvalue): pass
 
-    def visit_basic_if_stmt(self, basic_if_stmt): pass
\ No newline at end of file
+    def visit_basic_if_stmt(self, basic_if_stmt): pass
+
+
+# node class -> name of its visit method
+VISIT_METHODS = {
+    StmtList: 'visit_stmt_list',
+    ExprStmt: 'visit_expr_stmt',
+    VarDeclStmt: 'visit_var_decl_stmt',
+    AssignStmt: 'visit_assign_stmt',
+    StructDeclStmt: 'visit_struct_decl_stmt',
+    FunDeclStmt: 'visit_fun_decl_stmt',
+    ReturnStmt: 'visit_return_stmt',
+    ErrorStmt: 'visit_error_stmt',
+    WhileStmt: 'visit_while_stmt',
+    IfStmt: 'visit_if_stmt',
+    SimpleExpr: 'visit_simple_expr',
+    ComplexExpr: 'visit_complex_expr',
+    BoolExpr: 'visit_bool_expr',
+    LValue: 'visit_lvalue',
+    FunParam: 'visit_fun_param',
+    SimpleRValue: 'visit_simple_rvalue',
+    NewRValue: 'visit_new_rvalue',
+    CallRValue: 'visit_call_rvalue',
+    IDRvalue: 'visit_id_rvalue',
+    BasicIf: 'visit_basic_if_stmt',
+}
+
+# node class -> the attributes holding its child nodes (a node, a
+# list of nodes or None), in source order
+CHILD_FIELDS = {
+    StmtList: ('stmts',),
+    ExprStmt: ('expr',),
+    VarDeclStmt: ('var_expr',),
+    AssignStmt: ('lhs', 'rhs'),
+    StructDeclStmt: ('var_decls',),
+    FunDeclStmt: ('params', 'stmt_list'),
+    ReturnStmt: ('return_expr',),
+    ErrorStmt: (),
+    WhileStmt: ('bool_expr', 'stmt_list'),
+    IfStmt: ('if_part', 'elseifs', 'else_stmts'),
+    SimpleExpr: ('term',),
+    ComplexExpr: ('first_operand', 'rest'),
+    BoolExpr: ('first_expr', 'second_expr', 'rest'),
+    LValue: (),
+    FunParam: (),
+    SimpleRValue: (),
+    NewRValue: (),
+    CallRValue: ('args',),
+    IDRvalue: (),
+    BasicIf: ('bool_expr', 'stmt_list'),
+}
+
+
+def children(node):
+    """The child nodes of node, in source order"""
+    result = []
+    for name in CHILD_FIELDS[type(node)]:
+        value = getattr(node, name, None)
+        if isinstance(value, list):
+            result.extend(value)
+        elif value is not None:
+            result.append(value)
+    return result
+
+
+def dispatch_table(visitor_class):
+    """node class -> the visit function of visitor_class for it"""
+    return {node_class: getattr(visitor_class, name)
+            for node_class, name in VISIT_METHODS.items()}
+
+
+Visitor.dispatch = dispatch_table(Visitor)
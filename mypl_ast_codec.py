@@ -0,0 +1,354 @@
+#!/usr/bin/python3
+#
+# Description: A compact binary encoding of parsed MyPL programs.
+# Node classes and token types are written as small ints, every
+# lexeme is stored once in a string table, and token positions
+# are stored as deltas from the previous token. Each top level
+# statement is encoded on its own and the file has an index of
+# where each one starts, so a ProgramReader (for example over an
+# mmap of a cached program) can decode statements on demand.
+#
+# Layout (all fixed size ints are little endian uint32):
+#   header   magic, string count, statement count and the offsets
+#            of the three sections below
+#   strings  string count + 1 offsets into the utf-8 blob, the blob
+#   index    statement count + 1 offsets into the node stream
+#   nodes    one value per top level statement, in preorder
+# A value is a kind byte and its payload:
+#   NONE, FALSE, TRUE       nothing
+#   TOKENTYPE               the token type (a bare token.NIL)
+#   TOKEN                   token type, lexeme index, line delta and
+#                           column (a delta if the line did not change)
+#   LIST                    length, then the items
+#   NODE + tag              the node's parse fields, in FIELDS order
+# Counts, indexes and columns are unsigned varints, deltas zigzag
+# varints.
+# ----------------------------------------------------------------------
+
+import array
+import mmap
+import struct
+import sys
+
+import mypl_token as token
+import mypl_ast as ast
+
+
+MAGIC = b'MyPLAST1'
+HEADER = struct.Struct('<8s5I')
+
+NONE = 0
+FALSE = 1
+TRUE = 2
+TOKENTYPE = 3
+TOKEN = 4
+LIST = 5
+NODE = 16
+
+# the fields the parser sets, per node class (the position in the
+# list is the tag); the resolver's annotations and the MyPLError of
+# an ErrorStmt (from a parser in recovery mode) are not encoded
+FIELDS = [
+    (ast.StmtList, ('stmts',)),
+    (ast.ExprStmt, ('expr',)),
+    (ast.VarDeclStmt, ('var_id', 'var_type', 'var_expr')),
+    (ast.AssignStmt, ('lhs', 'rhs')),
+    (ast.StructDeclStmt, ('struct_id', 'var_decls')),
+    (ast.FunDeclStmt, ('fun_name', 'params', 'return_type', 'stmt_list')),
+    (ast.ReturnStmt, ('return_expr', 'return_token')),
+    (ast.WhileStmt, ('bool_expr', 'stmt_list')),
+    (ast.IfStmt, ('if_part', 'elseifs', 'has_else', 'else_stmts')),
+    (ast.SimpleExpr, ('term',)),
+    (ast.ComplexExpr, ('first_operand', 'math_rel', 'rest')),
+    (ast.BoolExpr, ('first_expr', 'bool_rel', 'second_expr', 'bool_connector',
+                    'rest', 'negated')),
+    (ast.LValue, ('path',)),
+    (ast.FunParam, ('param_name', 'param_type')),
+    (ast.BasicIf, ('bool_expr', 'stmt_list')),
+    (ast.SimpleRValue, ('val',)),
+    (ast.NewRValue, ('struct_type',)),
+    (ast.CallRValue, ('fun', 'args')),
+    (ast.IDRvalue, ('path',)),
+    (ast.ErrorStmt, ('first_token', 'declared_id')),
+]
+
+
+def _node_specs():
+    tags = {}
+    specs = []
+    for tag, (cls, fields) in enumerate(FIELDS):
+        tags[cls] = (NODE + tag, tuple(reversed(fields)))
+        # the values __init__ gives the slots that are not encoded
+        blank = cls()
+        defaults = []
+        for klass in cls.__mro__:
+            for name in klass.__dict__.get('__slots__', ()):
+                if name not in fields:
+                    defaults.append((name, getattr(blank, name)))
+        specs.append((cls, tuple(reversed(fields)), tuple(defaults)))
+    return tags, specs
+
+
+NODE_TAGS, NODE_SPECS = _node_specs()
+TOKEN_TYPES = {int(tokentype): tokentype for tokentype in token.TokenType}
+
+
+def _uint(out, n):
+    while n >= 0x80:
+        out.append((n & 0x7f) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _read_uint(data, pos):
+    n = 0
+    shift = 0
+    while True:
+        byte = data[pos]
+        pos += 1
+        n |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return n, pos
+        shift += 7
+
+
+def _encode_stmt(stmt, out, strings):
+    """Appends the encoding of one top level statement to out (a
+    bytearray), adding its lexemes to strings (lexeme -> index)"""
+    append = out.append
+    line = column = 0
+    work = [stmt]
+    pop = work.pop
+    push = work.extend
+    while work:
+        value = pop()
+        cls = type(value)
+        if cls is token.Token:
+            append(TOKEN)
+            append(value.tokentype)
+            index = strings.get(value.lexeme)
+            if index is None:
+                index = strings[value.lexeme] = len(strings)
+            _uint(out, index)
+            delta = value.line - line
+            if delta == 0:
+                delta = value.column - column
+                _uint(out, 0)
+                _uint(out, delta * 2 if delta >= 0 else -delta * 2 - 1)
+            else:
+                _uint(out, delta * 2 if delta >= 0 else -delta * 2 - 1)
+                _uint(out, value.column)
+            line = value.line
+            column = value.column
+        elif cls is list:
+            append(LIST)
+            _uint(out, len(value))
+            push(reversed(value))
+        elif value is None:
+            append(NONE)
+        elif value is True:
+            append(TRUE)
+        elif value is False:
+            append(FALSE)
+        elif cls is token.TokenType:
+            append(TOKENTYPE)
+            append(value)
+        else:
+            tag, fields = NODE_TAGS[cls]
+            append(tag)
+            push(getattr(value, name) for name in fields)
+
+
+def encode(stmt_list):
+    """The binary encoding (bytes) of a parsed program"""
+    strings = {}
+    nodes = bytearray()
+    index = [0]
+    for stmt in stmt_list.stmts:
+        _encode_stmt(stmt, nodes, strings)
+        index.append(len(nodes))
+    blobs = [lexeme.encode('utf-8', 'surrogatepass') for lexeme in strings]
+    string_offsets = [0]
+    for blob in blobs:
+        string_offsets.append(string_offsets[-1] + len(blob))
+    string_section = _uint32s(string_offsets) + b''.join(blobs)
+    index_section = _uint32s(index)
+    strings_at = HEADER.size
+    index_at = strings_at + len(string_section)
+    nodes_at = index_at + len(index_section)
+    header = HEADER.pack(MAGIC, len(blobs), len(index) - 1, strings_at, index_at, nodes_at)
+    return b''.join([header, string_section, index_section, bytes(nodes)])
+
+
+def _uint32s(values):
+    values = array.array('I', values)
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values.tobytes()
+
+
+def _read_uint32s(data, at, count):
+    values = array.array('I')
+    values.frombytes(data[at:at + 4 * count])
+    if sys.byteorder == 'big':
+        values.byteswap()
+    return values
+
+
+def _decode_stmt(data, pos, strings):
+    """Decodes the value at data[pos:]. Returns the value and the
+    position after it"""
+    line = column = 0
+    root = [None]
+    slots = [(root, 0)]     # (node or list, field or index) still to fill
+    pop = slots.pop
+    push = slots.append
+    while slots:
+        target, key = pop()
+        kind = data[pos]
+        pos += 1
+        if kind >= NODE:
+            cls, fields, defaults = NODE_SPECS[kind - NODE]
+            value = cls.__new__(cls)
+            for name, default in defaults:
+                setattr(value, name, default)
+            for name in fields:
+                push((value, name))
+        elif kind == TOKEN:
+            tokentype = TOKEN_TYPES[data[pos]]
+            index = data[pos + 1]
+            pos += 2
+            if index >= 0x80:
+                index, pos = _read_uint(data, pos - 1)
+            delta = data[pos]
+            pos += 1
+            if delta >= 0x80:
+                delta, pos = _read_uint(data, pos - 1)
+            n = data[pos]
+            pos += 1
+            if n >= 0x80:
+                n, pos = _read_uint(data, pos - 1)
+            if delta == 0:
+                column += (n >> 1) ^ -(n & 1)
+            else:
+                line += (delta >> 1) ^ -(delta & 1)
+                column = n
+            value = token.Token(tokentype, strings[index], line, column)
+        elif kind == LIST:
+            count = data[pos]
+            pos += 1
+            if count >= 0x80:
+                count, pos = _read_uint(data, pos - 1)
+            value = [None] * count
+            for i in range(count - 1, -1, -1):
+                push((value, i))
+        elif kind == NONE:
+            value = None
+        elif kind == TRUE:
+            value = True
+        elif kind == FALSE:
+            value = False
+        else:
+            value = TOKEN_TYPES[data[pos]]
+            pos += 1
+        if type(target) is list:
+            target[key] = value
+        else:
+            setattr(target, key, value)
+    return root[0], pos
+
+
+class ProgramReader(object):
+    """Reads an encoded program from a buffer (bytes, or an mmap for
+    lazy access). Statements are decoded when they are asked for;
+    reader[i] is the i-th top level statement"""
+
+    def __init__(self, buffer):
+        header = HEADER.unpack_from(buffer, 0)
+        magic, string_count, stmt_count, strings_at, index_at, nodes_at = header
+        if magic != MAGIC:
+            raise ValueError('not an encoded MyPL program')
+        self.buffer = buffer
+        self.string_count = string_count
+        self.string_offsets = _read_uint32s(buffer, strings_at, string_count + 1)
+        self.blob_at = strings_at + 4 * (string_count + 1)
+        self.index = _read_uint32s(buffer, index_at, stmt_count + 1)
+        self.nodes_at = nodes_at
+        self.strings = {}   # lexemes decoded so far, by index
+
+    def __len__(self):
+        return len(self.index) - 1
+
+    # the lexeme with the given index (a mapping for _decode_stmt)
+    def __getitem_string(self, index):
+        lexeme = self.strings.get(index)
+        if lexeme is None:
+            start = self.blob_at + self.string_offsets[index]
+            end = self.blob_at + self.string_offsets[index + 1]
+            lexeme = self.strings[index] = bytes(self.buffer[start:end]).decode(
+                'utf-8', 'surrogatepass')
+        return lexeme
+
+    def all_strings(self):
+        """Decodes the whole string table at once"""
+        blob = bytes(self.buffer[self.blob_at:self.blob_at + self.string_offsets[-1]])
+        offsets = self.string_offsets
+        return [blob[offsets[i]:offsets[i + 1]].decode('utf-8', 'surrogatepass')
+                for i in range(self.string_count)]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError('statement index out of range')
+        start = self.nodes_at + self.index[i]
+        data = bytes(self.buffer[start:self.nodes_at + self.index[i + 1]])
+        return _decode_stmt(data, 0, _LexemeTable(self.__getitem_string))[0]
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def stmt_list(self):
+        """Decodes the whole program into a StmtList"""
+        strings = self.all_strings()
+        data = bytes(self.buffer[self.nodes_at:self.nodes_at + self.index[-1]])
+        stmt_list = ast.StmtList()
+        pos = 0
+        for _ in range(len(self)):
+            stmt, pos = _decode_stmt(data, pos, strings)
+            stmt_list.stmts.append(stmt)
+        return stmt_list
+
+
+class _LexemeTable(object):
+    __slots__ = ('lookup',)
+
+    def __init__(self, lookup):
+        self.lookup = lookup
+
+    def __getitem__(self, index):
+        return self.lookup(index)
+
+
+class MappedProgram(ProgramReader):
+    """A ProgramReader over a memory mapped file"""
+
+    def __init__(self, filename):
+        with open(filename, 'rb') as program_file:
+            self.map = mmap.mmap(program_file.fileno(), 0, access=mmap.ACCESS_READ)
+        ProgramReader.__init__(self, self.map)
+
+    def close(self):
+        self.map.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def decode(data):
+    """The StmtList of an encoded program"""
+    return ProgramReader(data).stmt_list()
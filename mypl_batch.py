@@ -0,0 +1,233 @@
+#!/usr/bin/python3
+#
+# Description: Batch driver that lexes, parses and type checks
+# many MyPL files at once, fanned out over a process pool. It
+# collects the errors of every file and prints one report (text
+# or JSON) with per-file timings. The exit code is 0 only if
+# every file checked. With --cache, results are kept in an on-disk
+# cache and unchanged files are not checked again. With --all every
+# error of a file is reported instead of only the first. With --prune
+# dead code and unused declarations are removed before checking (so
+# errors in them are not reported, and the cached ASTs are smaller).
+#     python3 mypl_batch.py [--workers N] [--chunksize N] [--json] [--all]
+#                           [--prune]
+#                           [--cache DIR [--cache-size MB]]
+#                           path|directory|glob ...
+# ----------------------------------------------------------------------
+
+import argparse
+import concurrent.futures
+import functools
+import glob
+import io
+import json
+import os
+import sys
+import time
+
+import mypl_cache as cache
+import mypl_error as error
+import mypl_lexer as lexer
+import mypl_optimizer as optimizer
+import mypl_parser as parser
+import mypl_type_checker as type_checker
+
+
+def find_files(patterns):
+    """The files named by paths, directories (searched recursively for
+    .mypl files) and glob patterns, each once, in order"""
+    filenames = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            for directory, subdirs, files in os.walk(pattern):
+                subdirs.sort()
+                filenames.extend(os.path.join(directory, name)
+                                 for name in sorted(files) if name.endswith('.mypl'))
+        elif glob.has_magic(pattern):
+            filenames.extend(sorted(glob.glob(pattern, recursive=True)))
+        else:
+            filenames.append(pattern)
+    return list(dict.fromkeys(filenames))
+
+
+# one ResultCache per cache directory in each process
+result_caches = {}
+
+
+def open_cache(cache_dir, cache_bytes, report_all=False, prune=False):
+    if (cache_dir, report_all, prune) not in result_caches:
+        # results with every error are kept apart from first-error results
+        version = cache.checker_version() + ('-all' if report_all else '')
+        if prune:
+            # the pruning decides which errors are found, so a change to
+            # the optimizer invalidates these results too
+            version += '-prune-' + cache.source_hash(['mypl_optimizer'])
+        result_caches[cache_dir, report_all, prune] = cache.ResultCache(
+            cache_dir, cache_bytes, version)
+    return result_caches[cache_dir, report_all, prune]
+
+
+def check_source(source, report_all=False, prune=False):
+    """Lexes, parses and type checks source (after removing its dead
+    code with prune). Returns the errors found (all of them with
+    report_all, else the first) and the AST (None if lexing or parsing
+    failed)"""
+    if report_all:
+        return check_source_all(source, prune)
+    stmt_list = None
+    try:
+        the_parser = parser.Parser(lexer.Lexer(io.StringIO(source)))
+        stmt_list = the_parser.parse()
+        if prune:
+            optimizer.DeadCodeEliminator().eliminate(stmt_list)
+        stmt_list.accept(type_checker.TypeChecker())
+    except error.MyPLError as e:
+        return [{'message': e.message, 'line': e.line, 'column': e.column}], stmt_list
+    return [], stmt_list
+
+
+def check_source_all(source, prune=False):
+    the_parser = parser.Parser(lexer.Lexer(io.StringIO(source)), recover=True)
+    stmt_list = the_parser.parse()
+    if prune:
+        optimizer.DeadCodeEliminator().eliminate(stmt_list)
+    errors = the_parser.diagnostics + type_checker.check_all(stmt_list)
+    errors.sort(key=lambda e: (e.line, e.column))
+    if the_parser.diagnostics:
+        # statements that did not parse are not kept
+        stmt_list = None
+    return [{'message': e.message, 'line': e.line, 'column': e.column}
+            for e in errors], stmt_list
+
+
+def check_file(filename, cache_dir=None, cache_bytes=None, report_all=False,
+               prune=False):
+    """Checks one file. Returns a result dict with the file name, the
+    errors found (message, line and column), the time taken and
+    whether the result came from the cache"""
+    start = time.perf_counter()
+    cached = False
+    try:
+        with open(filename, 'r') as file_stream:
+            source = file_stream.read()
+        if cache_dir is None:
+            errors = check_source(source, report_all, prune)[0]
+        else:
+            result_cache = open_cache(cache_dir, cache_bytes, report_all, prune)
+            hit = result_cache.get(source)
+            if hit is not None:
+                errors = hit[0]
+                cached = True
+            else:
+                errors, stmt_list = check_source(source, report_all, prune)
+                result_cache.put(source, errors, stmt_list)
+    except (OSError, UnicodeDecodeError) as e:
+        errors = [{'message': 'invalid file (%s)' % e, 'line': None, 'column': None}]
+    except Exception as e:
+        # a checker bug in one file should not stop the batch
+        errors = [{'message': 'internal error (%s: %s)' % (type(e).__name__, e),
+                   'line': None, 'column': None}]
+    return {
+        'file': filename,
+        'ok': not errors,
+        'errors': errors,
+        'seconds': time.perf_counter() - start,
+        'cached': cached,
+    }
+
+
+def check_files(filenames, workers=None, chunksize=16, cache_dir=None,
+                cache_bytes=64 * 1024 * 1024, report_all=False, prune=False):
+    """Checks the files on a pool of worker processes (in this process
+    if workers is 1) and returns their results, in order"""
+    check = functools.partial(check_file, cache_dir=cache_dir, cache_bytes=cache_bytes,
+                              report_all=report_all, prune=prune)
+    if workers == 1:
+        results = [check(filename) for filename in filenames]
+    else:
+        with concurrent.futures.ProcessPoolExecutor(workers) as executor:
+            results = list(executor.map(check, filenames, chunksize=max(chunksize, 1)))
+    if cache_dir is not None:
+        open_cache(cache_dir, cache_bytes, report_all, prune).evict()
+    return results
+
+
+def summary(results, seconds, workers):
+    failed = [result for result in results if not result['ok']]
+    return {
+        'files': len(results),
+        'failed': len(failed),
+        'errors': sum(len(result['errors']) for result in results),
+        'cached': sum(1 for result in results if result['cached']),
+        'seconds': seconds,
+        'check_seconds': sum(result['seconds'] for result in results),
+        'workers': workers,
+    }
+
+
+def text_report(results, totals, output_stream=sys.stdout):
+    for result in results:
+        status = 'ok' if result['ok'] else 'FAIL'
+        output_stream.write('%-4s %9.4f s %s %s\n' % (status, result['seconds'],
+                                                     'C' if result['cached'] else ' ',
+                                                     result['file']))
+        for e in result['errors']:
+            if e['line'] is None:
+                output_stream.write('    %s: error: %s\n' % (result['file'], e['message']))
+            else:
+                output_stream.write('    %s:%i:%i: error: %s\n'
+                                    % (result['file'], e['line'], e['column'], e['message']))
+    output_stream.write('%i files (%i cached), %i failed, %i errors in %.3f s '
+                        '(%.3f s checking, %s workers)\n'
+                        % (totals['files'], totals['cached'], totals['failed'],
+                           totals['errors'], totals['seconds'], totals['check_seconds'],
+                           totals['workers']))
+
+
+def positive_int(text):
+    """An argparse type for counts that must be at least 1"""
+    value = int(text)
+    if value < 1:
+        raise argparse.ArgumentTypeError('%s is not a positive number' % text)
+    return value
+
+
+def main(patterns, workers=None, chunksize=16, as_json=False, cache_dir=None,
+         cache_megabytes=64, report_all=False, prune=False):
+    filenames = find_files(patterns)
+    start = time.perf_counter()
+    results = check_files(filenames, workers, chunksize, cache_dir,
+                          int(cache_megabytes * 1024 * 1024), report_all, prune)
+    totals = summary(results, time.perf_counter() - start,
+                     workers or os.cpu_count())
+    if as_json:
+        json.dump({'summary': totals, 'results': results}, sys.stdout, indent=2)
+        sys.stdout.write('\n')
+    else:
+        text_report(results, totals)
+    return totals['failed'] == 0
+
+
+if __name__ == '__main__':
+    arg_parser = argparse.ArgumentParser(
+        description='lex, parse and type check MyPL files in parallel')
+    arg_parser.add_argument('patterns', nargs='+', metavar='path',
+                            help='a file, a directory (searched for .mypl files) or a glob')
+    arg_parser.add_argument('--workers', type=positive_int, default=None,
+                            help='worker processes (default: one per CPU, 1: no pool)')
+    arg_parser.add_argument('--chunksize', type=int, default=16,
+                            help='files handed to a worker at a time')
+    arg_parser.add_argument('--json', action='store_true', dest='as_json',
+                            help='print the report as JSON')
+    arg_parser.add_argument('--all', action='store_true', dest='report_all',
+                            help='report every error of a file, not only the first')
+    arg_parser.add_argument('--prune', action='store_true',
+                            help='remove dead code and unused declarations before checking')
+    arg_parser.add_argument('--cache', metavar='DIR', dest='cache_dir',
+                            help='directory of the result cache (default: no cache)')
+    arg_parser.add_argument('--cache-size', metavar='MB', type=float, default=64,
+                            dest='cache_megabytes', help='size bound of the cache')
+    args = arg_parser.parse_args()
+    if not main(args.patterns, args.workers, args.chunksize, args.as_json,
+                args.cache_dir, args.cache_megabytes, args.report_all, args.prune):
+        sys.exit(1)
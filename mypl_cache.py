@@ -0,0 +1,184 @@
+#!/usr/bin/python3
+#
+# Description: An on-disk cache of parse and type check results,
+# keyed by a hash of the source text and of the checker version.
+# Each entry holds the verdict (the list of errors, as the length
+# of a JSON array of [message, line, column] and the array) followed
+# by the binary encoded AST (see mypl_ast_codec), so a hit skips
+# lexing, parsing and checking. Nothing in an entry is executable,
+# so a cache directory can be shared with other users.
+# Entries are written to a temporary file and renamed into place,
+# so any number of processes can share one cache directory, and
+# the least recently used entries are removed once the directory
+# grows past its size bound.
+# ----------------------------------------------------------------------
+
+import hashlib
+import json
+import os
+import struct
+import tempfile
+import time
+
+import mypl_ast_codec as ast_codec
+
+
+# the modules whose code decides what a cached result looks like
+CHECKER_MODULES = ['mypl_token', 'mypl_lexer', 'mypl_ast', 'mypl_parser',
+                   'mypl_symbol_table', 'mypl_type_checker', 'mypl_error',
+                   'mypl_ast_codec', 'mypl_cache']
+
+ENTRY_SUFFIX = '.entry'
+TEMP_PREFIX = '.tmp-'
+# a temporary file this old was left by a writer that died before
+# renaming it into place
+STALE_TEMP_SECONDS = 300
+# the length (little endian uint32) of the JSON encoded errors
+ERRORS_LENGTH = struct.Struct('<I')
+
+_version = None
+
+
+def source_hash(module_names):
+    """A hash of the source of the named modules (found next to this
+    one)"""
+    digest = hashlib.sha256()
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in module_names:
+        with open(os.path.join(directory, name + '.py'), 'rb') as module_file:
+            digest.update(module_file.read())
+    return digest.hexdigest()[:16]
+
+
+def checker_version():
+    """A hash of the source of the checker modules, so that changing
+    any of them invalidates every cached result"""
+    global _version
+    if _version is None:
+        _version = source_hash(CHECKER_MODULES)
+    return _version
+
+
+class ResultCache(object):
+    """A cache directory shared by any number of processes. max_bytes
+    bounds the total size of the entries; evict() is also run after
+    every evict_every puts"""
+
+    def __init__(self, directory, max_bytes=64 * 1024 * 1024, version=None,
+                 evict_every=64):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.version = version if version is not None else checker_version()
+        self.evict_every = evict_every
+        self.puts = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def key(self, source):
+        digest = hashlib.sha256(self.version.encode('utf-8'))
+        digest.update(b'\0')
+        digest.update(source.encode('utf-8', 'surrogatepass'))
+        return digest.hexdigest()
+
+    def __path(self, key):
+        return os.path.join(self.directory, key[:2], key + ENTRY_SUFFIX)
+
+    def get(self, source, with_ast=False):
+        """Returns (errors, stmt_list) for source, or None on a miss.
+        stmt_list is only loaded if with_ast is set, and is None if the
+        program had no AST (a lexer or parser error)"""
+        path = self.__path(self.key(source))
+        try:
+            with open(path, 'rb') as entry:
+                length, = ERRORS_LENGTH.unpack(entry.read(ERRORS_LENGTH.size))
+                errors = [{'message': message, 'line': line, 'column': column}
+                          for message, line, column
+                          in json.loads(entry.read(length).decode('utf-8'))]
+                stmt_list = None
+                if with_ast:
+                    ast_data = entry.read()
+                    if ast_data:
+                        stmt_list = ast_codec.decode(ast_data)
+        except FileNotFoundError:
+            return None
+        except (OSError, AttributeError, IndexError, KeyError, TypeError,
+                ValueError, struct.error):
+            # a damaged entry, or one from an incompatible version of
+            # the AST classes
+            self.__remove(path)
+            return None
+        try:
+            # mark the entry as recently used
+            os.utime(path)
+        except OSError:
+            pass
+        return errors, stmt_list
+
+    def put(self, source, errors, stmt_list=None):
+        """Stores the errors (a list of dicts with message, line and
+        column) and the AST of source"""
+        path = self.__path(self.key(source))
+        errors_data = json.dumps([[e['message'], e['line'], e['column']]
+                                  for e in errors]).encode('utf-8')
+        data = ERRORS_LENGTH.pack(len(errors_data)) + errors_data
+        if stmt_list is not None:
+            data += ast_codec.encode(stmt_list)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        # write a private temporary file, then rename it into place
+        # (atomic, so readers never see half an entry)
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=TEMP_PREFIX)
+        try:
+            with os.fdopen(fd, 'wb') as temp_file:
+                temp_file.write(data)
+            os.replace(temp_path, path)
+        except OSError:
+            self.__remove(temp_path)
+            return
+        self.puts += 1
+        if self.puts % self.evict_every == 0:
+            self.evict()
+
+    def __remove(self, path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+    # (DirEntry, stat) of every file in the shard directories
+    def __files(self):
+        with os.scandir(self.directory) as shards:
+            for shard in shards:
+                if not shard.is_dir():
+                    continue
+                with os.scandir(shard.path) as entries:
+                    for entry in entries:
+                        try:
+                            stat = entry.stat()
+                        except OSError:
+                            continue    # removed by another process
+                        yield entry, stat
+
+    def entries(self):
+        """(last use, size, path) of every entry"""
+        return [(stat.st_mtime, stat.st_size, entry.path)
+                for entry, stat in self.__files() if entry.name.endswith(ENTRY_SUFFIX)]
+
+    def evict(self):
+        """Removes the temporary files of writers that died, then the
+        least recently used entries until the entries take at most
+        max_bytes"""
+        stale = time.time() - STALE_TEMP_SECONDS
+        found = []
+        for entry, stat in self.__files():
+            if entry.name.endswith(ENTRY_SUFFIX):
+                found.append((stat.st_mtime, stat.st_size, entry.path))
+            elif entry.name.startswith(TEMP_PREFIX) and stat.st_mtime < stale:
+                self.__remove(entry.path)
+        total = sum(size for _, size, _ in found)
+        if total <= self.max_bytes:
+            return
+        found.sort()
+        for _, size, path in found:
+            if total <= self.max_bytes:
+                break
+            self.__remove(path)
+            total -= size
@@ -0,0 +1,405 @@
+#!/usr/bin/python3
+#
+# Description: Incremental lexing and parsing for editors. A
+# Document keeps the source text, its tokens, the lexer state after
+# every token and the token range of every top level statement.
+# edit() re-lexes from the first token the edit can reach until
+# the lexer is back in a state it had before the edit, then
+# re-parses from the first top level statement that holds a
+# changed token until the parser is back at the start of an old
+# statement. Every other token and AST node is reused as is; the
+# tokens after the edit only get their line numbers moved (in
+# place, so the reused nodes see the new positions).
+# An IncrementalChecker type checks a program one top level statement
+# at a time and remembers which global names (functions, structs and
+# variables) each statement read and declared. On the next check it
+# only re-checks the statements that are new or that read a name
+# whose declaration changed, and so on down the dependents.
+# ----------------------------------------------------------------------
+
+import bisect
+import io
+
+import mypl_ast as ast
+import mypl_error as error
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_symbol_table as symbol_table
+import mypl_token as token
+import mypl_token_buffer as token_buffer
+import mypl_type_checker as type_checker
+
+
+# the lexer state before the first token:
+# (source offset, line, column, column index)
+START = (0, 1, 0, 0)
+
+
+def lexer_at(source, state):
+    """A Lexer over source that starts in the given state"""
+    offset, line, column, column_index = state
+    the_lexer = lexer.Lexer(io.StringIO(''))
+    the_lexer.buffer = source
+    the_lexer.buffer_index = offset
+    the_lexer.stream_done = True
+    the_lexer.line = line
+    the_lexer.column = column
+    the_lexer.column_index = column_index
+    return the_lexer
+
+
+# index of the parser's current token in token_array
+def parser_position(the_parser, token_array):
+    if the_parser.current_token.tokentype == token.EOS:
+        return token_array.index    # EOS is never consumed
+    return token_array.index - 1
+
+
+class Document(object):
+    """A source text and its AST, kept up to date by edit(). While the
+    source does not lex or parse, stmt_list is None and error holds the
+    MyPLError a full parse would raise"""
+
+    def __init__(self, source):
+        self.source = source
+        self.stmt_list = None
+        self.error = None
+        self.relexed = 0        # tokens lexed by the last edit
+        self.reparsed = 0       # top level statements parsed by the last edit
+        self.__reset()
+
+    # lexes and parses the whole source
+    def __reset(self):
+        self.tokens = None      # ending with EOS, None after a lexer error
+        # the lexer state after each token, split in the parts an edit
+        # shifts (source offset and line) and the ones it does not
+        self.offsets = None
+        self.lines = None
+        self.columns = None     # (column, column index)
+        # the top level statements that parsed, with the index of their
+        # first token and of the token after them; a re-parse has to
+        # start at or before statement gap (None if they are all there)
+        self.stmts = []
+        self.starts = []
+        self.ends = []
+        self.gap = 0
+        try:
+            tokens, offsets, lines, columns, _ = self.__lex(START, len(self.source) + 1, 0)
+        except error.MyPLError as e:
+            return self.__failed(e)
+        self.tokens = tokens
+        self.offsets = offsets
+        self.lines = lines
+        self.columns = columns
+        self.relexed = len(tokens)
+        return self.__reparse(0, len(tokens), 0)
+
+    def __failed(self, e):
+        self.stmt_list = None
+        self.error = e
+        return None
+
+    def edit(self, start, end, text):
+        """Replaces source[start:end] (character offsets) with text.
+        Returns the new StmtList, or None if the new source has an error"""
+        if not 0 <= start <= end <= len(self.source):
+            raise ValueError('edit range out of bounds')
+        self.source = self.source[:start] + text + self.source[end:]
+        if self.tokens is None:
+            return self.__reset()
+        delta = len(text) - (end - start)
+        # the first token whose characters (or the character after it,
+        # which the lexer looks at) the edit can change
+        restart = bisect.bisect_left(self.offsets, start)
+        state = START
+        if restart:
+            state = (self.offsets[restart - 1], self.lines[restart - 1]) \
+                + self.columns[restart - 1]
+        try:
+            tokens, offsets, lines, columns, resume = self.__lex(state, end, delta, restart)
+        except error.MyPLError as e:
+            self.tokens = self.offsets = self.lines = self.columns = None
+            return self.__failed(e)
+        # the old tokens from resume on are kept
+        if resume is None:
+            resume = len(self.tokens)
+        else:
+            shift = lines[-1] - self.lines[resume - 1]
+            if delta:
+                self.offsets[resume:] = [offset + delta for offset in self.offsets[resume:]]
+            if shift:
+                for tail_token in self.tokens[resume:]:
+                    tail_token.line += shift
+                self.lines[resume:] = [line + shift for line in self.lines[resume:]]
+        token_delta = len(tokens) - (resume - restart)
+        self.relexed = len(tokens)
+        self.tokens[restart:resume] = tokens
+        self.offsets[restart:resume] = offsets
+        self.lines[restart:resume] = lines
+        self.columns[restart:resume] = columns
+        return self.__reparse(restart, resume, token_delta)
+
+    # lexes from state to the end of the source, or until the lexer gets
+    # back to the state after an old token (from restart on) past the old
+    # end of the edit, with offsets shifted by delta characters. Returns
+    # the tokens, the parts of their states and the index of the old
+    # token after the one it got back to (None if it got to the end)
+    def __lex(self, state, end, delta, restart=0):
+        the_lexer = lexer_at(self.source, state)
+        tokens = []
+        offsets = []
+        lines = []
+        columns = []
+        old_offsets = self.offsets
+        last = len(self.tokens) - 1 if self.tokens else -1     # the old EOS
+        while True:
+            next_token = the_lexer.next_token()
+            tokens.append(next_token)
+            offsets.append(the_lexer.buffer_index)
+            lines.append(the_lexer.line)
+            columns.append((the_lexer.column, the_lexer.column_index))
+            if next_token.tokentype == token.EOS:
+                return tokens, offsets, lines, columns, None
+            old_offset = the_lexer.buffer_index - delta
+            if old_offset >= end and restart <= last:
+                old = bisect.bisect_left(old_offsets, old_offset, restart, last)
+                if old < last and old_offsets[old] == old_offset \
+                        and self.columns[old] == columns[-1]:
+                    return tokens, offsets, lines, columns, old + 1
+
+    # re-parses the top level statements from the first one that holds
+    # (or looks ahead at) token restart, until the parser is back at the
+    # start of an old statement that starts at or after token resume
+    # (those are token_delta tokens away now)
+    def __reparse(self, restart, resume, token_delta):
+        stmts, starts, ends = self.stmts, self.starts, self.ends
+        first = bisect.bisect_left(ends, restart)
+        if self.gap is not None:
+            first = min(first, self.gap)
+        position = ends[first - 1] if first else 0
+        # the first old statement that can be reused
+        reusable = bisect.bisect_left(starts, resume)
+        if self.gap is not None:
+            reusable = max(reusable, self.gap)
+        token_array = token_buffer.TokenArray(self.tokens)
+        token_array.index = position
+        the_parser = parser.Parser(token_array)
+        new_stmts = ast.StmtList()
+        new_starts = []
+        new_ends = []
+        reuse = len(stmts)
+        try:
+            while True:
+                new_starts.append(position)
+                if not the_parser.parse_stmt(new_stmts):
+                    new_starts.pop()
+                    break
+                position = parser_position(the_parser, token_array)
+                new_ends.append(position)
+                old = bisect.bisect_left(starts, position - token_delta, reusable)
+                if old < len(starts) and starts[old] == position - token_delta:
+                    reuse = old
+                    break
+        except error.MyPLError as e:
+            # keep what is still valid: the statements before first and
+            # the ones after the edit, and re-parse the rest next time
+            self.__splice(first, [], [], [], reusable, token_delta)
+            self.gap = first
+            self.reparsed = len(new_stmts.stmts)
+            return self.__failed(e)
+        self.__splice(first, new_stmts.stmts, new_starts, new_ends, reuse, token_delta)
+        self.gap = None
+        self.reparsed = len(new_stmts.stmts)
+        self.error = None
+        self.stmt_list = ast.StmtList()
+        self.stmt_list.stmts = list(self.stmts)
+        return self.stmt_list
+
+    # replaces the old statements first to reuse - 1 with new ones
+    def __splice(self, first, stmts, starts, ends, reuse, token_delta):
+        self.stmts[first:] = stmts + self.stmts[reuse:]
+        self.starts[first:] = starts + [start + token_delta for start in self.starts[reuse:]]
+        self.ends[first:] = ends + [end + token_delta for end in self.ends[reuse:]]
+
+
+# the value a dependency has when its name is not declared
+MISSING = object()
+
+# the symbol table environment of the program's top level names (the
+# TypeChecker keeps the built in functions in environment 0)
+PROGRAM = 1
+
+
+class Declaration(object):
+    """What checking one top level statement read and did: the global
+    names and struct layouts it read with the values they had, the
+    names and layouts it declared, the current type before and after
+    it, and the error it raised (or None)"""
+
+    def __init__(self, stmt, current_type):
+        self.stmt = stmt
+        self.current_type_in = current_type
+        self.current_type = current_type
+        self.reads = {}             # name -> info (or MISSING)
+        self.layout_reads = {}      # struct name -> layout (or MISSING)
+        self.writes = {}            # name -> info
+        self.layout_writes = {}     # struct name -> layout
+        self.error = None
+
+    def valid(self, names, layouts, current_type):
+        """True if checking the statement again, after the declarations
+        in names and layouts, would do the same"""
+        if self.current_type_in != current_type:
+            return False
+        for name, info in self.reads.items():
+            if names.get(name, MISSING) != info:
+                return False
+        for name, layout in self.layout_reads.items():
+            if layouts.get(name, MISSING) != layout:
+                return False
+        return True
+
+    def dependencies(self):
+        """The global names the statement depends on"""
+        return set(self.reads) | set(self.layout_reads)
+
+
+class TrackingSymbolTable(symbol_table.FlatSymbolTable):
+    """A FlatSymbolTable that records in a Declaration the reads and
+    writes of names in the program environment"""
+
+    def __init__(self, declaration, names):
+        symbol_table.FlatSymbolTable.__init__(self)
+        self.declaration = declaration
+        self.names = names          # the top level names declared before
+        self.written = set()
+
+    def depend(self, identifier):
+        if identifier not in self.written and identifier not in self.declaration.reads:
+            self.declaration.reads[identifier] = self.names.get(identifier, MISSING)
+
+    # records a read unless a local declaration hides the global name
+    def __read(self, identifier):
+        stack = self.bindings.get(identifier)
+        if stack is None or stack[-1][0] <= PROGRAM:
+            self.depend(identifier)
+
+    def id_exists(self, identifier):
+        self.__read(identifier)
+        return symbol_table.FlatSymbolTable.id_exists(self, identifier)
+
+    def get_info(self, identifier):
+        self.__read(identifier)
+        return symbol_table.FlatSymbolTable.get_info(self, identifier)
+
+    def add_id(self, identifier):
+        if len(self.undo) - 1 == PROGRAM:
+            self.written.add(identifier)
+        symbol_table.FlatSymbolTable.add_id(self, identifier)
+
+    def set_info(self, identifier, info):
+        stack = self.bindings.get(identifier)
+        if stack is not None and stack[-1][0] == PROGRAM:
+            self.written.add(identifier)
+        symbol_table.FlatSymbolTable.set_info(self, identifier, info)
+
+
+class TrackingLayouts(dict):
+    """The TypeChecker's struct layouts, recording reads and writes"""
+
+    def __init__(self, declaration, layouts):
+        dict.__init__(self, layouts)
+        self.declaration = declaration
+
+    def get(self, name, default=None):
+        if name not in self.declaration.layout_writes \
+                and name not in self.declaration.layout_reads:
+            self.declaration.layout_reads[name] = dict.get(self, name, MISSING)
+        return dict.get(self, name, default)
+
+    def __setitem__(self, name, layout):
+        self.declaration.layout_writes[name] = layout
+        dict.__setitem__(self, name, layout)
+
+
+class TrackingTypeChecker(type_checker.TypeChecker):
+    """A TypeChecker for one top level statement that also records
+    the struct types named in new and in declared types"""
+
+    def visit_var_decl_stmt(self, var_decl):
+        if var_decl.var_type != token.NIL and var_decl.var_type.tokentype == token.ID:
+            self.sym_table.depend(var_decl.var_type.lexeme)
+        type_checker.TypeChecker.visit_var_decl_stmt(self, var_decl)
+
+    def visit_fun_decl_stmt(self, fun_decl):
+        if fun_decl.return_type.tokentype == token.ID:
+            self.sym_table.depend(fun_decl.return_type.lexeme)
+        type_checker.TypeChecker.visit_fun_decl_stmt(self, fun_decl)
+
+    def visit_fun_param(self, fun_param):
+        if fun_param.param_type.tokentype == token.ID:
+            self.sym_table.depend(fun_param.param_type.lexeme)
+        type_checker.TypeChecker.visit_fun_param(self, fun_param)
+
+    def visit_new_rvalue(self, new_rvalue):
+        self.sym_table.depend(new_rvalue.struct_type.lexeme)
+        type_checker.TypeChecker.visit_new_rvalue(self, new_rvalue)
+
+
+class IncrementalChecker(object):
+    """Type checks programs like TypeChecker (check() raises the same
+    first MyPLError), reusing the results for the top level statements
+    of the last program checked that are the same nodes and whose
+    dependencies did not change"""
+
+    def __init__(self):
+        self.declarations = {}  # id(stmt) -> Declaration
+        self.checked = 0        # statements checked by the last check()
+
+    def check(self, stmt_list):
+        names = {}
+        layouts = {}
+        current_type = None
+        self.checked = 0
+        found = {}
+        try:
+            for stmt in stmt_list.stmts:
+                declaration = self.declarations.get(id(stmt))
+                # (an error is checked again, its position may have moved)
+                if declaration is None or declaration.stmt is not stmt \
+                        or declaration.error is not None \
+                        or not declaration.valid(names, layouts, current_type):
+                    declaration = self.__check(stmt, names, layouts, current_type)
+                found[id(stmt)] = declaration
+                if declaration.error is not None:
+                    raise declaration.error.with_traceback(None)
+                names.update(declaration.writes)
+                layouts.update(declaration.layout_writes)
+                current_type = declaration.current_type
+        finally:
+            # keep what is known about the statements still in the program
+            for stmt in stmt_list.stmts:
+                if id(stmt) not in found and id(stmt) in self.declarations:
+                    found[id(stmt)] = self.declarations[id(stmt)]
+            self.declarations = found
+
+    def __check(self, stmt, names, layouts, current_type):
+        declaration = Declaration(stmt, current_type)
+        table = TrackingSymbolTable(declaration, names)
+        checker = TrackingTypeChecker(table)
+        # the program environment, as TypeChecker.visit_stmt_list has it
+        table.push_environment()
+        for name, info in names.items():
+            symbol_table.FlatSymbolTable.add_id(table, name)
+            symbol_table.FlatSymbolTable.set_info(table, name, info)
+        checker.structs = TrackingLayouts(declaration, layouts)
+        checker.current_type = current_type
+        self.checked += 1
+        try:
+            stmt.accept(checker)
+        except error.MyPLError as e:
+            declaration.error = e
+        for name in table.written:
+            declaration.writes[name] = symbol_table.FlatSymbolTable.get_info(table, name)
+        declaration.current_type = checker.current_type
+        return declaration
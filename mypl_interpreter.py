@@ -0,0 +1,331 @@
+#!/usr/bin/python3
+#
+# Description: A tree walking interpreter for type checked MyPL
+# programs. Before running, the resolver gives every variable a
+# slot in a frame (a Python list), every struct field an offset in
+# its struct and every call the index of its function, so none of
+# them are looked up by name at run time.
+# ----------------------------------------------------------------------
+
+import sys
+
+import mypl_token as token
+import mypl_ast as ast
+import mypl_error as error
+import mypl_resolver as resolver
+
+
+class StructObject(object):
+    """A struct instance on the heap. Compared by identity"""
+    __slots__ = ('struct_type', 'fields')
+
+    def __init__(self, struct_type, fields):
+        self.struct_type = struct_type  # name of the struct
+        self.fields = fields            # field values, by field offset
+
+
+class Builtins(object):
+    """The built-in functions, shared by the interpreter and the VM.
+    Each takes the argument values and the function name token (for
+    errors) and returns the result"""
+    def __init__(self, output_stream=sys.stdout, input_stream=sys.stdin):
+        self.output_stream = output_stream
+        self.input_stream = input_stream
+        self.functions = {
+            'print': self.__print,
+            'println': self.__println,
+            'length': self.__length,
+            'get': self.__get,
+            'itof': self.__itof,
+            'itos': self.__itos,
+            'ftos': self.__ftos,
+            'stoi': self.__stoi,
+            'stof': self.__stof,
+            'reads': self.__reads,
+            'readi': self.__readi,
+            'readf': self.__readf,
+        }
+
+    def __error(self, error_msg, target_token):
+        raise error.MyPLError(error_msg, target_token.line, target_token.column)
+
+    def call(self, fun_token, args):
+        if None in args:
+            self.__error('nil value in function call', fun_token)
+        return self.functions[fun_token.lexeme](args, fun_token)
+
+    def __print(self, args, fun_token):
+        self.output_stream.write(args[0])
+
+    def __println(self, args, fun_token):
+        self.output_stream.write(args[0] + '\n')
+
+    def __length(self, args, fun_token):
+        return len(args[0])
+
+    def __get(self, args, fun_token):
+        index, string = args
+        if not 0 <= index < len(string):
+            self.__error('invalid index in get', fun_token)
+        return string[index]
+
+    def __itof(self, args, fun_token):
+        return float(args[0])
+
+    def __itos(self, args, fun_token):
+        return str(args[0])
+
+    def __ftos(self, args, fun_token):
+        return str(args[0])
+
+    def __stoi(self, args, fun_token):
+        try:
+            return int(args[0])
+        except (TypeError, ValueError):
+            self.__error('invalid int value "%s"' % args[0], fun_token)
+
+    def __stof(self, args, fun_token):
+        try:
+            return float(args[0])
+        except (TypeError, ValueError):
+            self.__error('invalid float value "%s"' % args[0], fun_token)
+
+    def __reads(self, args, fun_token):
+        return self.input_stream.readline().rstrip('\n')
+
+    def __readi(self, args, fun_token):
+        return self.__stoi([self.__reads(args, fun_token)], fun_token)
+
+    def __readf(self, args, fun_token):
+        return self.__stof([self.__reads(args, fun_token)], fun_token)
+
+
+class Interpreter(ast.Visitor):
+    """A MyPL interpreter visitor. Values are Python values (nil is
+    None, structs are StructObjects), and the value of the last
+    expression is kept in current_value"""
+    def __init__(self, output_stream=sys.stdout, input_stream=sys.stdin):
+        self.output_stream = output_stream
+        self.input_stream = input_stream
+        self.current_value = None
+        self.globals = []               # the global frame
+        self.frame = self.globals       # frame of the running function
+        self.returning = False          # set by return until the call ends
+        self.functions = []             # FunDeclStmts, by resolved slot
+        self.structs = {}               # struct name -> StructDeclStmt
+        self.builtins = Builtins(output_stream, input_stream)
+
+    def run(self, stmt_list):
+        """Resolves and runs a (type checked) program"""
+        the_resolver = resolver.Resolver()
+        stmt_list.accept(the_resolver)
+        self.globals.extend([None] * (the_resolver.global_size() - len(self.globals)))
+        self.functions = the_resolver.functions
+        stmt_list.accept(self)
+        self.returning = False
+
+    def run_stream(self, stmts):
+        """Resolves and runs a program given as its (type checked) top
+        level statements, each as it comes in, for example from
+        TypeChecker.check_stream(Parser.stream()). Only function and
+        struct declarations are kept once they ran"""
+        the_resolver = resolver.Resolver()
+        for stmt in the_resolver.resolve_stream(stmts):
+            self.globals.extend([None] * (the_resolver.global_size() - len(self.globals)))
+            self.functions = the_resolver.functions
+            stmt.accept(self)
+            if self.returning:
+                break
+        self.returning = False
+
+    def __error(self, error_msg, target_token):
+        s = error_msg
+        l = target_token.line
+        c = target_token.column
+        raise error.MyPLError(s, l, c)
+
+    # follows the struct fields in path[1:stop] starting from value
+    def __walk(self, value, path, offsets, stop):
+        for index in range(1, stop):
+            if value is None:
+                self.__error('nil value in path', path[index - 1])
+            value = value.fields[offsets[index - 1]]
+        if value is None and stop < len(path):
+            self.__error('nil value in path', path[stop - 1])
+        return value
+
+    def visit_stmt_list(self, stmt_list):
+        for stmt in stmt_list.stmts:
+            stmt.accept(self)
+            if self.returning:
+                return
+
+    def visit_expr_stmt(self, expr_stmt):
+        expr_stmt.expr.accept(self)
+
+    def visit_var_decl_stmt(self, var_decl):
+        var_decl.var_expr.accept(self)
+        self.frame[var_decl.slot] = self.current_value
+
+    def visit_assign_stmt(self, assign_stmt):
+        assign_stmt.rhs.accept(self)
+        lval = assign_stmt.lhs
+        frame = self.frame if lval.depth == 0 else self.globals
+        if len(lval.path) == 1:
+            frame[lval.slot] = self.current_value
+        else:
+            struct_object = self.__walk(frame[lval.slot], lval.path, lval.offsets,
+                                        len(lval.path) - 1)
+            struct_object.fields[lval.offsets[-1]] = self.current_value
+
+    def visit_struct_decl_stmt(self, struct_decl):
+        self.structs[struct_decl.struct_id.lexeme] = struct_decl
+
+    def visit_fun_decl_stmt(self, fun_decl):
+        pass
+
+    def visit_return_stmt(self, return_stmt):
+        if return_stmt.return_expr is not None:
+            return_stmt.return_expr.accept(self)
+        else:
+            self.current_value = None
+        self.returning = True
+
+    def visit_while_stmt(self, while_stmt):
+        bool_expr = while_stmt.bool_expr
+        stmt_list = while_stmt.stmt_list
+        while True:
+            bool_expr.accept(self)
+            if not self.current_value:
+                return
+            stmt_list.accept(self)
+            if self.returning:
+                return
+
+    def visit_if_stmt(self, if_stmt):
+        if_stmt.if_part.bool_expr.accept(self)
+        if self.current_value:
+            if_stmt.if_part.stmt_list.accept(self)
+            return
+        for basic_if in if_stmt.elseifs:
+            basic_if.bool_expr.accept(self)
+            if self.current_value:
+                basic_if.stmt_list.accept(self)
+                return
+        if if_stmt.has_else:
+            if_stmt.else_stmts.accept(self)
+
+    def visit_basic_if_stmt(self, basic_if_stmt):
+        basic_if_stmt.bool_expr.accept(self)
+        if self.current_value:
+            basic_if_stmt.stmt_list.accept(self)
+
+    def visit_simple_expr(self, simple_expr):
+        simple_expr.term.accept(self)
+
+    def visit_complex_expr(self, complex_expr):
+        complex_expr.first_operand.accept(self)
+        lhs = self.current_value
+        complex_expr.rest.accept(self)
+        rhs = self.current_value
+        op_token = complex_expr.math_rel
+        if lhs is None or rhs is None:
+            self.__error('nil value in expression', op_token)
+        op = op_token.tokentype
+        if op == token.PLUS:
+            self.current_value = lhs + rhs
+        elif op == token.MINUS:
+            self.current_value = lhs - rhs
+        elif op == token.MULTIPLY:
+            self.current_value = lhs * rhs
+        elif rhs == 0:
+            self.__error('division by zero', op_token)
+        elif op == token.DIVIDE:
+            if type(lhs) is int:
+                self.current_value = lhs // rhs
+            else:
+                self.current_value = lhs / rhs
+        else:
+            self.current_value = lhs % rhs
+
+    def visit_bool_expr(self, bool_expr):
+        bool_expr.first_expr.accept(self)
+        if bool_expr.bool_rel is not None:
+            lhs = self.current_value
+            bool_expr.second_expr.accept(self)
+            rhs = self.current_value
+            rel = bool_expr.bool_rel.tokentype
+            if rel == token.EQUAL:
+                self.current_value = lhs == rhs
+            elif rel == token.NOT_EQUAL:
+                self.current_value = lhs != rhs
+            elif lhs is None or rhs is None:
+                self.__error('nil value in comparison', bool_expr.bool_rel)
+            elif rel == token.LESS_THAN:
+                self.current_value = lhs < rhs
+            elif rel == token.LESS_THAN_EQUAL:
+                self.current_value = lhs <= rhs
+            elif rel == token.GREATER_THAN:
+                self.current_value = lhs > rhs
+            else:
+                self.current_value = lhs >= rhs
+        if bool_expr.bool_connector is not None:
+            # and / or only look at the rest when they need to
+            if bool_expr.bool_connector.tokentype == token.AND:
+                if self.current_value:
+                    bool_expr.rest.accept(self)
+            elif not self.current_value:
+                bool_expr.rest.accept(self)
+        if bool_expr.negated:
+            self.current_value = not self.current_value
+
+    def visit_lvalue(self, lval):
+        frame = self.frame if lval.depth == 0 else self.globals
+        self.current_value = self.__walk(frame[lval.slot], lval.path, lval.offsets,
+                                         len(lval.path))
+
+    def visit_fun_param(self, fun_param):
+        pass
+
+    def visit_simple_rvalue(self, simple_rvalue):
+        self.current_value = simple_rvalue.value
+
+    def visit_new_rvalue(self, new_rvalue):
+        struct_decl = self.structs[new_rvalue.struct_type.lexeme]
+        fields = []
+        # field initializers were resolved against the global frame
+        frame = self.frame
+        self.frame = self.globals
+        for var_decl in struct_decl.var_decls:
+            var_decl.accept(self)
+            fields.append(self.current_value)
+        self.frame = frame
+        self.current_value = StructObject(struct_decl.struct_id.lexeme, fields)
+
+    def visit_call_rvalue(self, call_rvalue):
+        args = []
+        for arg in call_rvalue.args:
+            arg.accept(self)
+            args.append(self.current_value)
+        if call_rvalue.slot is None:
+            self.current_value = self.builtins.call(call_rvalue.fun, args)
+            return
+        fun_decl = self.functions[call_rvalue.slot]
+        frame = [None] * fun_decl.frame_size
+        for param, value in zip(fun_decl.params, args):
+            frame[param.slot] = value
+        caller_frame = self.frame
+        self.frame = frame
+        fun_decl.stmt_list.accept(self)
+        if not self.returning:
+            self.current_value = None
+        self.returning = False
+        self.frame = caller_frame
+
+    def visit_id_rvalue(self, id_rvalue):
+        frame = self.frame if id_rvalue.depth == 0 else self.globals
+        if len(id_rvalue.path) == 1:
+            self.current_value = frame[id_rvalue.slot]
+        else:
+            self.current_value = self.__walk(frame[id_rvalue.slot], id_rvalue.path,
+                                             id_rvalue.offsets, len(id_rvalue.path))
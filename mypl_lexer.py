@@ -10,75 +10,62 @@
 import mypl_token as token
 import mypl_error as error
 
+# lexeme -> token type for every fixed lexeme in the language
+TOKEN_TYPES = dict(token.PUNCTUATION)
+TOKEN_TYPES.update(token.TWO_CHAR_OPERATORS)
+TOKEN_TYPES.update(token.KEYWORDS)
+
 
 class Lexer(object):
-    def __init__(self, input_stream):
+    def __init__(self, input_stream, chunk_size=-1):
         self.line = 1
         self.column = 0  # index of a tokens first character
         self.input_stream = input_stream
         self.column_index = 0
         # index of pointer in the input stream
+        # characters are pulled from the stream in blocks of chunk_size
+        # (-1 reads the whole stream at once) and scanned with an
+        # integer cursor instead of seeking the stream per character
+        self.chunk_size = chunk_size
+        self.buffer = ''
+        self.buffer_index = 0
+        self.stream_done = False
+
+    # pulls the next block of characters into the buffer
+    def __fill(self):
+        chunk = self.input_stream.read(self.chunk_size)
+        if chunk == '' or self.chunk_size < 0:
+            self.stream_done = True
+        self.buffer = self.buffer[self.buffer_index:] + chunk
+        self.buffer_index = 0
 
     def __peek(self):
-        pos = self.input_stream.tell()
-        symbol = self.input_stream.read(1)
-        self.input_stream.seek(pos)
-        return symbol
+        if self.buffer_index >= len(self.buffer):
+            if self.stream_done:
+                return ''
+            self.__fill()
+            if self.buffer_index >= len(self.buffer):
+                return ''
+        return self.buffer[self.buffer_index]
 
     def __read(self):
-        if self.__peek() == '\n':
+        symbol = self.__peek()
+        if symbol == '\n':
             self.line += 1
             self.column = 0
             self.column_index = 0
         else:
             self.column_index += 1
-        return self.input_stream.read(1)
+        if symbol != '':
+            self.buffer_index += 1
+        return symbol
 
     # this function checks to see if there are
     #  any unusual characters that should end the token
     def check_char(self):
-        if self.__peek() == '':
-            return 0
-        elif self.__peek() == ",":
-            return 0
-        elif self.__peek() == '=':
-            return 0
-        elif self.__peek() == "#":
-            return 0
-        elif self.__peek() == '>':
-            return 0
-        elif self.__peek() == '<':
-            return 0
-        elif self.__peek() == '!':
-            return 0
-        elif self.__peek() == "'":
-            return 0
-        elif self.__peek() == ":":
-            return 0
-        elif self.__peek() == "/":
-            return 0
-        elif self.__peek() == ".":
-            return 0
-        elif self.__peek() == "(":
+        if self.__peek() in token.DELIMITERS:
             return 0
-        elif self.__peek() == ")":
-            return 0
-        elif self.__peek() == "-":
-            return 0
-        elif self.__peek() == "%":
-            return 0
-        elif self.__peek() == "*":
-            return 0
-        elif self.__peek() == "+":
-            return 0
-        elif self.__peek() == ";":
-            return 0
-        elif self.__peek() == " ":
-            return 0
-        elif self.__peek() == "\n":
-            return 0
-        else:
-            return 1
+        return 1
 
     # this function checks for comments
     def __comment_check(self):
@@ -118,9 +105,8 @@ class Lexer(object):
                 e = error.MyPLError(error_message, self.line, self.column_index - 1)
                 raise e
             # checks for comparison operators
-            if item == '=' or item == '>' or item == '<' or item == '!':
-                if self.__peek() == '=':
-                    item += self.__read()
+            if item + self.__peek() in token.TWO_CHAR_OPERATORS:
+                item += self.__read()
 
         elif self.__peek() == '"':  # string value
             self.column += 1  # increments column to a tokens starting index
@@ -166,11 +152,8 @@ class Lexer(object):
                     else:
                         self.__comment_check()
                         item += self.__read()
-        if not isStringVal:
-            if item == "string": # strips spaces
-                tokentype = token.STRINGTYPE
-            else:
-                item = item.strip()
+        if not isStringVal:  # strips spaces
+            item = item.strip()
 
         if item.isnumeric() and tokentype != token.STRINGVAL:  # int and float check
             if self.__peek() == ".":
@@ -196,86 +179,10 @@ class Lexer(object):
                 tokentype = token.FLOATVAL
             else:
                 tokentype = token.INTVAL
-        # checks if the token is a special character and sets token type accordingly
+        # checks if the token is a special character or a reserved word
+        # and sets token type accordingly
         if not isStringVal:
-            if item == "=":
-                tokentype = token.ASSIGN
-            elif item == ",":
-                tokentype = token.COMMA
-            elif item == ":":
-                tokentype = token.COLON
-            elif item == "/":
-                tokentype = token.DIVIDE
-            elif item == ".":
-                tokentype = token.DOT
-            elif item == "==":
-                tokentype = token.EQUAL
-            elif item == ">":
-                tokentype = token.GREATER_THAN
-            elif item == ">=":
-                tokentype = token.GREATER_THAN_EQUAL
-            elif item == "<":
-                tokentype = token.LESS_THAN
-            elif item == "<=":
-                tokentype = token.LESS_THAN_EQUAL
-            elif item == "!=":
-                tokentype = token.NOT_EQUAL
-            elif item == "(":
-                tokentype = token.LPAREN
-            elif item == ")":
-                tokentype = token.RPAREN
-            elif item == "-":
-                tokentype = token.MINUS
-            elif item == "%":
-                tokentype = token.MODULO
-            elif item == "*":
-                tokentype = token.MULTIPLY
-            elif item == "+":
-                tokentype = token.PLUS
-            elif item == "true" or item == "false":
-                tokentype = token.BOOLVAL
-            elif item == ";":
-                tokentype = token.SEMICOLON
-            elif item == "bool":
-                tokentype = token.BOOLTYPE
-            elif item == "int":
-                tokentype = token.INTTYPE
-            elif item == "float":
-                tokentype = token.FLOATTYPE
-            elif item == "struct":
-                tokentype = token.STRUCTTYPE
-            elif item == "and":
-                tokentype = token.AND
-            elif item == "or":
-                tokentype = token.OR
-            elif item == "not":
-                tokentype = token.NOT
-            elif item == "while":
-                tokentype = token.WHILE
-            elif item == "do":
-                tokentype = token.DO
-            elif item == "if":
-                tokentype = token.IF
-            elif item == "then":
-                tokentype = token.THEN
-            elif item == "else":
-                tokentype = token.ELSE
-            elif item == "elif":
-                tokentype = token.ELIF
-            elif item == "end":
-                tokentype = token.END
-            elif item == "fun":
-                tokentype = token.FUN
-            elif item == "var":
-                tokentype = token.VAR
-            elif item == "set":
-                tokentype = token.SET
-            elif item == "return":
-                tokentype = token.RETURN
-            elif item == "new":
-                tokentype = token.NEW
-            elif item == "nil":
-                tokentype = token.NIL
+            tokentype = TOKEN_TYPES.get(item, tokentype)
 
         final_token = token.Token(tokentype, item, self.line, self.column)
         self.column = self.column_index  # sets column to new value
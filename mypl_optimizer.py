@@ -0,0 +1,546 @@
+#!/usr/bin/python3
+#
+# Description: Optimization passes over type checked MyPL programs.
+# They change the AST in place and run after the TypeChecker and
+# before the resolver. The ConstantFolder computes the operations on
+# literals ahead of time and removes the if and while branches whose
+# conditions are constant. The DeadCodeEliminator removes code that
+# never runs and declarations that are never used.
+# ----------------------------------------------------------------------
+
+import math
+
+import mypl_token as token
+import mypl_ast as ast
+
+
+class Variable(object):
+    """The value of an expression that is only known at run time"""
+
+    def __repr__(self):
+        return 'VARIABLE'
+
+
+VARIABLE = Variable()
+
+# Python type of a folded value -> token type of its literal
+LITERAL_TYPES = {
+    bool: token.BOOLVAL,
+    int: token.INTVAL,
+    float: token.FLOATVAL,
+    str: token.STRINGVAL,
+}
+
+
+def literal_value(val):
+    """The value of a literal token (as the resolver computes it)"""
+    if val.tokentype == token.INTVAL:
+        return int(val.lexeme)
+    elif val.tokentype == token.FLOATVAL:
+        return float(val.lexeme)
+    elif val.tokentype == token.BOOLVAL:
+        return val.lexeme == 'true'
+    elif val.tokentype == token.STRINGVAL:
+        return val.lexeme
+    return None
+
+
+def operate(math_rel, lhs, rhs):
+    """lhs math_rel rhs as the interpreter computes it, or VARIABLE if
+    it would fail at run time (nil operands, division by zero) or its
+    result has no literal"""
+    if type(lhs) is not type(rhs) or type(lhs) not in (int, float, str):
+        return VARIABLE
+    if type(lhs) is str and math_rel != token.PLUS:
+        return VARIABLE
+    if math_rel == token.PLUS:
+        result = lhs + rhs
+    elif math_rel == token.MINUS:
+        result = lhs - rhs
+    elif math_rel == token.MULTIPLY:
+        result = lhs * rhs
+    elif rhs == 0:
+        return VARIABLE
+    elif math_rel == token.DIVIDE:
+        result = lhs // rhs if type(lhs) is int else lhs / rhs
+    else:
+        result = lhs % rhs
+    if type(result) is float and not math.isfinite(result):
+        return VARIABLE
+    return result
+
+
+def compare(bool_rel, lhs, rhs):
+    """lhs bool_rel rhs as the interpreter computes it, or VARIABLE if
+    it would fail at run time"""
+    if bool_rel == token.EQUAL:
+        return lhs == rhs
+    elif bool_rel == token.NOT_EQUAL:
+        return lhs != rhs
+    elif lhs is None or rhs is None:
+        return VARIABLE
+    elif bool_rel == token.LESS_THAN:
+        return lhs < rhs
+    elif bool_rel == token.LESS_THAN_EQUAL:
+        return lhs <= rhs
+    elif bool_rel == token.GREATER_THAN:
+        return lhs > rhs
+    return lhs >= rhs
+
+
+def constant_value(expr):
+    """The value of an expression made of literals and math operations
+    (VARIABLE if it has anything else or an operation does not fold).
+    Unlike the ConstantFolder it leaves the expression as it is"""
+    chain = []
+    while type(expr) is ast.ComplexExpr:
+        chain.append(expr)
+        expr = expr.rest
+    if type(expr) is not ast.SimpleExpr or type(expr.term) is not ast.SimpleRValue:
+        return VARIABLE
+    value = literal_value(expr.term.val)
+    for complex_expr in reversed(chain):
+        first = complex_expr.first_operand
+        if type(first) is not ast.SimpleExpr or type(first.term) is not ast.SimpleRValue:
+            return VARIABLE
+        value = operate(complex_expr.math_rel.tokentype, literal_value(first.term.val), value)
+        if value is VARIABLE:
+            return VARIABLE
+    return value
+
+
+class ConstantFolder(ast.Visitor):
+    """Replaces the expressions (and the ends of a op b op c chains)
+    that only use literals by the literal of their value, and prunes
+    the if and while branches with constant conditions. A block that
+    always runs takes the place of its if statement when it declares
+    no variables. folded counts the operations computed and pruned
+    the branches removed"""
+    def __init__(self):
+        self.current_value = VARIABLE   # value of the last expression
+        self.current_token = None       # first token of the last constant
+        self.replacement = None         # statements in place of the last one
+        self.folded = 0
+        self.pruned = 0
+
+    def fold_stream(self, stmts):
+        """Folds a program given as its top level statements (as from
+        TypeChecker.check_stream()) and yields the statements that
+        take their place"""
+        for stmt in stmts:
+            yield from self.__fold_stmt(stmt)
+
+    # folds a statement, returns the statements to put in its place
+    def __fold_stmt(self, stmt):
+        if isinstance(stmt, ast.Expr):
+            return [self.__fold(stmt)]
+        self.replacement = None
+        self.visit(stmt)
+        if self.replacement is None:
+            return [stmt]
+        replacement = self.replacement
+        self.replacement = None
+        return replacement
+
+    # folds an expression, returns the node to put in its place (a
+    # literal SimpleExpr if all of it is constant)
+    def __fold(self, expr):
+        self.visit(expr)
+        if self.current_value is VARIABLE or type(expr) is not ast.ComplexExpr:
+            return expr
+        return self.__simple_expr(self.current_value, self.current_token)
+
+    def __literal(self, value, at_token):
+        simple_rvalue = ast.SimpleRValue()
+        if value is None:
+            tokentype, lexeme = token.NIL, 'nil'
+        elif type(value) is bool:
+            tokentype, lexeme = token.BOOLVAL, 'true' if value else 'false'
+        elif type(value) is float:
+            tokentype, lexeme = token.FLOATVAL, repr(value)
+        else:
+            tokentype, lexeme = LITERAL_TYPES[type(value)], str(value)
+        simple_rvalue.val = token.Token(tokentype, lexeme, at_token.line, at_token.column)
+        simple_rvalue.value = value
+        return simple_rvalue
+
+    def __simple_expr(self, value, at_token):
+        simple_expr = ast.SimpleExpr()
+        simple_expr.term = self.__literal(value, at_token)
+        return simple_expr
+
+    # a condition that is always value (for a loop that always runs)
+    def __constant_condition(self, bool_expr, value, at_token):
+        bool_expr.first_expr = self.__simple_expr(bool(value), at_token)
+        bool_expr.bool_rel = None
+        bool_expr.second_expr = None
+        bool_expr.bool_connector = None
+        bool_expr.rest = None
+        bool_expr.negated = False
+
+    # a block that always runs: its statements if it declares nothing
+    # (so they cannot clash with names outside), else an if statement
+    # with a true condition around it
+    def __unconditional(self, stmt_list, at_token):
+        if not any(type(stmt) is ast.VarDeclStmt for stmt in stmt_list.stmts):
+            return stmt_list.stmts
+        if_stmt = ast.IfStmt()
+        if_stmt.if_part.bool_expr = ast.BoolExpr()
+        self.__constant_condition(if_stmt.if_part.bool_expr, True, at_token)
+        if_stmt.if_part.stmt_list = stmt_list
+        return [if_stmt]
+
+    def visit_stmt_list(self, stmt_list):
+        stmts = []
+        for stmt in stmt_list.stmts:
+            stmts.extend(self.__fold_stmt(stmt))
+        stmt_list.stmts = stmts
+
+    def visit_expr_stmt(self, expr_stmt):
+        expr_stmt.expr = self.__fold(expr_stmt.expr)
+
+    def visit_var_decl_stmt(self, var_decl):
+        var_decl.var_expr = self.__fold(var_decl.var_expr)
+
+    def visit_assign_stmt(self, assign_stmt):
+        assign_stmt.rhs = self.__fold(assign_stmt.rhs)
+
+    def visit_struct_decl_stmt(self, struct_decl):
+        for var_decl in struct_decl.var_decls:
+            self.visit(var_decl)
+
+    def visit_fun_decl_stmt(self, fun_decl):
+        self.visit(fun_decl.stmt_list)
+
+    def visit_return_stmt(self, return_stmt):
+        if return_stmt.return_expr is not None:
+            return_stmt.return_expr = self.__fold(return_stmt.return_expr)
+
+    def visit_while_stmt(self, while_stmt):
+        self.visit(while_stmt.bool_expr)
+        condition = self.current_value
+        if condition is not VARIABLE and not condition:
+            # the body never runs (and the condition has no effects)
+            self.pruned += 1
+            self.replacement = []
+            return
+        if condition is not VARIABLE:
+            self.__constant_condition(while_stmt.bool_expr, condition, self.current_token)
+        self.visit(while_stmt.stmt_list)
+
+    def visit_if_stmt(self, if_stmt):
+        kept = []                   # the branches that may run
+        else_stmts = if_stmt.else_stmts if if_stmt.has_else else None
+        at_token = None
+        branches = [if_stmt.if_part] + if_stmt.elseifs
+        for index, basic_if in enumerate(branches):
+            self.visit(basic_if.bool_expr)
+            condition = self.current_value
+            if condition is VARIABLE:
+                self.visit(basic_if.stmt_list)
+                kept.append(basic_if)
+            elif condition:
+                # taken whenever it is reached, so it is the else part
+                # and the branches after it never run
+                self.pruned += len(branches) - index - 1 + (else_stmts is not None)
+                at_token = self.current_token
+                else_stmts = basic_if.stmt_list
+                self.visit(else_stmts)
+                break
+            else:
+                self.pruned += 1
+        else:
+            if else_stmts is not None:
+                at_token = at_token or self.current_token
+                self.visit(else_stmts)
+        if kept:
+            if_stmt.if_part = kept[0]
+            if_stmt.elseifs = kept[1:]
+            if_stmt.has_else = else_stmts is not None
+            if_stmt.else_stmts = else_stmts if else_stmts is not None else ast.StmtList()
+        elif else_stmts is not None:
+            self.replacement = self.__unconditional(else_stmts, at_token)
+        else:
+            self.replacement = []
+
+    def visit_simple_expr(self, simple_expr):
+        term = simple_expr.term
+        self.visit(term)
+        if self.current_value is not VARIABLE and type(term) is not ast.SimpleRValue:
+            simple_expr.term = self.__literal(self.current_value, self.current_token)
+
+    def visit_complex_expr(self, complex_expr):
+        # a op b op c is nested to the right, so a constant end of the
+        # chain folds into one literal even if its start does not
+        chain = []                  # the ComplexExprs, outermost first
+        operands = []               # (value, token) of their first operands
+        while type(complex_expr) is ast.ComplexExpr:
+            chain.append(complex_expr)
+            self.visit(complex_expr.first_operand)
+            operands.append((self.current_value, self.current_token))
+            complex_expr = complex_expr.rest
+        self.visit(complex_expr)
+        value = self.current_value
+        at_token = self.current_token
+        constant_from = len(chain)  # chain[constant_from:] folds into value
+        while constant_from > 0 and value is not VARIABLE:
+            lhs, lhs_token = operands[constant_from - 1]
+            if lhs is VARIABLE:
+                break
+            result = operate(chain[constant_from - 1].math_rel.tokentype, lhs, value)
+            if result is VARIABLE:
+                break
+            value = result
+            at_token = lhs_token
+            constant_from -= 1
+            self.folded += 1
+        if constant_from == 0:
+            self.current_value = value
+            self.current_token = at_token
+            return
+        if constant_from < len(chain):
+            chain[constant_from - 1].rest = self.__simple_expr(value, at_token)
+        self.current_value = VARIABLE
+
+    def visit_bool_expr(self, bool_expr):
+        bool_expr.first_expr = self.__fold(bool_expr.first_expr)
+        value = self.current_value
+        at_token = self.current_token
+        if bool_expr.bool_rel is not None:
+            bool_expr.second_expr = self.__fold(bool_expr.second_expr)
+            if value is not VARIABLE and self.current_value is not VARIABLE:
+                value = compare(bool_expr.bool_rel.tokentype, value, self.current_value)
+            else:
+                value = VARIABLE
+        if bool_expr.bool_connector is not None:
+            self.visit(bool_expr.rest)
+            # and / or only look at the rest when they need to
+            if value is VARIABLE:
+                pass
+            elif bool_expr.bool_connector.tokentype == token.AND:
+                if value:
+                    value = self.current_value
+            elif not value:
+                value = self.current_value
+        if bool_expr.negated and value is not VARIABLE:
+            value = not value
+        self.current_value = value
+        self.current_token = at_token
+
+    def visit_lvalue(self, lval):
+        self.current_value = VARIABLE
+
+    def visit_simple_rvalue(self, simple_rvalue):
+        self.current_value = literal_value(simple_rvalue.val)
+        self.current_token = simple_rvalue.val
+
+    def visit_new_rvalue(self, new_rvalue):
+        self.current_value = VARIABLE
+
+    def visit_call_rvalue(self, call_rvalue):
+        call_rvalue.args = [self.__fold(arg) for arg in call_rvalue.args]
+        self.current_value = VARIABLE
+
+    def visit_id_rvalue(self, id_rvalue):
+        self.current_value = VARIABLE
+
+
+class References(ast.Visitor):
+    """Finds what each part of a program uses. The parts are the top
+    level code (None), and every function and struct declaration. A
+    part uses the functions it calls, the structs it names (by name)
+    and the variable declarations it reads or sets. Names are scoped
+    as the resolver scopes them"""
+    def __init__(self):
+        self.scopes = [{}]      # name -> VarDeclStmt (None for params and fields)
+        self.functions = {}     # fun name -> the FunDeclStmt a call refers to
+        self.structs = {}       # struct name -> its StructDeclStmts
+        self.part = None        # the declaration being visited
+        self.uses = {None: set()}   # part -> what it uses
+
+    def __use(self, used):
+        self.uses[self.part].add(used)
+
+    # uses the struct named by a type token (if it names one)
+    def __use_type(self, type_token):
+        if type_token != token.NIL and type_token.tokentype == token.ID:
+            self.__use(type_token.lexeme)
+
+    def __use_variable(self, name):
+        for scope in reversed(self.scopes):
+            if name in scope:
+                if scope[name] is not None:
+                    self.__use(scope[name])
+                return
+
+    def reachable(self):
+        """The declarations used from the top level code, directly or
+        through other declarations, and the variable declarations they
+        use"""
+        parts = {None}
+        variables = set()
+        work = [None]
+        while work:
+            for used in self.uses[work.pop()]:
+                if type(used) is ast.VarDeclStmt:
+                    variables.add(used)
+                    continue
+                for part in self.structs.get(used, []) if type(used) is str else [used]:
+                    if part not in parts:
+                        parts.add(part)
+                        work.append(part)
+        return parts, variables
+
+    def visit_stmt_list(self, stmt_list):
+        self.scopes.append({})
+        for stmt in stmt_list.stmts:
+            self.visit(stmt)
+        self.scopes.pop()
+
+    def visit_var_decl_stmt(self, var_decl):
+        self.visit(var_decl.var_expr)
+        self.__use_type(var_decl.var_type)
+        self.scopes[-1][var_decl.var_id.lexeme] = var_decl
+
+    def visit_assign_stmt(self, assign_stmt):
+        self.visit(assign_stmt.rhs)
+        self.visit(assign_stmt.lhs)
+
+    def visit_struct_decl_stmt(self, struct_decl):
+        self.structs.setdefault(struct_decl.struct_id.lexeme, []).append(struct_decl)
+        outer_part = self.part
+        self.part = struct_decl
+        self.uses[struct_decl] = set()
+        self.scopes.append({})
+        for var_decl in struct_decl.var_decls:
+            self.visit(var_decl.var_expr)
+            self.__use_type(var_decl.var_type)
+            self.scopes[-1][var_decl.var_id.lexeme] = None
+        self.scopes.pop()
+        self.part = outer_part
+
+    def visit_fun_decl_stmt(self, fun_decl):
+        # registered first so the function can call itself
+        self.functions[fun_decl.fun_name.lexeme] = fun_decl
+        outer_part = self.part
+        self.part = fun_decl
+        self.uses[fun_decl] = set()
+        self.__use_type(fun_decl.return_type)
+        self.scopes.append({})
+        for param in fun_decl.params:
+            self.__use_type(param.param_type)
+            self.scopes[-1][param.param_name.lexeme] = None
+        self.visit(fun_decl.stmt_list)
+        self.scopes.pop()
+        self.part = outer_part
+
+    def visit_return_stmt(self, return_stmt):
+        if return_stmt.return_expr is not None:
+            self.visit(return_stmt.return_expr)
+
+    def visit_while_stmt(self, while_stmt):
+        self.visit(while_stmt.bool_expr)
+        self.visit(while_stmt.stmt_list)
+
+    def visit_if_stmt(self, if_stmt):
+        self.visit(if_stmt.if_part)
+        for basic_if in if_stmt.elseifs:
+            self.visit(basic_if)
+        if if_stmt.has_else:
+            self.visit(if_stmt.else_stmts)
+
+    def visit_basic_if_stmt(self, basic_if_stmt):
+        self.visit(basic_if_stmt.bool_expr)
+        self.visit(basic_if_stmt.stmt_list)
+
+    def visit_simple_expr(self, simple_expr):
+        self.visit(simple_expr.term)
+
+    def visit_complex_expr(self, complex_expr):
+        while type(complex_expr) is ast.ComplexExpr:
+            self.visit(complex_expr.first_operand)
+            complex_expr = complex_expr.rest
+        self.visit(complex_expr)
+
+    def visit_bool_expr(self, bool_expr):
+        self.visit(bool_expr.first_expr)
+        if bool_expr.bool_rel is not None:
+            self.visit(bool_expr.second_expr)
+        if bool_expr.bool_connector is not None:
+            self.visit(bool_expr.rest)
+
+    def visit_lvalue(self, lval):
+        self.__use_variable(lval.path[0].lexeme)
+
+    def visit_new_rvalue(self, new_rvalue):
+        self.__use(new_rvalue.struct_type.lexeme)
+
+    def visit_call_rvalue(self, call_rvalue):
+        for arg in call_rvalue.args:
+            self.visit(arg)
+        fun_decl = self.functions.get(call_rvalue.fun.lexeme)
+        if fun_decl is not None:
+            self.__use(fun_decl)
+
+    def visit_id_rvalue(self, id_rvalue):
+        self.__use_variable(id_rvalue.path[0].lexeme)
+
+
+class DeadCodeEliminator(object):
+    """Removes the code that never runs or whose result is never used:
+    the statements after a return in a block, the functions no call
+    from running code reaches, the structs no running code names in a
+    new or a type, and the variable declarations that nothing refers
+    to and whose value has no effect. Counts what it removed by kind"""
+    def __init__(self):
+        self.statements = 0     # statements after a return
+        self.functions = 0
+        self.structs = 0
+        self.variables = 0
+
+    def eliminate(self, stmt_list):
+        """Removes the dead code of a program, until none is left (one
+        removal can leave more code unused)"""
+        removed = -1
+        while removed != self.removed():
+            removed = self.removed()
+            references = References()
+            references.visit(stmt_list)
+            parts, variables = references.reachable()
+            self.__prune(stmt_list, parts, variables)
+
+    def removed(self):
+        return self.statements + self.functions + self.structs + self.variables
+
+    # the value of expr has no effects and cannot fail at run time: a
+    # literal, a variable, or an operation on literals that folds
+    def __pure(self, expr):
+        if type(expr) is ast.SimpleExpr and type(expr.term) is ast.IDRvalue:
+            return len(expr.term.path) == 1
+        return constant_value(expr) is not VARIABLE
+
+    def __prune(self, stmt_list, parts, variables):
+        stmts = []
+        for index, stmt in enumerate(stmt_list.stmts):
+            stmt_type = type(stmt)
+            if stmt_type is ast.FunDeclStmt and stmt not in parts:
+                self.functions += 1
+                continue
+            if stmt_type is ast.StructDeclStmt and stmt not in parts:
+                self.structs += 1
+                continue
+            if stmt_type is ast.VarDeclStmt and stmt not in variables \
+                    and self.__pure(stmt.var_expr):
+                self.variables += 1
+                continue
+            stmts.append(stmt)
+            if stmt_type is ast.FunDeclStmt or stmt_type is ast.WhileStmt:
+                self.__prune(stmt.stmt_list, parts, variables)
+            elif stmt_type is ast.IfStmt:
+                for basic_if in [stmt.if_part] + stmt.elseifs:
+                    self.__prune(basic_if.stmt_list, parts, variables)
+                self.__prune(stmt.else_stmts, parts, variables)
+            elif stmt_type is ast.ReturnStmt:
+                self.statements += len(stmt_list.stmts) - index - 1
+                break
+        stmt_list.stmts = stmts
@@ -14,12 +14,34 @@ import mypl_lexer as lexer
 import mypl_token as token
 import mypl_ast as ast
 
+# tokens that end a block of statements
+BLOCK_END = frozenset([token.EOS, token.END, token.ELSE, token.ELIF])
+
+# tokens that can only start a top level declaration; in recovery
+# mode they also end a block that is missing its end
+DECL_START = frozenset([token.FUN, token.STRUCTTYPE])
+
+# tokens that open a block inside a statement
+BLOCK_START = frozenset([token.WHILE, token.IF])
+
 
 class Parser(object):
 
-    def __init__(self, lexer):
+    def __init__(self, lexer, recover=False):
+        # any lexer backend with a next_token() method works here
+        # (mypl_lexer.Lexer or mypl_regex_lexer.RegexLexer)
         self.lexer = lexer
         self.current_token = None
+        # in recovery mode a syntax error is added to diagnostics, the
+        # statement it is in becomes an ErrorStmt and parsing goes on
+        # after the statement; a lexer error ends the token stream
+        self.recover = recover
+        self.diagnostics = []
+        self.lex_error = None
+        # the name the statement being recovered declares, once read
+        self.declared_id = None
+        if recover:
+            self.__advance = self.__recovering_advance
 
     # starts analyzing the syntactical order of the program
     def parse(self):
@@ -31,10 +53,43 @@ class Parser(object):
         self.__eat(token.EOS, 'expecting end of file')
         return stmt_list_node
 
+    # parses the one top level statement at the current position
+    # (used to re-parse part of a program, see mypl_incremental)
+    def parse_stmt(self, stmt_list_node):
+        """appends the next top level statement to stmt_list_node,
+        returns False at the end of the file"""
+        if self.current_token is None:
+            self.__advance()
+        if self.current_token.tokentype == token.EOS:
+            return False
+        self.__stmt(stmt_list_node)
+        return True
+
+    def stream(self):
+        """yields the top level statements one at a time, each as soon
+        as it is parsed, so the whole program is never held at once"""
+        while True:
+            stmt_list_node = ast.StmtList()
+            if not self.parse_stmt(stmt_list_node):
+                return
+            yield from stmt_list_node.stmts
+
     # moves to the next character
     def __advance(self):
         self.current_token = self.lexer.next_token()
 
+    # __advance in recovery mode: after a lexer error, the current token
+    # stays an EOS in place of the rest of the source
+    def __recovering_advance(self):
+        if self.lex_error is not None:
+            return
+        try:
+            self.current_token = self.lexer.next_token()
+        except error.MyPLError as e:
+            self.lex_error = e
+            self.diagnostics.append(e)
+            self.current_token = token.Token(token.EOS, '', e.line, e.column)
+
     # checks if the next character is syntactically correct
     # and advances if true. otherwise this function spits out and error
     def __eat(self, tokentype, error_msg):
@@ -48,18 +103,108 @@ class Parser(object):
     # of the expected character and the location of hte error
     # in thj file
     def __error(self, error_msg):
+        raise self.__diagnostic(error_msg)
+
+    def __diagnostic(self, error_msg):
         s = error_msg + ', found "' + self.current_token.lexeme + '" in parser'
         l = self.current_token.line
         c = self.current_token.column
-        raise error.MyPLError(s, l, c)
+        e = error.MyPLError(s, l, c)
+        # errors after a lexer error only come from the EOS put in its place
+        if self.recover and self.lex_error is None:
+            self.diagnostics.append(e)
+        return e
+
+    # eats the end of a block; in recovery mode a missing end in front
+    # of a declaration or the end of the file is reported and the block
+    # is closed there
+    def __end_block(self):
+        if self.current_token.tokentype == token.END:
+            self.__advance()
+        elif self.recover and (self.current_token.tokentype in DECL_START
+                               or self.current_token.tokentype == token.EOS):
+            self.__diagnostic("expecting end")
+        else:
+            self.__error("expecting end")
+
+    # parses a statement with parse_stmt(stmt_list_node), which appends
+    # it; on a syntax error an ErrorStmt takes its place and the tokens
+    # up to where the next statement can start are skipped
+    def __recovering(self, parse_stmt, stmt_list_node, top_level):
+        first_token = self.current_token
+        count = len(stmt_list_node.stmts)
+        outer_declared_id = self.declared_id
+        self.declared_id = None
+        try:
+            parse_stmt(stmt_list_node)
+        except error.MyPLError as e:
+            del stmt_list_node.stmts[count:]
+            error_stmt = ast.ErrorStmt()
+            error_stmt.error = e
+            error_stmt.first_token = first_token
+            stmt_list_node.stmts.append(error_stmt)
+            self.__synchronize(first_token, top_level, error_stmt)
+        finally:
+            self.declared_id = outer_declared_id
+
+    # records the name a var, fun or struct declaration declares (the
+    # first one read in the statement, not a struct field's)
+    def __declared(self, id_token):
+        if self.declared_id is None:
+            self.declared_id = id_token
+
+    # skips the rest of the statement that started with first_token:
+    # past its ';' or, for a block statement, past its end (blocks
+    # nested in it are skipped whole), stopping early at fun, struct
+    # and the end of the file. Outside a block statement an end, else
+    # or elif closes the enclosing block, so it is left in place (at
+    # the top level there is none and it is skipped). The name a failed
+    # declaration got as far as is kept on its error_stmt, so later
+    # uses of it are not reported as undefined
+    def __synchronize(self, first_token, top_level, error_stmt=None):
+        if error_stmt is not None:
+            error_stmt.declared_id = self.declared_id
+        depth = 0
+        if first_token.tokentype in BLOCK_START or first_token.tokentype in DECL_START:
+            depth = 1
+        while True:
+            current = self.current_token
+            tokentype = current.tokentype
+            if tokentype == token.EOS:
+                return
+            if tokentype in DECL_START and current is not first_token:
+                return
+            if depth == 0:
+                if tokentype == token.SEMICOLON:
+                    self.__advance()
+                    return
+                if tokentype in BLOCK_END:
+                    if top_level:
+                        self.__advance()
+                    return
+            if tokentype in BLOCK_START and current is not first_token:
+                depth += 1
+            elif tokentype == token.END:
+                depth -= 1
+                if depth == 0:
+                    self.__advance()
+                    return
+            self.__advance()
+
+    def __append_bstmt(self, stmt_list_node):
+        stmt_list_node.stmts.append(self.__bstmt())
 
     # Beginning of recursive descent functions
     def __stmts(self, stmt_list_node):
         """"<stmts> ::= <stmt> <stmts> | e"""
-
-        if self.current_token.tokentype != token.EOS:
+        # parsed with a loop so the stack depth does not grow
+        # with the number of statements
+        if self.recover:
+            while self.current_token.tokentype != token.EOS:
+                self.__recovering(self.__stmt, stmt_list_node, True)
+            return
+        while self.current_token.tokentype != token.EOS:
             self.__stmt(stmt_list_node)
-            self.__stmts(stmt_list_node)
 
     def __stmt(self, stmt_list_node):
         """<stmt> ::= <sdecl> | <fdecl> | <bstmt>"""
@@ -78,10 +223,11 @@ class Parser(object):
         struct_node = ast.StructDeclStmt()
         struct_node.struct_id = self.current_token
         self.__eat(token.ID, "expecting an ID")
+        self.__declared(struct_node.struct_id)
         self.__vdecls(var_list)
         struct_node.var_decls = var_list
         stmt_list_node.stmts.append(struct_node)
-        self.__eat(token.END, "expecting end")
+        self.__end_block()
 
     def __fdecl(self, stmt_list_node):
         fun_node = ast.FunDeclStmt()
@@ -93,20 +239,24 @@ class Parser(object):
             fun_node.return_type = self.__type()
         fun_node.fun_name = self.current_token
         self.__eat(token.ID, "expecting an ID")
+        self.__declared(fun_node.fun_name)
         self.__eat(token.LPAREN, "expecting '('")
         fun_node.params = self.__params()
         self.__eat(token.RPAREN, "expecting ')'")
 
         self.__bstmts(fun_node.stmt_list)
-        self.__eat(token.END, "expecting end")
+        self.__end_block()
         stmt_list_node.stmts.append(fun_node)  # check
 
     def __bstmts(self, temp_stmt_list):
         # this function will run unless it finds one of these tokens
-        tokenrel = [token.EOS, token.END, token.ELSE, token.ELIF]
-        if self.current_token.tokentype not in tokenrel:
+        if self.recover:
+            while self.current_token.tokentype not in BLOCK_END \
+                    and self.current_token.tokentype not in DECL_START:
+                self.__recovering(self.__append_bstmt, temp_stmt_list, False)
+            return
+        while self.current_token.tokentype not in BLOCK_END:
             temp_stmt_list.stmts.append(self.__bstmt())
-            self.__bstmts(temp_stmt_list)
 
     def __bstmt(self):
 
@@ -140,64 +290,76 @@ class Parser(object):
         self.__bstmts(basic_if_node.stmt_list)
         if_node.if_part = basic_if_node
         self.__condt(if_node)
-        self.__eat(token.END, "expecting end")
+        self.__end_block()
         return if_node
 
     def __condt(self, if_node):
         if_node.else_stmts = ast.StmtList()
-        basic_if_node = ast.BasicIf()
-        basic_if_node.bool_expr = ast.BoolExpr()
-        if self.current_token.tokentype == token.ELIF:
+        while self.current_token.tokentype == token.ELIF:
+            basic_if_node = ast.BasicIf()
+            basic_if_node.bool_expr = ast.BoolExpr()
             basic_if_node.stmt_list = ast.StmtList()
             self.__advance()
             self.__bexpr(basic_if_node.bool_expr)
             self.__eat(token.THEN, "expecting then")
             self.__bstmts(basic_if_node.stmt_list)
             if_node.elseifs.append(basic_if_node)
-            self.__condt(if_node)
-        elif self.current_token.tokentype == token.ELSE:
+        if self.current_token.tokentype == token.ELSE:
             if_node.has_else = True
             self.__advance()
             self.__bstmts(if_node.else_stmts)
 
     def __bexpr(self, bexpr_node):
-        if self.current_token.tokentype == token.NOT:
-            bexpr_node.negated = True
-            self.__advance()
-            self.__bexpr(bexpr_node)
-            self.__bexprt(bexpr_node)
-
-        elif self.current_token.tokentype == token.LPAREN:
-            bexpr_node.first_expr = ast.BoolExpr()
-            self.__advance()
-            # in this specific instance bexpr_node.first_expr must be a Bool expr
-            self.__bexpr(bexpr_node.first_expr)
-            self.__eat(token.RPAREN, "expecting ')'")
-            self.__bconnct(bexpr_node)
-        else:
-            bexpr_node.first_expr = self.__expr()
-            self.__bexprt(bexpr_node)
-
+        # a or b or c is built right nested as
+        # BoolExpr(a, or, BoolExpr(b, or, c)), but parsed with a loop.
+        # Each not in front of a link takes one more relation and
+        # connector once the rest of the chain is parsed, so links
+        # with nots left over wait on a stack
+        pending = []
+        while True:
+            not_count = 0
+            while self.current_token.tokentype == token.NOT:
+                bexpr_node.negated = True
+                self.__advance()
+                not_count += 1
+            if self.current_token.tokentype == token.LPAREN:
+                bexpr_node.first_expr = ast.BoolExpr()
+                self.__advance()
+                # in this specific instance bexpr_node.first_expr must be a Bool expr
+                self.__bexpr(bexpr_node.first_expr)
+                self.__eat(token.RPAREN, "expecting ')'")
+                has_rest = self.__bconnct(bexpr_node)
+            else:
+                bexpr_node.first_expr = self.__expr()
+                has_rest = self.__bexprt(bexpr_node)
+            while not has_rest:
+                if not_count == 0:
+                    if not pending:
+                        return
+                    bexpr_node, not_count = pending.pop()
+                    continue
+                not_count -= 1
+                has_rest = self.__bexprt(bexpr_node)
+            if not_count > 0:
+                pending.append((bexpr_node, not_count))
+            bexpr_node = bexpr_node.rest
+
+    # returns True if a connector was found, bexpr_node.rest is then
+    # the next (still empty) link of the chain
     def __bexprt(self, bexpr_node):
-        boolrel = [token.EQUAL, token.LESS_THAN,
-                   token.LESS_THAN_EQUAL, token.GREATER_THAN_EQUAL,
-                   token.GREATER_THAN, token.NOT_EQUAL]
-        if self.current_token.tokentype in boolrel:
+        if self.current_token.tokentype in token.BOOL_RELS:
             bexpr_node.bool_rel = self.current_token
             self.__advance()
             bexpr_node.second_expr = self.__expr()
-            self.__bconnct(bexpr_node)
-        else:
-            self.__bconnct(bexpr_node)
+        return self.__bconnct(bexpr_node)
 
     def __bconnct(self, bexpr_node):
-        temp_bool_expr = ast.BoolExpr()
-        if (self.current_token.tokentype == token.AND
-                or self.current_token.tokentype == token.OR):
+        if self.current_token.tokentype in token.BOOL_CONNECTORS:
             bexpr_node.bool_connector = self.current_token
             self.__advance()
-            self.__bexpr(temp_bool_expr)
-            bexpr_node.rest = temp_bool_expr
+            bexpr_node.rest = ast.BoolExpr()
+            return True
+        return False
 
     def __while(self):
         while_node = ast.WhileStmt()
@@ -206,7 +368,7 @@ class Parser(object):
         while_node.stmt_list = ast.StmtList()
         self.__eat(token.DO, "expecting do")
         self.__bstmts(while_node.stmt_list)
-        self.__eat(token.END, "expecting end")
+        self.__end_block()
         return while_node
 
     def __exit(self):
@@ -218,15 +380,23 @@ class Parser(object):
         return return_node
 
     def __vdecls(self, var_list):
-        if self.current_token.tokentype == token.VAR:
-            self.__advance()
-            var_list.append(self.__vdecl())
-            self.__vdecls(var_list)
+        while self.current_token.tokentype == token.VAR:
+            first_token = self.current_token
+            self.__advance()
+            if not self.recover:
+                var_list.append(self.__vdecl())
+                continue
+            try:
+                var_list.append(self.__vdecl())
+            except error.MyPLError:
+                # the field is left out
+                self.__synchronize(first_token, False)
 
     def __vdecl(self):
         var_decl_node = ast.VarDeclStmt()
         var_decl_node.var_id = self.current_token
         self.__eat(token.ID, "expecting ID")
+        self.__declared(var_decl_node.var_id)
         var_decl_node.var_type = self.__tdecl()
         self.__eat(token.ASSIGN, "expecting '='")
         var_decl_node.var_expr = self.__expr()
@@ -241,6 +411,26 @@ class Parser(object):
         return token_type
 
     def __expr(self):
+        # a op b op c is built right nested as
+        # ComplexExpr(a, op, ComplexExpr(b, op, c)), but parsed with
+        # a loop that keeps hold of the innermost ComplexExpr
+        simple_expr_node = self.__simple_expr()
+        if self.current_token.tokentype not in token.MATH_RELS:
+            return simple_expr_node
+        expr_node = ast.ComplexExpr()
+        complex_expr_node = expr_node
+        while True:
+            complex_expr_node.first_operand = simple_expr_node
+            complex_expr_node.math_rel = self.current_token
+            self.__advance()
+            simple_expr_node = self.__simple_expr()
+            if self.current_token.tokentype not in token.MATH_RELS:
+                complex_expr_node.rest = simple_expr_node
+                return expr_node
+            complex_expr_node.rest = ast.ComplexExpr()
+            complex_expr_node = complex_expr_node.rest
+
+    def __simple_expr(self):
         simple_expr_node = ast.SimpleExpr()
         if self.current_token.tokentype == token.LPAREN:
             self.__advance()
@@ -248,23 +438,13 @@ class Parser(object):
             self.__eat(token.RPAREN, "expecting ')'")
         else:
             simple_expr_node.term = self.__rvalue()
-
-        mathrels = [token.PLUS, token.MINUS,
-                    token.DIVIDE, token.MULTIPLY, token.MODULO]
-        if self.current_token.tokentype in mathrels:
-            complex_expr_node = ast.ComplexExpr()
-            complex_expr_node.first_operand = simple_expr_node
-            complex_expr_node.math_rel = self.current_token
-            self.__advance()
-            complex_expr_node.rest = self.__expr()
-            return complex_expr_node
         return simple_expr_node
 
     def __rvalue(self):
         # this is the one exception I made to advancing
         # before calling the function
-        simple_rval_node = ast.SimpleRValue()
-        if self.current_token.tokentype == token.NIL:
+        if self.current_token.tokentype in token.VALUES:
+            simple_rval_node = ast.SimpleRValue()
             simple_rval_node.val = self.current_token
             self.__advance()
             return simple_rval_node
@@ -274,22 +454,6 @@ class Parser(object):
             new_rval_node.struct_type = self.current_token
             self.__eat(token.ID, "expecting an ID")
             return new_rval_node
-        elif self.current_token.tokentype == token.STRINGVAL:
-            simple_rval_node.val = self.current_token
-            self.__advance()
-            return simple_rval_node
-        elif self.current_token.tokentype == token.INTVAL:
-            simple_rval_node.val = self.current_token
-            self.__advance()
-            return simple_rval_node
-        elif self.current_token.tokentype == token.BOOLVAL:
-            simple_rval_node.val = self.current_token
-            self.__advance()
-            return simple_rval_node
-        elif self.current_token.tokentype == token.FLOATVAL:
-            simple_rval_node.val = self.current_token
-            self.__advance()
-            return simple_rval_node
         else:
             return self.idrval()
 
@@ -322,23 +486,7 @@ class Parser(object):
 
     def __type(self):
         temp_token = ''
-        if self.current_token.tokentype == token.ID:
-            temp_token = self.current_token
-            self.__advance()
-            return temp_token
-        elif self.current_token.tokentype == token.INTTYPE:
-            temp_token = self.current_token
-            self.__advance()
-            return temp_token
-        elif self.current_token.tokentype == token.FLOATTYPE:
-            temp_token = self.current_token
-            self.__advance()
-            return temp_token
-        elif self.current_token.tokentype == token.BOOLTYPE:
-            temp_token = self.current_token
-            self.__advance()
-            return temp_token
-        elif self.current_token.tokentype == token.STRINGTYPE:
+        if self.current_token.tokentype in token.TYPES:
             temp_token = self.current_token
             self.__advance()
             return temp_token
@@ -30,14 +30,14 @@ class PrintVisitor(ast.Visitor):
     def visit_stmt_list(self, stmt_list):
         for stmt in stmt_list.stmts:
             self.__write(self.__indent())
-            stmt.accept(self)
+            self.visit(stmt)
             # I did this here to ensure that a newline character is printed
             # at the end of the complex Expr
             if type(stmt) is ast.ComplexExpr:
                 self.__write(";\n")
 
     def visit_expr_stmt(self, expr_stmt):
-        expr_stmt.expr.accept(self)
+        self.visit(expr_stmt.expr)
 
     def visit_var_decl_stmt(self, var_decl):
         temp_indent = self.indent  # saves current indent level
@@ -48,7 +48,7 @@ class PrintVisitor(ast.Visitor):
             self.__write(str(var_decl.var_type.lexeme) + " = ")
         else:  # if there is no type declared
             self.__write("var " + str(var_decl.var_id.lexeme) + " = ")
-        var_decl.var_expr.accept(self)
+        self.visit(var_decl.var_expr)
         self.__write(';\n')
         self.indent = temp_indent
 
@@ -57,9 +57,9 @@ class PrintVisitor(ast.Visitor):
         self.__write(self.__indent())
         self.indent = 0  # sets indent to 0 to prevent indents in the middle of a line
         self.__write("set ")
-        assign_stmt.lhs.accept(self)
+        self.visit(assign_stmt.lhs)
         self.__write(" = ")
-        assign_stmt.rhs.accept(self)
+        self.visit(assign_stmt.rhs)
         self.__write(";\n")
         self.indent = temp_indent
 
@@ -69,7 +69,7 @@ class PrintVisitor(ast.Visitor):
         self.indent += 1  # increment indent level by one
         # print out all statements in the struct
         for stmt in struct_decl.var_decls:
-            stmt.accept(self)
+            self.visit(stmt)
         self.indent -= 1  # decrement indent level by one
         self.__write("end \n\n")
 
@@ -79,14 +79,14 @@ class PrintVisitor(ast.Visitor):
         self.__write('(')
         comma_count = 0  # counts the number of commas needed in parameter statement
         for item in fun_decl.params:  # prints out parameters
-            item.accept(self)
+            self.visit(item)
             if comma_count < (len(fun_decl.params) - 1):
                 self.__write(",")
             comma_count += 1
         self.__write(')\n')
         for stmt in fun_decl.stmt_list.stmts: # prints out items in the function body
             self.indent += 1  # increments indent level by one
-            stmt.accept(self)
+            self.visit(stmt)
             if type(stmt) is ast.ComplexExpr:
                 self.__write(";\n")
             self.indent -= 1  # decrements indent level by one
@@ -99,18 +99,23 @@ class PrintVisitor(ast.Visitor):
         self.__write("return")
         if return_stmt.return_expr is not None:
             self.__write(" ")
-            self.__write(return_stmt.return_expr.accept(self))
+            self.__write(self.visit(return_stmt.return_expr))
         self.__write(";\n")
         self.indent = temp_indent
 
+    def visit_error_stmt(self, error_stmt):
+        # a statement that did not parse, printed as a comment
+        self.__write(self.__indent())
+        self.__write('# ' + str(error_stmt.error) + '\n')
+
     def visit_while_stmt(self, while_stmt):
         self.__write(self.__indent())
         self.__write("while ")
-        while_stmt.bool_expr.accept(self)
+        self.visit(while_stmt.bool_expr)
         self.__write(' do \n')
         for stmt in while_stmt.stmt_list.stmts:  # prints out stmts in loop
             self.indent += 1  # increment indent level by one
-            stmt.accept(self)
+            self.visit(stmt)
             # prints out a semicolon and a newline if its a complex or simple expr
             if type(stmt) is ast.ComplexExpr or type(stmt) is ast.SimpleExpr:
                 self.__write(";\n")
@@ -121,17 +126,17 @@ class PrintVisitor(ast.Visitor):
     def visit_if_stmt(self, if_stmt):
         self.__write(self.__indent())
         self.__write('if ')
-        if_stmt.if_part.accept(self)
+        self.visit(if_stmt.if_part)
         for item in if_stmt.elseifs:  # print out elif statements
             self.__write(self.__indent())
             self.__write("elif ")
-            item.accept(self)
+            self.visit(item)
         if if_stmt.has_else:  # print out else stmts
             self.__write(self.__indent())
             self.__write("else \n")
             for stmt in if_stmt.else_stmts.stmts:  # prints out stmts in if stmt
                 self.indent += 1  # increment indent level by one
-                stmt.accept(self)
+                self.visit(stmt)
                 # prints out a semicolon and a newline if its a complex or simple expr
                 if type(stmt) is ast.ComplexExpr or type(stmt) is ast.SimpleExpr:
                     self.__write(";\n")
@@ -143,7 +148,7 @@ class PrintVisitor(ast.Visitor):
             self.__write("end\n")
 
     def visit_basic_if_stmt(self, basic_if_stmt):
-        basic_if_stmt.bool_expr.accept(self)
+        self.visit(basic_if_stmt.bool_expr)
         self.__write(' then \n')
         for stmt in basic_if_stmt.stmt_list.stmts:
             self.indent += 1
@@ -153,35 +158,44 @@ class PrintVisitor(ast.Visitor):
             self.indent -= 1
 
     def visit_simple_expr(self, simple_expr):
-        simple_expr.term.accept(self)
+        self.visit(simple_expr.term)
 
     def visit_complex_expr(self, complex_expr):
         temp_indent = self.indent  # saves current indent level
         self.__write(self.__indent())
         self.indent = 0  # sets indent to 0 to prevent indents in the middle of a line
-        complex_expr.first_operand.accept(self)
-        self.__write(" " + str(complex_expr.math_rel.lexeme) + " ")
-        complex_expr.rest.accept(self)
+        # the rest of the expression is nested to the right, printed in a loop
+        while type(complex_expr) is ast.ComplexExpr:
+            self.visit(complex_expr.first_operand)
+            self.__write(" " + str(complex_expr.math_rel.lexeme) + " ")
+            complex_expr = complex_expr.rest
+        self.visit(complex_expr)
         self.indent = temp_indent
 
     def visit_bool_expr(self, bool_expr):
-        if bool_expr.negated:  # if the expression is negated
-            self.__write("not ")
-        # places an Rparen if there is a bool_connector
-        if bool_expr.bool_connector is not None:
-            self.__write('(')
-        # places an Lparen if there is a bool_rel
-        if bool_expr.bool_rel is not None:
-            self.__write('(')
-        bool_expr.first_expr.accept(self)  # print first expression
-        if bool_expr.bool_rel is not None:
-            self.__write(" " + bool_expr.bool_rel.lexeme + " ")
-            bool_expr.second_expr.accept(self)
-            self.__write(')')  # close expression after second operand
-        if bool_expr.bool_connector is not None:
+        # and / or chains are nested to the right, printed in a loop
+        # that counts the parens to close after the last one
+        close_count = 0
+        while True:
+            if bool_expr.negated:  # if the expression is negated
+                self.__write("not ")
+            # places an Rparen if there is a bool_connector
+            if bool_expr.bool_connector is not None:
+                self.__write('(')
+            # places an Lparen if there is a bool_rel
+            if bool_expr.bool_rel is not None:
+                self.__write('(')
+            self.visit(bool_expr.first_expr)  # print first expression
+            if bool_expr.bool_rel is not None:
+                self.__write(" " + bool_expr.bool_rel.lexeme + " ")
+                self.visit(bool_expr.second_expr)
+                self.__write(')')  # close expression after second operand
+            if bool_expr.bool_connector is None:
+                break
             self.__write(" " + bool_expr.bool_connector.lexeme + " ")
-            bool_expr.rest.accept(self)
-            self.__write(')')  # close expression after rest
+            close_count += 1
+            bool_expr = bool_expr.rest
+        self.__write(')' * close_count)  # close expressions after rest
 
     def visit_lvalue(self, lval):
         dot_count = 0
@@ -212,7 +226,7 @@ class PrintVisitor(ast.Visitor):
         comma_count = 0  # counts the number of commas needed
         self.__write(str(call_rvalue.fun.lexeme) + "(")
         for items in call_rvalue.args:
-            items.accept(self)
+            self.visit(items)
             if comma_count < (len(call_rvalue.args) - 1):
                 self.__write(",")
             comma_count += 1
@@ -0,0 +1,129 @@
+#!/usr/bin/python3
+#
+# Description: Opt-in instrumentation for the lexer, parser and type
+# checker. A Profile collects per-stage wall time, token counts per
+# token type, AST node counts per class, call counts and cumulative
+# time of every visit_* method of a visitor, and symbol table lookup
+# counts with a histogram of lookup depths. Nothing is instrumented
+# unless a Profile hands out the objects to instrument, so the
+# normal classes carry no cost for it.
+# ----------------------------------------------------------------------
+
+import collections
+import contextlib
+import time
+
+import mypl_ast as ast
+import mypl_symbol_table as symbol_table
+
+
+class ProfiledSymbolTable(symbol_table.FlatSymbolTable):
+    """A FlatSymbolTable that counts its lookups by operation, and how
+    many environments out from the innermost one each name was found
+    ('missing' if it was not bound)"""
+
+    def __init__(self, lookups, depths):
+        symbol_table.FlatSymbolTable.__init__(self)
+        self.lookups = lookups      # operation -> count
+        self.depths = depths        # depth -> count
+
+    def __record(self, operation, identifier):
+        self.lookups[operation] += 1
+        stack = self.bindings.get(identifier)
+        if stack is None:
+            self.depths['missing'] += 1
+        else:
+            self.depths[len(self.undo) - 1 - stack[-1][0]] += 1
+
+    def id_exists(self, identifier):
+        self.__record('id_exists', identifier)
+        return symbol_table.FlatSymbolTable.id_exists(self, identifier)
+
+    def get_info(self, identifier):
+        self.__record('get_info', identifier)
+        return symbol_table.FlatSymbolTable.get_info(self, identifier)
+
+    def set_info(self, identifier, info):
+        self.__record('set_info', identifier)
+        symbol_table.FlatSymbolTable.set_info(self, identifier, info)
+
+
+class Profile(object):
+    """Collects the measurements of one run; report() returns them as
+    a dict that can be written out as JSON"""
+
+    def __init__(self):
+        self.stages = {}                        # stage name -> seconds
+        self.tokens = collections.Counter()     # token type name -> count
+        self.nodes = collections.Counter()      # AST class name -> count
+        self.visits = {}                        # method name -> [calls, seconds]
+        self.lookups = collections.Counter()    # operation -> count
+        self.depths = collections.Counter()     # lookup depth -> count
+
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Times the body of a with statement as the stage name (also
+        when it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stages[name] = self.stages.get(name, 0.0) + time.perf_counter() - start
+
+    def count_tokens(self, tokens):
+        for next_token in tokens:
+            self.tokens[next_token.tokentype.name] += 1
+
+    def count_nodes(self, stmt_list):
+        """Counts the nodes of an AST by class"""
+        work = [stmt_list]
+        while work:
+            node = work.pop()
+            self.nodes[type(node).__name__] += 1
+            work.extend(ast.children(node))
+
+    def symbol_table(self):
+        """A symbol table that counts its lookups into this profile"""
+        return ProfiledSymbolTable(self.lookups, self.depths)
+
+    def visitor(self, visitor_class, *args, **kwargs):
+        """A visitor_class instance (made from args) whose visit_*
+        methods are counted and timed"""
+        methods = {}
+        for name in dir(visitor_class):
+            if name.startswith('visit_'):
+                methods[name] = self.__timed(name, getattr(visitor_class, name))
+        profiled_class = type(visitor_class.__name__, (visitor_class,), methods)
+        return profiled_class(*args, **kwargs)
+
+    # wraps a visit method to count its calls and add up its time
+    # (including the time of the visits it makes)
+    def __timed(self, name, method):
+        stats = self.visits.setdefault(name, [0, 0.0])
+        clock = time.perf_counter
+
+        def timed(visitor, node):
+            stats[0] += 1
+            start = clock()
+            try:
+                return method(visitor, node)
+            finally:
+                stats[1] += clock() - start
+        return timed
+
+    def report(self):
+        depths = sorted(depth for depth in self.depths if depth != 'missing')
+        if 'missing' in self.depths:
+            depths.append('missing')
+        return {
+            'stages': dict(self.stages),
+            'tokens': dict(self.tokens.most_common()),
+            'token_count': sum(self.tokens.values()),
+            'nodes': dict(self.nodes.most_common()),
+            'node_count': sum(self.nodes.values()),
+            'visits': {name: {'calls': calls, 'seconds': seconds}
+                       for name, (calls, seconds) in sorted(self.visits.items())
+                       if calls},
+            'lookups': dict(self.lookups.most_common()),
+            'lookup_depths': {str(depth): self.depths[depth] for depth in depths},
+        }
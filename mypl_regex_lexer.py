@@ -0,0 +1,241 @@
+#!/usr/bin/python3
+#
+# Description: An alternate lexer backend that compiles the
+# MyPL token grammar into one master regular expression and
+# tokenizes the whole input in bulk. It has the same
+# next_token() interface as mypl_lexer.Lexer and produces the
+# same tokens, line/column values and errors.
+# --------------------------------------------------------
+
+import re
+
+import mypl_token as token
+import mypl_error as error
+import mypl_lexer as lexer
+
+
+# every delimiter character except the end of the stream
+DELIMS = re.escape(''.join(sorted(c for c in token.DELIMITERS if c)))
+# delimiters that may directly follow a number ('.' starts a fraction)
+NUM_END = re.escape(''.join(sorted(c for c in token.DELIMITERS if c and c != '.')))
+
+# leading whitespace followed by exactly one alternative. WORD is an
+# operator, keyword or identifier. Anything irregular (lexical
+# errors, odd numbers, unterminated strings) falls through to OTHER
+# and is scanned by mypl_lexer.Lexer
+MASTER_PATTERN = re.compile(r'''
+    (\s*)
+    (?:
+        (?P<COMMENT>\#[^\n]*)
+      | (?P<STRING>"[^"\n]*")
+      | (?P<FLOATVAL>(?:0|[1-9][0-9]*)\.[0-9]+)(?=[%(num_end)s]|\Z)
+      | (?P<INTVAL>0(?=[%(num_end)s]|\Z)|[1-9][0-9]*(?=[%(num_end)s"]|\Z))
+      | (?P<WORD>==|>=|<=|!=|[%(delims)s]|[^\s"%(delims)s][^"%(delims)s]*)
+      | (?P<EOS>\Z)
+      | (?P<OTHER>)
+    )
+''' % {'delims': DELIMS, 'num_end': NUM_END}, re.VERBOSE)
+COMMENT = MASTER_PATTERN.groupindex['COMMENT']
+STRING = MASTER_PATTERN.groupindex['STRING']
+FLOATVAL = MASTER_PATTERN.groupindex['FLOATVAL']
+INTVAL = MASTER_PATTERN.groupindex['INTVAL']
+WORD = MASTER_PATTERN.groupindex['WORD']
+EOS = MASTER_PATTERN.groupindex['EOS']
+
+# groups whose token type does not depend on the lexeme
+KIND_TYPES = {
+    INTVAL: token.INTVAL,
+    FLOATVAL: token.FLOATVAL,
+}
+
+# whitespace other than spaces and newlines (see tokenize)
+IRREGULAR_SPACE = re.compile(r'[^\S \n]')
+
+
+class RegexLexer(object):
+    def __init__(self, input_stream):
+        self.input_stream = input_stream
+        self.tokens = None       # list of tokens produced in bulk
+        self.remaining = None    # iterator over the tokens not handed out yet
+        self.lex_error = None    # error raised after the last token
+
+    # hands out the next token, tokenizing the whole input on the first call
+    def next_token(self):
+        if self.tokens is None:
+            self.tokens, self.lex_error = self.tokenize(self.input_stream.read())
+            self.remaining = iter(self.tokens)
+        next_token = next(self.remaining, None)
+        if next_token is not None:
+            return next_token
+        if self.lex_error is not None:
+            raise self.lex_error
+        # every call after the end of the stream is another EOS
+        return token.Token(token.EOS, '', self.tokens[-1].line, 1)
+
+    def tokenize(self, text):
+        """Returns the list of tokens up to and including EOS, and the
+        MyPLError that stopped the lexer early (or None)"""
+        if IRREGULAR_SPACE.search(text) is not None:
+            return self.__tokenize_exact(text)
+        return self.__tokenize_regular(text)
+
+    # tokenize() for text whose only whitespace is spaces and newlines
+    def __tokenize_regular(self, text):
+        tokens = []
+        line = 1
+        line_start = 0       # index in text where the current line starts
+        next_newline = text.find('\n')
+        if next_newline < 0:
+            next_newline = len(text)
+        after_comment = False
+        comment_column = 0
+        pos = 0
+        # locals for the hot loop
+        append = tokens.append
+        new_token = token.Token
+        get_type = lexer.TOKEN_TYPES.get
+        find = text.find
+        ID = token.ID
+
+        while True:
+            resume = None
+            for match in MASTER_PATTERN.finditer(text, pos):
+                kind = match.lastindex
+                start, end = match.span(kind)
+                # with only spaces and newlines the column is the offset
+                # from the line start, except right after a comment
+                if start > next_newline:
+                    line += text.count('\n', next_newline, start)
+                    line_start = text.rindex('\n', 0, start) + 1
+                    next_newline = find('\n', start)
+                    if next_newline < 0:
+                        next_newline = len(text)
+                    column = 1 if after_comment else start - line_start + 1
+                elif after_comment and kind == EOS:
+                    column = comment_column
+                else:
+                    column = start - line_start + 1
+
+                if kind == WORD:
+                    item = text[start:end]
+                    if item[0].isnumeric() or \
+                            (item == '.' and text[end:end + 1].isnumeric()):
+                        resume = start
+                        break
+                    append(new_token(get_type(item, ID), item, line, column))
+                elif kind in KIND_TYPES:
+                    append(new_token(KIND_TYPES[kind], text[start:end], line, column))
+                elif kind == STRING:
+                    append(new_token(token.STRINGVAL, text[start + 1:end - 1], line, column))
+                elif kind == COMMENT:
+                    after_comment = True
+                    comment_column = column
+                    continue
+                elif kind == EOS:
+                    append(new_token(token.EOS, '', line, column))
+                    return tokens, None
+                else:
+                    resume = start
+                    break
+                after_comment = False
+
+            try:
+                next_token, scanner = self.__scan(text, resume, line, column - 1, line_start)
+            except error.MyPLError as e:
+                return tokens, e
+            append(next_token)
+            pos = scanner.buffer_index
+            line = scanner.line
+            line_start = pos - scanner.column_index
+            next_newline = find('\n', pos)
+            if next_newline < 0:
+                next_newline = len(text)
+            after_comment = False
+
+    # tokenize() for text with tabs, carriage returns and other
+    # whitespace, which only some of the column counts include
+    def __tokenize_exact(self, text):
+        tokens = []
+        line = 1
+        line_start = 0       # index in text where the current line starts
+        column = 0           # column of the token start (see mypl_lexer)
+        after_comment = False
+        pos = 0
+        # locals for the hot loop
+        append = tokens.append
+        new_token = token.Token
+        get_type = lexer.TOKEN_TYPES.get
+        ID = token.ID
+        while True:
+            resume = None
+            for match in MASTER_PATTERN.finditer(text, pos):
+                space_start = match.start()
+                start = match.end(1)
+                if start != space_start:
+                    newline = text.rfind('\n', space_start, start)
+                    if newline < 0:
+                        if not after_comment:
+                            column += text.count(' ', space_start, start)
+                    else:
+                        line += text.count('\n', space_start, start)
+                        line_start = newline + 1
+                        # spaces after a comment do not move the column
+                        if after_comment:
+                            column = 0
+                        else:
+                            column = text.count(' ', line_start, start)
+                kind = match.lastindex
+                end = match.end()
+
+                if kind == WORD:
+                    item = text[start:end]
+                    if item[0].isnumeric() or \
+                            (item == '.' and text[end:end + 1].isnumeric()):
+                        resume = start
+                        break
+                    item = item.strip()
+                    tokentype = get_type(item, ID)
+                elif kind == COMMENT:
+                    after_comment = True
+                    continue
+                elif kind == STRING:
+                    tokentype = token.STRINGVAL
+                    item = text[start + 1:end - 1]
+                elif kind == INTVAL:
+                    tokentype = token.INTVAL
+                    item = text[start:end]
+                elif kind == FLOATVAL:
+                    tokentype = token.FLOATVAL
+                    item = text[start:end]
+                elif kind == EOS:
+                    append(new_token(token.EOS, '', line, column + 1))
+                    return tokens, None
+                else:
+                    resume = start
+                    break
+                append(new_token(tokentype, item, line, column + 1))
+                column = end - line_start
+                after_comment = False
+
+            try:
+                next_token, scanner = self.__scan(text, resume, line, column, line_start)
+            except error.MyPLError as e:
+                return tokens, e
+            append(next_token)
+            pos = scanner.buffer_index
+            line = scanner.line
+            column = scanner.column
+            line_start = pos - scanner.column_index
+            after_comment = False
+
+    # scans one irregular token at resume with the character lexer,
+    # starting from the same line and column state
+    def __scan(self, text, resume, line, column, line_start):
+        scanner = lexer.Lexer(None)
+        scanner.buffer = text
+        scanner.stream_done = True
+        scanner.buffer_index = resume
+        scanner.line = line
+        scanner.column = column
+        scanner.column_index = resume - line_start
+        return scanner.next_token(), scanner
@@ -0,0 +1,211 @@
+#!/usr/bin/python3
+#
+# Description: A static resolution pass over a type checked AST.
+# It gives every variable a slot in a frame and records on every
+# use of a name where its binding lives, so that later passes and
+# the execution engines index frames, function tables and struct
+# fields instead of looking names up.
+# ----------------------------------------------------------------------
+
+import mypl_token as token
+import mypl_ast as ast
+import mypl_error as error
+
+
+class Resolver(ast.Visitor):
+    """Resolves the names in a program. There are two kinds of frames:
+    the global frame (top level statements and struct fields) and one
+    frame per function call. Every declaration in a frame gets its own
+    slot, and every use records depth (0 = the current frame, 1 = the
+    global frame seen from inside a function) and slot:
+
+      IDRvalue, LValue   depth and slot of the variable in path[0], and
+                         the field offsets of the struct fields in
+                         path[1:]
+      CallRValue         depth of the global frame and the slot of the
+                         function in the functions table (both None
+                         for builtins)
+
+    A struct's field offsets are the positions of the fields in its
+    declaration"""
+    def __init__(self):
+        self.scopes = [{}]      # stack of {name: (level, slot, struct type)}
+        self.level = 0          # 0 = global frame, 1 = function frame
+        self.frame_sizes = [0]  # slots allocated in each open frame
+        self.functions = []     # FunDeclStmts, indexed by CallRValue.slot
+        self.function_slots = {}    # fun name -> index in functions
+        self.structs = {}       # struct name -> {field: (struct type, offset)}
+        self.struct_type = None     # struct name of the last expression
+
+    def __error(self, error_msg, target_token):
+        raise error.MyPLError(error_msg, target_token.line, target_token.column)
+
+    def global_size(self):
+        return self.frame_sizes[0]
+
+    # gives the variable name a new slot in the innermost frame
+    def __declare(self, name, struct_type):
+        slot = self.frame_sizes[-1]
+        self.frame_sizes[-1] += 1
+        self.scopes[-1][name] = (self.level, slot, struct_type)
+        return slot
+
+    # struct name of a declared type (None for primitive types)
+    def __declared_struct(self, type_token):
+        if type_token != token.NIL and type_token.tokentype == token.ID:
+            return type_token.lexeme
+        return None
+
+    # sets depth, slot and offsets of a node that uses the variable
+    # in path[0], and the struct type of the value at the path's end
+    def __resolve(self, node):
+        var_token = node.path[0]
+        for i in range(len(self.scopes) - 1, -1, -1):
+            if var_token.lexeme in self.scopes[i]:
+                level, slot, struct_type = self.scopes[i][var_token.lexeme]
+                break
+        else:
+            msg = 'undefined variable "%s"' % var_token.lexeme
+            self.__error(msg, var_token)
+        node.depth = self.level - level
+        node.slot = slot
+        node.offsets = []
+        for field_token in node.path[1:]:
+            fields = self.structs.get(struct_type)
+            if fields is None or field_token.lexeme not in fields:
+                msg = 'undefined variable "%s"' % field_token.lexeme
+                self.__error(msg, field_token)
+            struct_type, offset = fields[field_token.lexeme]
+            node.offsets.append(offset)
+        self.struct_type = struct_type
+
+    def __block(self, stmt_list):
+        self.scopes.append({})
+        for stmt in stmt_list.stmts:
+            stmt.accept(self)
+        self.scopes.pop()
+
+    def resolve_stream(self, stmts):
+        """Resolves a program given as its top level statements and
+        yields each one once it is resolved"""
+        self.scopes.append({})
+        for stmt in stmts:
+            stmt.accept(self)
+            yield stmt
+        self.scopes.pop()
+
+    def visit_stmt_list(self, stmt_list):
+        self.__block(stmt_list)
+
+    def visit_expr_stmt(self, expr_stmt):
+        expr_stmt.expr.accept(self)
+
+    def visit_var_decl_stmt(self, var_decl):
+        self.struct_type = None
+        var_decl.var_expr.accept(self)
+        struct_type = self.__declared_struct(var_decl.var_type) or self.struct_type
+        var_decl.slot = self.__declare(var_decl.var_id.lexeme, struct_type)
+
+    def visit_assign_stmt(self, assign_stmt):
+        assign_stmt.rhs.accept(self)
+        assign_stmt.lhs.accept(self)
+
+    def visit_struct_decl_stmt(self, struct_decl):
+        # field initializers run in the global frame when the struct
+        # is created, and may use the fields declared before them
+        fields = {}
+        self.structs[struct_decl.struct_id.lexeme] = fields
+        self.scopes.append({})
+        for var_decl in struct_decl.var_decls:
+            var_decl.accept(self)
+            struct_type = self.scopes[-1][var_decl.var_id.lexeme][2]
+            fields[var_decl.var_id.lexeme] = (struct_type, len(fields))
+        self.scopes.pop()
+
+    def visit_fun_decl_stmt(self, fun_decl):
+        # registered first so the function can call itself
+        self.function_slots[fun_decl.fun_name.lexeme] = len(self.functions)
+        self.functions.append(fun_decl)
+        self.scopes.append({})
+        self.frame_sizes.append(0)
+        self.level += 1
+        for param in fun_decl.params:
+            param.accept(self)
+        self.__block(fun_decl.stmt_list)
+        fun_decl.frame_size = self.frame_sizes.pop()
+        self.level -= 1
+        self.scopes.pop()
+
+    def visit_return_stmt(self, return_stmt):
+        if return_stmt.return_expr is not None:
+            return_stmt.return_expr.accept(self)
+
+    def visit_while_stmt(self, while_stmt):
+        while_stmt.bool_expr.accept(self)
+        self.__block(while_stmt.stmt_list)
+
+    def visit_if_stmt(self, if_stmt):
+        if_stmt.if_part.accept(self)
+        for basic_if in if_stmt.elseifs:
+            basic_if.accept(self)
+        if if_stmt.has_else:
+            self.__block(if_stmt.else_stmts)
+
+    def visit_basic_if_stmt(self, basic_if_stmt):
+        basic_if_stmt.bool_expr.accept(self)
+        self.__block(basic_if_stmt.stmt_list)
+
+    def visit_simple_expr(self, simple_expr):
+        simple_expr.term.accept(self)
+
+    def visit_complex_expr(self, complex_expr):
+        complex_expr.first_operand.accept(self)
+        complex_expr.rest.accept(self)
+        self.struct_type = None
+
+    def visit_bool_expr(self, bool_expr):
+        bool_expr.first_expr.accept(self)
+        if bool_expr.bool_rel is not None:
+            bool_expr.second_expr.accept(self)
+        if bool_expr.bool_connector is not None:
+            bool_expr.rest.accept(self)
+
+    def visit_lvalue(self, lval):
+        self.__resolve(lval)
+
+    def visit_fun_param(self, fun_param):
+        struct_type = self.__declared_struct(fun_param.param_type)
+        fun_param.slot = self.__declare(fun_param.param_name.lexeme, struct_type)
+
+    def visit_simple_rvalue(self, simple_rvalue):
+        val = simple_rvalue.val
+        if val.tokentype == token.INTVAL:
+            simple_rvalue.value = int(val.lexeme)
+        elif val.tokentype == token.FLOATVAL:
+            simple_rvalue.value = float(val.lexeme)
+        elif val.tokentype == token.BOOLVAL:
+            simple_rvalue.value = val.lexeme == 'true'
+        elif val.tokentype == token.STRINGVAL:
+            simple_rvalue.value = val.lexeme
+        else:
+            simple_rvalue.value = None
+        self.struct_type = None
+
+    def visit_new_rvalue(self, new_rvalue):
+        self.struct_type = new_rvalue.struct_type.lexeme
+
+    def visit_call_rvalue(self, call_rvalue):
+        for arg in call_rvalue.args:
+            arg.accept(self)
+        slot = self.function_slots.get(call_rvalue.fun.lexeme)
+        if slot is None:
+            call_rvalue.depth = None
+            call_rvalue.slot = None
+            self.struct_type = None
+        else:
+            call_rvalue.depth = self.level
+            call_rvalue.slot = slot
+            self.struct_type = self.__declared_struct(self.functions[slot].return_type)
+
+    def visit_id_rvalue(self, id_rvalue):
+        self.__resolve(id_rvalue)
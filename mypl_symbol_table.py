@@ -39,4 +39,63 @@ class SymbolTable(object):
             self.scopes.pop()
 
     def __str__(self):
-        return str(self.scopes)
\ No newline at end of file
+        return str(self.scopes)
+
+
+class FlatSymbolTable(object):
+    """A symbol table with the same interface as SymbolTable that maps
+    each name to the stack of its bindings (innermost last), so
+    lookups take the same time at any nesting depth. Every environment
+    keeps an undo list of the names it bound, which pop_environment
+    uses to take those bindings off again"""
+
+    def __init__(self):
+        self.bindings = {}      # id_name -> [[scope index, info], ...]
+        self.undo = []          # per environment, the names bound in it
+
+    def id_exists(self, identifier):
+        return identifier in self.bindings
+
+    def add_id(self, identifier):
+        # can't add if no environments
+        if not self.undo:
+            return
+        scope = len(self.undo) - 1
+        stack = self.bindings.get(identifier)
+        if stack is None:
+            self.bindings[identifier] = [[scope, None]]
+        elif stack[-1][0] == scope:
+            # already bound in this environment
+            stack[-1][1] = None
+            return
+        else:
+            stack.append([scope, None])
+        self.undo[-1].append(identifier)
+
+    def get_info(self, identifier):
+        stack = self.bindings.get(identifier)
+        if stack is not None:
+            return stack[-1][1]
+
+    def set_info(self, identifier, info):
+        stack = self.bindings.get(identifier)
+        if stack is not None:
+            stack[-1][1] = info
+
+    def push_environment(self):
+        self.undo.append([])
+
+    def pop_environment(self):
+        if len(self.undo) > 0:
+            for identifier in self.undo.pop():
+                stack = self.bindings[identifier]
+                stack.pop()
+                if not stack:
+                    del self.bindings[identifier]
+
+    def __str__(self):
+        scopes = [{} for _ in self.undo]
+        for identifier, stack in self.bindings.items():
+            for scope, info in stack:
+                scopes[scope][identifier] = info
+        return str(scopes)
@@ -8,54 +8,186 @@
 # numbers for each new token object.
 # --------------------------------------------------------
 
-ASSIGN = 'ASSIGN'
-COMMA = 'COMMA'
-COLON = 'COLON'
-DIVIDE = 'DIVIDE'
-DOT = 'DOT'
-EQUAL = 'EQUAL'
-GREATER_THAN = 'GREATER_THAN'
-GREATER_THAN_EQUAL = 'GREATER_THAN_EQUAL'
-LESS_THAN = 'LESS_THAN'
-LESS_THAN_EQUAL = 'LESS_THAN_EQUAL'
-NOT_EQUAL = 'NOT_EQUAL'
-LPAREN = 'LPAREN'
-RPAREN = 'RPAREN'
-MINUS = 'MINUS'
-MODULO = 'MODULO'
-MULTIPLY = 'MULTIPLY'
-PLUS = 'PLUS'
-SEMICOLON = 'SEMICOLON'
-BOOLTYPE = 'BOOLTYPE'
-INTTYPE = 'INTTYPE'
-FLOATTYPE = 'FLOATTYPE'
-STRINGTYPE = 'STRINGTYPE'
-STRUCTTYPE = 'STRUCTTYPE'
-AND = 'AND'
-OR = 'OR'
-NOT = 'NOT'
-WHILE = 'WHILE'
-DO = 'DO'
-IF = 'IF'
-THEN = 'THEN'
-ELSE = 'ELSE'
-ELIF = 'ELIF'
-END = 'END'
-FUN = 'FUN'
-VAR = 'VAR'
-SET = 'SET'
-RETURN = 'RETURN'
-NEW = 'NEW'
-NIL = 'NIL'
-EOS = 'EOS'
-BOOLVAL = 'BOOLVAL'
-INTVAL = 'INTVAL'
-FLOATVAL = 'FLOATVAL'
-STRINGVAL = 'STRINGVAL'
-ID = 'ID'
+import enum
+
+
+class TokenType(enum.IntEnum):
+    """Token types are small ints; their names are used when printing"""
+    ASSIGN = 0
+    COMMA = 1
+    COLON = 2
+    DIVIDE = 3
+    DOT = 4
+    EQUAL = 5
+    GREATER_THAN = 6
+    GREATER_THAN_EQUAL = 7
+    LESS_THAN = 8
+    LESS_THAN_EQUAL = 9
+    NOT_EQUAL = 10
+    LPAREN = 11
+    RPAREN = 12
+    MINUS = 13
+    MODULO = 14
+    MULTIPLY = 15
+    PLUS = 16
+    SEMICOLON = 17
+    BOOLTYPE = 18
+    INTTYPE = 19
+    FLOATTYPE = 20
+    STRINGTYPE = 21
+    STRUCTTYPE = 22
+    AND = 23
+    OR = 24
+    NOT = 25
+    WHILE = 26
+    DO = 27
+    IF = 28
+    THEN = 29
+    ELSE = 30
+    ELIF = 31
+    END = 32
+    FUN = 33
+    VAR = 34
+    SET = 35
+    RETURN = 36
+    NEW = 37
+    NIL = 38
+    EOS = 39
+    BOOLVAL = 40
+    INTVAL = 41
+    FLOATVAL = 42
+    STRINGVAL = 43
+    ID = 44
+
+    def __str__(self):
+        return self.name
+
+
+# module level names for every token type (token.ASSIGN, ...)
+ASSIGN = TokenType.ASSIGN
+COMMA = TokenType.COMMA
+COLON = TokenType.COLON
+DIVIDE = TokenType.DIVIDE
+DOT = TokenType.DOT
+EQUAL = TokenType.EQUAL
+GREATER_THAN = TokenType.GREATER_THAN
+GREATER_THAN_EQUAL = TokenType.GREATER_THAN_EQUAL
+LESS_THAN = TokenType.LESS_THAN
+LESS_THAN_EQUAL = TokenType.LESS_THAN_EQUAL
+NOT_EQUAL = TokenType.NOT_EQUAL
+LPAREN = TokenType.LPAREN
+RPAREN = TokenType.RPAREN
+MINUS = TokenType.MINUS
+MODULO = TokenType.MODULO
+MULTIPLY = TokenType.MULTIPLY
+PLUS = TokenType.PLUS
+SEMICOLON = TokenType.SEMICOLON
+BOOLTYPE = TokenType.BOOLTYPE
+INTTYPE = TokenType.INTTYPE
+FLOATTYPE = TokenType.FLOATTYPE
+STRINGTYPE = TokenType.STRINGTYPE
+STRUCTTYPE = TokenType.STRUCTTYPE
+AND = TokenType.AND
+OR = TokenType.OR
+NOT = TokenType.NOT
+WHILE = TokenType.WHILE
+DO = TokenType.DO
+IF = TokenType.IF
+THEN = TokenType.THEN
+ELSE = TokenType.ELSE
+ELIF = TokenType.ELIF
+END = TokenType.END
+FUN = TokenType.FUN
+VAR = TokenType.VAR
+SET = TokenType.SET
+RETURN = TokenType.RETURN
+NEW = TokenType.NEW
+NIL = TokenType.NIL
+EOS = TokenType.EOS
+BOOLVAL = TokenType.BOOLVAL
+INTVAL = TokenType.INTVAL
+FLOATVAL = TokenType.FLOATVAL
+STRINGVAL = TokenType.STRINGVAL
+ID = TokenType.ID
+
+# characters that end the token currently being read
+DELIMITERS = frozenset(['', ',', '=', '#', '>', '<', '!', "'", ':', '/',
+                        '.', '(', ')', '-', '%', '*', '+', ';', ' ', '\n'])
+
+# single character punctuation and operators
+PUNCTUATION = {
+    '=': ASSIGN,
+    ',': COMMA,
+    ':': COLON,
+    '/': DIVIDE,
+    '.': DOT,
+    '>': GREATER_THAN,
+    '<': LESS_THAN,
+    '(': LPAREN,
+    ')': RPAREN,
+    '-': MINUS,
+    '%': MODULO,
+    '*': MULTIPLY,
+    '+': PLUS,
+    ';': SEMICOLON,
+}
+
+# operators made up of two characters
+TWO_CHAR_OPERATORS = {
+    '==': EQUAL,
+    '>=': GREATER_THAN_EQUAL,
+    '<=': LESS_THAN_EQUAL,
+    '!=': NOT_EQUAL,
+}
+
+# reserved words (new keywords only need to be added here)
+KEYWORDS = {
+    'true': BOOLVAL,
+    'false': BOOLVAL,
+    'bool': BOOLTYPE,
+    'int': INTTYPE,
+    'float': FLOATTYPE,
+    'string': STRINGTYPE,
+    'struct': STRUCTTYPE,
+    'and': AND,
+    'or': OR,
+    'not': NOT,
+    'while': WHILE,
+    'do': DO,
+    'if': IF,
+    'then': THEN,
+    'else': ELSE,
+    'elif': ELIF,
+    'end': END,
+    'fun': FUN,
+    'var': VAR,
+    'set': SET,
+    'return': RETURN,
+    'new': NEW,
+    'nil': NIL,
+}
+
+# groups of token types used by the parser and type checker
+MATH_RELS = frozenset([PLUS, MINUS, DIVIDE, MULTIPLY, MODULO])
+BOOL_RELS = frozenset([EQUAL, LESS_THAN, LESS_THAN_EQUAL,
+                       GREATER_THAN_EQUAL, GREATER_THAN, NOT_EQUAL])
+BOOL_CONNECTORS = frozenset([AND, OR])
+PRIMITIVE_TYPES = frozenset([INTTYPE, STRINGTYPE, FLOATTYPE, BOOLTYPE])
+TYPES = PRIMITIVE_TYPES | frozenset([ID])
+VALUES = frozenset([NIL, STRINGVAL, INTVAL, BOOLVAL, FLOATVAL])
+
+# literal value token type -> the type of the value
+VALUE_TYPES = {
+    INTVAL: INTTYPE,
+    FLOATVAL: FLOATTYPE,
+    BOOLVAL: BOOLTYPE,
+    STRINGVAL: STRINGTYPE,
+    NIL: NIL,
+}
 
 
 class Token(object):
+    __slots__ = ('tokentype', 'lexeme', 'line', 'column')
 
     def __init__(self, tokentype, lexeme, line, column):
         self.tokentype = tokentype
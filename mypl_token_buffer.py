@@ -0,0 +1,176 @@
+#!/usr/bin/python3
+#
+# Description: Token buffers that sit between a lexer and the
+# parser. They give the parser k-token lookahead, lex ahead in
+# batches (optionally on a producer thread), and let a program
+# be parsed again from a pre-lexed token array. Every buffer has
+# the next_token() interface, so it can be handed to Parser in
+# place of a lexer.
+# --------------------------------------------------------
+
+import queue
+import threading
+
+import mypl_token as token
+import mypl_error as error
+
+
+def lex_all(lexer):
+    """Runs the lexer to the end and returns (tokens, lex_error) where
+    tokens ends with EOS, or stops before the MyPLError in lex_error.
+    The pair can be cached and handed to TokenArray any number of times"""
+    tokens = []
+    lex_error = None
+    try:
+        next_token = lexer.next_token()
+        tokens.append(next_token)
+        while next_token.tokentype != token.EOS:
+            next_token = lexer.next_token()
+            tokens.append(next_token)
+    except error.MyPLError as e:
+        lex_error = e
+    return tokens, lex_error
+
+
+class TokenArray(object):
+    """Hands out tokens from a list that has already been lexed"""
+
+    def __init__(self, tokens, lex_error=None):
+        self.tokens = tokens        # lexed tokens, shared and never changed
+        self.index = 0              # index of the next token to hand out
+        self.lex_error = lex_error  # raised once the tokens run out
+
+    # makes sure at least count tokens are available from index on,
+    # returns False if there are fewer
+    def fill(self, count):
+        return self.index + count <= len(self.tokens)
+
+    def next_token(self):
+        if self.index < len(self.tokens) or self.fill(1):
+            next_token = self.tokens[self.index]
+            if next_token.tokentype != token.EOS:
+                self.index += 1
+            return next_token
+        return self.__end()
+
+    def peek(self, k=1):
+        """Returns the k-th upcoming token without consuming it (peek(1)
+        is what next_token() returns next). Past the end of the stream
+        this is the EOS token"""
+        if self.fill(k):
+            return self.tokens[self.index + k - 1]
+        if self.tokens and self.tokens[-1].tokentype == token.EOS:
+            return self.tokens[-1]
+        return self.__end()
+
+    # past the last token of a list that stops short of EOS: the error
+    # that stopped the lexer, else an EOS after the last token
+    def __end(self):
+        if self.lex_error is not None:
+            raise self.lex_error
+        line = self.tokens[-1].line if self.tokens else 1
+        return token.Token(token.EOS, '', line, 1)
+
+
+class TokenBuffer(TokenArray):
+    """Lexes ahead of the parser, batch_size tokens at a time"""
+
+    def __init__(self, lexer, batch_size=256):
+        TokenArray.__init__(self, [])
+        self.lexer = lexer
+        self.batch_size = batch_size
+        self.done = False       # set once EOS or an error was lexed
+
+    def fill(self, count):
+        while self.index + count > len(self.tokens):
+            if self.done:
+                return False
+            # drop the tokens that were already handed out
+            if self.index >= self.batch_size:
+                del self.tokens[:self.index]
+                self.index = 0
+            self.extend()
+        return True
+
+    # appends the next batch of tokens to the buffer
+    def extend(self):
+        try:
+            for _ in range(max(self.batch_size, 1)):
+                next_token = self.lexer.next_token()
+                self.tokens.append(next_token)
+                if next_token.tokentype == token.EOS:
+                    self.done = True
+                    return
+        except error.MyPLError as e:
+            self.lex_error = e
+            self.done = True
+
+
+class ThreadedTokenBuffer(TokenBuffer):
+    """A TokenBuffer whose lexer runs on a producer thread, handing
+    batches over through a queue of at most max_batches batches. Use
+    it in a with statement so the thread stops when the parse ends
+    (also when it fails)"""
+
+    def __init__(self, lexer, batch_size=256, max_batches=16):
+        TokenBuffer.__init__(self, lexer, batch_size)
+        self.batches = queue.Queue(max_batches)
+        self.stopped = threading.Event()
+        self.producer = threading.Thread(target=self.__produce)
+        self.producer.daemon = True
+        self.producer.start()
+
+    # runs on the producer thread: lexes batches until EOS or an error.
+    # Any other exception (a failing read, a bug in the lexer) is
+    # handed over as well, so extend() raises it instead of waiting
+    # for a batch that never comes
+    def __produce(self):
+        lexer_done = False
+        batch_size = max(self.batch_size, 1)
+        while not lexer_done and not self.stopped.is_set():
+            batch = []
+            lex_error = None
+            failure = None
+            try:
+                while len(batch) < batch_size:
+                    next_token = self.lexer.next_token()
+                    batch.append(next_token)
+                    if next_token.tokentype == token.EOS:
+                        lexer_done = True
+                        break
+            except error.MyPLError as e:
+                lex_error = e
+                lexer_done = True
+            except BaseException as e:
+                failure = e
+                lexer_done = True
+            while not self.stopped.is_set():
+                try:
+                    self.batches.put((batch, lex_error, failure),
+                                     timeout=0.1)
+                    break
+                except queue.Full:
+                    pass
+
+    def extend(self):
+        batch, lex_error, failure = self.batches.get()
+        self.tokens.extend(batch)
+        if failure is not None:
+            self.done = True
+            raise failure
+        if lex_error is not None:
+            self.lex_error = lex_error
+            self.done = True
+        elif batch and batch[-1].tokentype == token.EOS:
+            self.done = True
+
+    def close(self):
+        """Stops the producer thread (for example after a parse error)"""
+        self.stopped.set()
+        self.producer.join()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
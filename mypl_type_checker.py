@@ -11,13 +11,42 @@ import mypl_error as error
 import mypl_symbol_table as symbol_table
 
 
+class ErrorType(object):
+    """The type of an expression that failed to check. Checks that
+    involve it are skipped, so one error does not cause others"""
+
+    def __repr__(self):
+        return 'ERROR_TYPE'
+
+
+ERROR_TYPE = ErrorType()
+
+
+def check_all(stmt_list, sym_table=None):
+    """Type checks stmt_list without stopping at the first error and
+    returns every MyPLError found, sorted by position, each once"""
+    the_type_checker = TypeChecker(sym_table, collect=True)
+    stmt_list.accept(the_type_checker)
+    return the_type_checker.errors()
+
+
 class TypeChecker(ast.Visitor):
     """A MyPL type checker visitor implementation where struct type
     stake the form: type_id -> {v1:t1, ..., vn:tn} and function types
     take the form: fun_id -> [[t1, t2, ..., tn,], return_type]"""
-    def __init__(self):
-        # initialize the symbol table (for ids -> types)
-        self.sym_table = symbol_table.SymbolTable()
+    def __init__(self, sym_table=None, collect=False):
+        # initialize the symbol table (for ids -> types), any empty
+        # SymbolTable or FlatSymbolTable can be passed in
+        if sym_table is None:
+            sym_table = symbol_table.FlatSymbolTable()
+        self.sym_table = sym_table
+        # with collect set, errors are added to diagnostics instead of
+        # raised, and the expression that failed gets the ERROR_TYPE
+        self.diagnostics = [] if collect else None
+        # struct name -> {field: (type, offset)}, fields in declaration order
+        self.structs = {}
+        # (struct name, field names) -> type at the end of a dotted path
+        self.path_types = {}
         # current_type holds the type of the last expression type
         self.current_type = None
         # global env (for return)
@@ -56,29 +85,93 @@ class TypeChecker(ast.Visitor):
         s = error_msg
         l = target_token.line
         c = target_token.column
-        raise error.MyPLError(s, l, c)
+        if self.diagnostics is None:
+            raise error.MyPLError(s, l, c)
+        self.diagnostics.append(error.MyPLError(s, l, c))
+
+    # reports an error in an expression (in collect mode the
+    # expression then has the ERROR_TYPE)
+    def __fail(self, error_msg, target_token):
+        self.__error(error_msg, target_token)
+        self.current_type = ERROR_TYPE
+
+    def errors(self):
+        """The errors collected, sorted by position, each once"""
+        found = {}
+        for e in self.diagnostics or []:
+            found.setdefault((e.line, e.column, e.message), e)
+        return [found[key] for key in sorted(found)]
+
+    # the type a declared type token stands for
+    def __declared_type(self, type_token):
+        if type_token.tokentype in token.PRIMITIVE_TYPES:
+            return type_token.tokentype
+        return type_token.lexeme
+
+    # the type at the end of a path, following the struct fields in
+    # path[1:] through the struct layouts in one pass (memoized)
+    def __path_type(self, path):
+        path_type = self.sym_table.get_info(path[0].lexeme)
+        if len(path) == 1 or path_type is ERROR_TYPE:
+            return path_type
+        if isinstance(path_type, str):
+            key = (path_type, tuple(field_token.lexeme for field_token in path[1:]))
+            if key in self.path_types:
+                return self.path_types[key]
+        for field_token in path[1:]:
+            if path_type is ERROR_TYPE:
+                return ERROR_TYPE
+            layout = self.structs.get(path_type) if isinstance(path_type, str) else None
+            if layout is ERROR_TYPE:
+                # a struct whose declaration did not parse
+                return ERROR_TYPE
+            if layout is None or field_token.lexeme not in layout:
+                msg = 'undefined variable "%s"' % field_token.lexeme
+                self.__error(msg, field_token)
+                return ERROR_TYPE
+            path_type = layout[field_token.lexeme][0]
+        self.path_types[key] = path_type
+        return path_type
+
+    def check_stream(self, stmts):
+        """Type checks a program given as its top level statements (as
+        from Parser.stream()) and yields each one once it checked. Only
+        the symbol table, struct layouts and function signatures are
+        kept between statements, not the statements themselves"""
+        self.sym_table.push_environment()
+        for stmt in stmts:
+            self.visit(stmt)
+            yield stmt
+        self.sym_table.pop_environment()
 
     def visit_stmt_list(self, stmt_list):
         # add new block (scope)
         self.sym_table.push_environment()
+        dispatch = self.dispatch
         for stmt in stmt_list.stmts:
-            stmt.accept(self)
+            dispatch[type(stmt)](self, stmt)
 
         # remove new block
         self.sym_table.pop_environment()
 
     def visit_expr_stmt(self, expr_stmt):
-        expr_stmt.expr.accept(self)
+        self.visit(expr_stmt.expr)
 
     def visit_var_decl_stmt(self, var_decl):
-        type_rel = [token.INTTYPE, token.STRINGTYPE, token.FLOATTYPE, token.BOOLTYPE]
         self.sym_table.add_id(var_decl.var_id.lexeme)
-        var_decl.var_expr.accept(self)
+        self.visit(var_decl.var_expr)
 
-        if var_decl.var_type != token.NIL:  # if the type is declared
+        if self.current_type is ERROR_TYPE:
+            # the expression failed: go on with the declared type
+            if var_decl.var_type != token.NIL:
+                self.sym_table.set_info(var_decl.var_id.lexeme,
+                                        self.__declared_type(var_decl.var_type))
+            else:
+                self.sym_table.set_info(var_decl.var_id.lexeme, ERROR_TYPE)
+        elif var_decl.var_type != token.NIL:  # if the type is declared
 
             # if the current type is nil and an object or struct is being declared
-            if self.current_type == token.NIL and var_decl.var_type.tokentype not in type_rel:
+            if self.current_type == token.NIL and var_decl.var_type.tokentype not in token.PRIMITIVE_TYPES:
                 self.sym_table.set_info(var_decl.var_id.lexeme, var_decl.var_type.lexeme)
 
             # standard case of the current type equals the declaration type
@@ -91,18 +184,34 @@ class TypeChecker(ast.Visitor):
             else:
                 msg = 'mismatch type in assignment'
                 self.__error(msg, var_decl.var_id)
+                self.sym_table.set_info(var_decl.var_id.lexeme,
+                                        self.__declared_type(var_decl.var_type))
         else:
             # using implicit declarations with nil
             if self.current_type == token.NIL:
                 msg = 'variable with undefined type'
-                self.__error(msg, var_decl.var_id)
+                self.__fail(msg, var_decl.var_id)
             self.sym_table.set_info(var_decl.var_id.lexeme, self.current_type)
 
+    def visit_error_stmt(self, error_stmt):
+        # a declaration that did not parse still declares its name, so
+        # that its uses are not reported as undefined
+        if error_stmt.declared_id is None:
+            return
+        name = error_stmt.declared_id.lexeme
+        self.sym_table.add_id(name)
+        self.sym_table.set_info(name, ERROR_TYPE)
+        if error_stmt.first_token.tokentype == token.STRUCTTYPE:
+            self.structs[name] = ERROR_TYPE
+            self.path_types.clear()
+
     def visit_assign_stmt(self, assign_stmt):
-        assign_stmt.rhs.accept(self)
+        self.visit(assign_stmt.rhs)
         rhs_type = self.current_type
-        assign_stmt.lhs.accept(self)
+        self.visit(assign_stmt.lhs)
         lhs_type = self.current_type
+        if rhs_type is ERROR_TYPE or lhs_type is ERROR_TYPE:
+            return
         if rhs_type != token.NIL and rhs_type != lhs_type and lhs_type:
             msg = 'mismatch type in assignment'
             self.__error(msg, assign_stmt.lhs.path[0])
@@ -111,15 +220,20 @@ class TypeChecker(ast.Visitor):
         self.sym_table.add_id(struct_decl.struct_id.lexeme)
         self.sym_table.push_environment()
         item_list = {} # list of struct variables
+        layout = {} # field -> (type, offset)
         for items in struct_decl.var_decls:
-            items.accept(self)
+            self.visit(items)
             if items.var_id.lexeme not in item_list: # checks for repeat declarations
                 item_list[items.var_id.lexeme] = self.sym_table.get_info(items.var_id.lexeme)
+                layout[items.var_id.lexeme] = (item_list[items.var_id.lexeme], len(layout))
             else:
                 msg = 'repeat declaration'
                 self.__error(msg, struct_decl.struct_id)
         self.sym_table.pop_environment()
         self.sym_table.set_info(struct_decl.struct_id.lexeme, item_list)
+        self.structs[struct_decl.struct_id.lexeme] = layout
+        # a redeclared struct can change the type of any path
+        self.path_types.clear()
 
     def visit_fun_decl_stmt(self, fun_decl):
         self.sym_table.add_id(fun_decl.fun_name.lexeme)
@@ -134,7 +248,7 @@ class TypeChecker(ast.Visitor):
         index = 0
         for item in fun_decl.params:
 
-            item.accept(self)
+            self.visit(item)
             item_list.append(self.current_type)
             # checks for repeat declarations
             if fun_decl.params[index].param_name.lexeme not in name_list:
@@ -147,121 +261,132 @@ class TypeChecker(ast.Visitor):
         info_list.append(item_list)
         info_list.append(fun_decl.return_type.tokentype)
         self.sym_table.set_info(fun_decl.fun_name.lexeme, info_list)
-        fun_decl.stmt_list.accept(self)
+        self.visit(fun_decl.stmt_list)
         # checks for wrong return type
-        if self.current_type != fun_decl.return_type.tokentype:
+        if self.current_type != fun_decl.return_type.tokentype \
+                and self.current_type is not ERROR_TYPE:
             msg = 'wrong return type'
             self.__error(msg, fun_decl.return_type)
         self.sym_table.pop_environment()
 
     def visit_return_stmt(self, return_stmt):
-        return_stmt.return_expr.accept(self)
+        if return_stmt.return_expr is not None:
+            self.visit(return_stmt.return_expr)
+        else:
+            self.current_type = token.NIL
 
     def visit_while_stmt(self, while_stmt):
         self.sym_table.push_environment()
-        while_stmt.bool_expr.accept(self)
+        self.visit(while_stmt.bool_expr)
         for stmt in while_stmt.stmt_list.stmts:
-            stmt.accept(self)
+            self.visit(stmt)
         self.sym_table.pop_environment()
 
     def visit_if_stmt(self, if_stmt):
         # create a new environment for every if statement block
         self.sym_table.push_environment()
-        if_stmt.if_part.accept(self)
+        self.visit(if_stmt.if_part)
         self.sym_table.pop_environment()
         for item in if_stmt.elseifs:
             self.sym_table.push_environment()
-            item.accept(self)
+            self.visit(item)
             self.sym_table.pop_environment()
         if if_stmt.has_else:
             self.sym_table.push_environment()
             for stmt in if_stmt.else_stmts.stmts:
-                stmt.accept(self)
+                self.visit(stmt)
             self.sym_table.pop_environment()
 
     def visit_basic_if_stmt(self, basic_if_stmt):
-        basic_if_stmt.bool_expr.accept(self)
+        self.visit(basic_if_stmt.bool_expr)
         for stmt in basic_if_stmt.stmt_list.stmts:
-            stmt.accept(self)
+            self.visit(stmt)
 
     def visit_simple_expr(self, simple_expr):
-        simple_expr.term.accept(self)
+        term = simple_expr.term
+        self.dispatch[type(term)](self, term)
 
     def visit_complex_expr(self, complex_expr):
-        complex_expr.first_operand.accept(self)
-        lhs_type = self.current_type
-        complex_expr.rest.accept(self)
-        rhs_type = self.current_type
-        op_token = complex_expr.math_rel.tokentype
+        # a op b op c is nested to the right: the operands are visited
+        # left to right in a loop, then the operations are checked from
+        # the right, in the order a recursive visit would check them
+        dispatch = self.dispatch
+        operations = []
+        while type(complex_expr) is ast.ComplexExpr:
+            operand = complex_expr.first_operand
+            dispatch[type(operand)](self, operand)
+            operations.append((self.current_type, complex_expr.math_rel))
+            complex_expr = complex_expr.rest
+        dispatch[type(complex_expr)](self, complex_expr)
+        for lhs_type, math_rel in reversed(operations):
+            self.__check_operation(lhs_type, math_rel, self.current_type)
+
+    # checks one operation of a complex expression, its type is left
+    # in current_type
+    def __check_operation(self, lhs_type, math_rel, rhs_type):
+        op_token = math_rel.tokentype
+
+        if lhs_type is ERROR_TYPE or rhs_type is ERROR_TYPE:
+            self.current_type = ERROR_TYPE
+            return
 
         if lhs_type == token.BOOLTYPE or rhs_type == token.BOOLTYPE:
             msg = 'mismatch type in assignment'
-            self.__error(msg, complex_expr.math_rel)
+            return self.__fail(msg, math_rel)
 
         # prevents Nil values from being compared with each other
         if lhs_type == token.NIL and rhs_type == token.NIL:
             msg = 'mismatch type in assignment'
-            self.__error(msg, complex_expr.math_rel)
+            return self.__fail(msg, math_rel)
 
         # ensures that strings can only be used with plus
         if lhs_type == token.STRINGTYPE and op_token != token.PLUS:
             msg = 'invalid string operator'
-            self.__error(msg, complex_expr.math_rel)
+            return self.__fail(msg, math_rel)
 
         # ensures modulo is only used on ints
         if (lhs_type != token.INTTYPE or rhs_type != token.INTTYPE) and op_token == token.MODULO:
             msg = 'invalid use of modulo'
-            self.__error(msg, complex_expr.math_rel)
+            return self.__fail(msg, math_rel)
 
         if rhs_type != token.NIL and rhs_type != lhs_type:
             msg = 'mismatch type in assignment'
-            self.__error(msg, complex_expr.math_rel)
+            return self.__fail(msg, math_rel)
+        self.current_type = rhs_type
 
     def visit_bool_expr(self, bool_expr):
-        bool_expr.first_expr.accept(self)
-        lhs_type = self.current_type
-        if bool_expr.bool_rel is not None:
-            bool_expr.second_expr.accept(self)
-            rhs_type = self.current_type
-
-            bool_type = bool_expr.bool_rel.tokentype
-
-            # checks if rhs_type == lhs_type or NIL
-            if rhs_type != token.NIL and rhs_type != lhs_type:
-                msg = 'invalid comparison'
-                self.__error(msg, bool_expr.bool_rel)
-            else:
-                if rhs_type == token.NIL:
-                    if bool_type != token.NOT_EQUAL and bool_type != token.EQUAL:
-                        msg = 'invalid comparison'
-                        self.__error(msg, bool_expr.bool_rel)
-        if bool_expr.bool_connector is not None:
-            bool_expr.rest.accept(self)
+        # and / or chains are nested to the right and followed in a loop
+        while bool_expr is not None:
+            self.visit(bool_expr.first_expr)
+            lhs_type = self.current_type
+            if bool_expr.bool_rel is not None:
+                self.visit(bool_expr.second_expr)
+                rhs_type = self.current_type
+
+                bool_type = bool_expr.bool_rel.tokentype
+
+                # checks if rhs_type == lhs_type or NIL
+                if lhs_type is ERROR_TYPE or rhs_type is ERROR_TYPE:
+                    pass
+                elif rhs_type != token.NIL and rhs_type != lhs_type:
+                    msg = 'invalid comparison'
+                    self.__error(msg, bool_expr.bool_rel)
+                else:
+                    if rhs_type == token.NIL:
+                        if bool_type != token.NOT_EQUAL and bool_type != token.EQUAL:
+                            msg = 'invalid comparison'
+                            self.__error(msg, bool_expr.bool_rel)
+            if bool_expr.bool_connector is None:
+                return
+            bool_expr = bool_expr.rest
 
     def visit_lvalue(self, lval):
         # check the first id in the path
         var_token = lval.path[0]
-        length = len(lval.path)
         if not self.sym_table.id_exists(var_token.lexeme):
             msg = 'undefined variable "%s"' % var_token.lexeme
-            self.__error(msg, var_token)
-        self.current_type = self.sym_table.get_info(var_token.lexeme)
-        # check if struct for a longer path expression
-        if length > 1:
-            index = 1
-            while index < length:
-                struct_name = self.sym_table.get_info(lval.path[index - 1].lexeme)
-                counter = index - 1
-                # I just check for the parent struct has a type that should exist
-                while struct_name is None:
-                    struct_name = self.sym_table.get_info(lval.path[counter].lexeme)
-                    counter -= 1
-                struct_dict = self.sym_table.get_info(struct_name)
-                if lval.path[index].lexeme not in struct_dict: # checks for undefined variables
-                    msg = 'undefined variable "%s"' % lval.path[index].lexeme
-                    self.__error(msg, lval.path[index])
-                self.current_type = struct_dict.get(lval.path[index].lexeme)
-                index += 1
+            return self.__fail(msg, var_token)
+        self.current_type = self.__path_type(lval.path)
 
     def visit_fun_param(self, fun_param):
         self.current_type = fun_param.param_type.tokentype
@@ -269,16 +394,8 @@ class TypeChecker(ast.Visitor):
         self.sym_table.set_info(fun_param.param_name.lexeme, fun_param.param_type.tokentype)
 
     def visit_simple_rvalue(self, simple_rvalue):
-        if simple_rvalue.val.tokentype == token.INTVAL:
-            self.current_type = token.INTTYPE
-        elif simple_rvalue.val.tokentype == token.FLOATVAL:
-            self.current_type = token.FLOATTYPE
-        elif simple_rvalue.val.tokentype == token.BOOLVAL:
-            self.current_type = token.BOOLTYPE
-        elif simple_rvalue.val.tokentype == token.STRINGVAL:
-            self.current_type = token.STRINGTYPE
-        elif simple_rvalue.val.tokentype == token.NIL:
-            self.current_type = token.NIL
+        self.current_type = token.VALUE_TYPES.get(simple_rvalue.val.tokentype,
+                                                  self.current_type)
 
     def visit_new_rvalue(self, new_rvalue):
         self.current_type = new_rvalue.struct_type.lexeme
@@ -286,9 +403,15 @@ class TypeChecker(ast.Visitor):
     def visit_call_rvalue(self, call_rvalue):
 
         param_types = self.sym_table.get_info(call_rvalue.fun.lexeme)
-        if param_types is None:
-            msg = 'invalid function call'
-            self.__error(msg, call_rvalue.fun)
+        if not isinstance(param_types, list):
+            if param_types is not ERROR_TYPE:
+                msg = 'invalid function call'
+                self.__error(msg, call_rvalue.fun)
+            # the arguments are still checked
+            for params in call_rvalue.args:
+                self.visit(params)
+            self.current_type = ERROR_TYPE
+            return
 
         param_list = param_types[0]
         param_index = 0
@@ -297,44 +420,25 @@ class TypeChecker(ast.Visitor):
         if len(call_rvalue.args) != len(param_list):
             msg = 'invalid number of parameters'
             self.__error(msg, call_rvalue.fun)
+            for params in call_rvalue.args:
+                self.visit(params)
+            self.current_type = param_types[1]
+            return
 
         for params in call_rvalue.args:
-            params.accept(self)
+            self.visit(params)
             # checks if parameters match
-            if not param_list[param_index] == self.current_type:
+            if self.current_type is ERROR_TYPE:
+                pass
+            elif not param_list[param_index] == self.current_type:
                 msg = 'invalid parameter'
                 self.__error(msg, call_rvalue.fun)
             param_index += 1
         self.current_type = param_types[1]
 
     def visit_id_rvalue(self, id_rvalue):
-        length = len(id_rvalue.path)
         # checks if the value exists
         if not self.sym_table.id_exists(id_rvalue.path[0].lexeme):
             msg = 'undefined variable "%s"' % id_rvalue.path[0].lexeme
-            self.__error(msg, id_rvalue.path[0])
-
-        if length > 1:
-            index = 1
-            while index < length:
-                struct_name = self.sym_table.get_info(id_rvalue.path[index - 1].lexeme)
-                counter = index - 1
-                # I just check for the parent struct has a type that should exist
-                while struct_name is None:
-                    struct_name = self.sym_table.get_info(id_rvalue.path[counter].lexeme)
-                    counter -= 1
-                struct_dict = self.sym_table.get_info(struct_name)
-
-                # checks if current_type is a member of the struct
-                if id_rvalue.path[index].lexeme not in struct_dict:
-                    msg = 'undefined variable "%s"' % id_rvalue.path[index].lexeme
-                    self.__error(msg, id_rvalue.path[index])
-                self.current_type = struct_dict.get(id_rvalue.path[index].lexeme)
-                index += 1
-        else:
-            # implicit declarations
-            self.current_type = self.sym_table.get_info(id_rvalue.path[0].lexeme)
-
-
-
-
+            return self.__fail(msg, id_rvalue.path[0])
+        self.current_type = self.__path_type(id_rvalue.path)
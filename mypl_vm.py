@@ -0,0 +1,435 @@
+#!/usr/bin/python3
+#
+# Description: A bytecode compiler and stack based virtual
+# machine for type checked MyPL programs. The compiler lowers
+# the AST into array('i') instruction buffers (an opcode and one
+# operand per instruction) with a constant pool per function,
+# and the VM runs them in a single dispatch loop.
+# ----------------------------------------------------------------------
+
+import array
+import sys
+
+import mypl_token as token
+import mypl_ast as ast
+import mypl_error as error
+import mypl_interpreter as interpreter
+import mypl_resolver as resolver
+
+
+# opcodes (the operand is ignored where it is not mentioned)
+LOAD_LOCAL = 0          # push frame[operand]
+CONST = 1               # push constants[operand]
+LOAD_GLOBAL = 2         # push globals[operand]
+STORE_LOCAL = 3         # frame[operand] = pop
+STORE_GLOBAL = 4        # globals[operand] = pop
+JUMP_IF_FALSE = 5       # jump to operand if pop is false
+JUMP = 6                # jump to operand
+ADD = 7
+SUBTRACT = 8
+MULTIPLY = 9
+DIVIDE = 10
+MODULO = 11
+EQUAL = 12
+NOT_EQUAL = 13
+LESS_THAN = 14
+LESS_THAN_EQUAL = 15
+GREATER_THAN = 16
+GREATER_THAN_EQUAL = 17
+JUMP_IF_FALSE_OR_POP = 18   # jump to operand if top is false, else pop
+JUMP_IF_TRUE_OR_POP = 19    # jump to operand if top is true, else pop
+NOT = 20
+GET_FIELD = 21          # replace the struct on top with its field at offset operand
+SET_FIELD = 22          # pop struct, pop value, set the field at offset operand
+CALL = 23               # call functions[operand]
+CALL_BUILTIN = 24       # call the builtin (token, argument count) in constants[operand]
+RETURN = 25             # return pop to the caller
+NEW = 26                # create an instance of structs[operand]
+BUILD_STRUCT = 27       # pop the field values of structs[operand] into a struct
+POP = 28
+DUP = 29
+HALT = 30
+
+MATH_OPS = {
+    token.PLUS: ADD,
+    token.MINUS: SUBTRACT,
+    token.MULTIPLY: MULTIPLY,
+    token.DIVIDE: DIVIDE,
+    token.MODULO: MODULO,
+}
+
+COMPARE_OPS = {
+    token.EQUAL: EQUAL,
+    token.NOT_EQUAL: NOT_EQUAL,
+    token.LESS_THAN: LESS_THAN,
+    token.LESS_THAN_EQUAL: LESS_THAN_EQUAL,
+    token.GREATER_THAN: GREATER_THAN,
+    token.GREATER_THAN_EQUAL: GREATER_THAN_EQUAL,
+}
+
+
+class CodeObject(object):
+    """The bytecode of one function (or of the top level program, or
+    of a struct's field initializers)"""
+    def __init__(self, name, param_count=0):
+        self.name = name
+        self.code = array.array('i')    # opcode, operand, opcode, ...
+        self.constants = []             # constant pool
+        self.positions = []             # token of each instruction (for errors)
+        self.frame_size = 0             # slots in a call frame
+        self.param_count = param_count
+        self.__constant_index = {}
+        self.__instructions = None
+
+    def here(self):
+        """Index of the next instruction (the target of a jump)"""
+        return len(self.code) // 2
+
+    def emit(self, op, operand=0, position=None):
+        """Appends an instruction and returns its index"""
+        index = self.here()
+        self.code.append(op)
+        self.code.append(operand)
+        self.positions.append(position)
+        return index
+
+    def patch(self, index, target):
+        """Sets the operand of the (jump) instruction at index"""
+        self.code[2 * index + 1] = target
+
+    def instructions(self):
+        """The code decoded into a list of (opcode, operand) pairs, which
+        the dispatch loop indexes faster than the packed array"""
+        if self.__instructions is None:
+            code = self.code
+            self.__instructions = list(zip(code[0::2], code[1::2]))
+        return self.__instructions
+
+    def constant(self, value):
+        """Returns the index of value in the constant pool"""
+        key = (type(value), value)
+        if key not in self.__constant_index:
+            self.__constant_index[key] = len(self.constants)
+            self.constants.append(value)
+        return self.__constant_index[key]
+
+
+class Program(object):
+    """A compiled program"""
+    def __init__(self):
+        self.main = CodeObject('main')
+        self.functions = []     # CodeObjects, indexed by CALL
+        self.structs = []       # (name, field count, CodeObject), indexed by NEW
+
+
+class Compiler(ast.Visitor):
+    """Lowers a type checked AST into a Program"""
+    def __init__(self):
+        self.program = Program()
+        self.code = self.program.main
+        self.in_function = False
+        self.struct_index = {}      # struct name -> index in program.structs
+
+    def compile(self, stmt_list):
+        the_resolver = resolver.Resolver()
+        stmt_list.accept(the_resolver)
+        stmt_list.accept(self)
+        self.code.emit(HALT)
+        self.code.frame_size = the_resolver.global_size()
+        return self.program
+
+    def __load(self, node):
+        if node.depth == 0 and self.in_function:
+            self.code.emit(LOAD_LOCAL, node.slot)
+        else:
+            self.code.emit(LOAD_GLOBAL, node.slot)
+
+    def __store(self, slot):
+        if self.in_function:
+            self.code.emit(STORE_LOCAL, slot)
+        else:
+            self.code.emit(STORE_GLOBAL, slot)
+
+    def visit_stmt_list(self, stmt_list):
+        for stmt in stmt_list.stmts:
+            stmt.accept(self)
+            # expressions used as statements leave their value behind
+            if isinstance(stmt, ast.Expr):
+                self.code.emit(POP)
+
+    def visit_expr_stmt(self, expr_stmt):
+        expr_stmt.expr.accept(self)
+        self.code.emit(POP)
+
+    def visit_var_decl_stmt(self, var_decl):
+        var_decl.var_expr.accept(self)
+        self.__store(var_decl.slot)
+
+    def visit_assign_stmt(self, assign_stmt):
+        assign_stmt.rhs.accept(self)
+        lval = assign_stmt.lhs
+        if len(lval.path) == 1:
+            if lval.depth == 0 and self.in_function:
+                self.code.emit(STORE_LOCAL, lval.slot)
+            else:
+                self.code.emit(STORE_GLOBAL, lval.slot)
+            return
+        self.__load(lval)
+        for index in range(1, len(lval.path) - 1):
+            self.code.emit(GET_FIELD, lval.offsets[index - 1], lval.path[index - 1])
+        self.code.emit(SET_FIELD, lval.offsets[-1], lval.path[-2])
+
+    def visit_struct_decl_stmt(self, struct_decl):
+        # the field initializers run in the global frame when the
+        # struct is created, and leave the field values on the stack
+        name = struct_decl.struct_id.lexeme
+        init_code = CodeObject(name)
+        index = len(self.program.structs)
+        self.struct_index[name] = index
+        self.program.structs.append((name, len(struct_decl.var_decls), init_code))
+
+        code, in_function = self.code, self.in_function
+        self.code, self.in_function = init_code, False
+        for var_decl in struct_decl.var_decls:
+            var_decl.var_expr.accept(self)
+            self.code.emit(DUP)
+            self.code.emit(STORE_GLOBAL, var_decl.slot)
+        self.code.emit(BUILD_STRUCT, index)
+        self.code.emit(RETURN)
+        self.code, self.in_function = code, in_function
+
+    def visit_fun_decl_stmt(self, fun_decl):
+        name = fun_decl.fun_name.lexeme
+        fun_code = CodeObject(name, len(fun_decl.params))
+        fun_code.frame_size = fun_decl.frame_size
+        # functions are compiled in the order the resolver numbered
+        # them, so CallRValue.slot indexes program.functions
+        self.program.functions.append(fun_code)
+
+        code, in_function = self.code, self.in_function
+        self.code, self.in_function = fun_code, True
+        fun_decl.stmt_list.accept(self)
+        self.code.emit(CONST, self.code.constant(None))
+        self.code.emit(RETURN)
+        self.code, self.in_function = code, in_function
+
+    def visit_return_stmt(self, return_stmt):
+        if return_stmt.return_expr is not None:
+            return_stmt.return_expr.accept(self)
+        else:
+            self.code.emit(CONST, self.code.constant(None))
+        self.code.emit(RETURN)
+
+    def visit_while_stmt(self, while_stmt):
+        start = self.code.here()
+        while_stmt.bool_expr.accept(self)
+        exit_jump = self.code.emit(JUMP_IF_FALSE)
+        while_stmt.stmt_list.accept(self)
+        self.code.emit(JUMP, start)
+        self.code.patch(exit_jump, self.code.here())
+
+    def visit_if_stmt(self, if_stmt):
+        end_jumps = []
+        for basic_if in [if_stmt.if_part] + if_stmt.elseifs:
+            basic_if.bool_expr.accept(self)
+            next_jump = self.code.emit(JUMP_IF_FALSE)
+            basic_if.stmt_list.accept(self)
+            end_jumps.append(self.code.emit(JUMP))
+            self.code.patch(next_jump, self.code.here())
+        if if_stmt.has_else:
+            if_stmt.else_stmts.accept(self)
+        for end_jump in end_jumps:
+            self.code.patch(end_jump, self.code.here())
+
+    def visit_basic_if_stmt(self, basic_if_stmt):
+        basic_if_stmt.bool_expr.accept(self)
+        end_jump = self.code.emit(JUMP_IF_FALSE)
+        basic_if_stmt.stmt_list.accept(self)
+        self.code.patch(end_jump, self.code.here())
+
+    def visit_simple_expr(self, simple_expr):
+        simple_expr.term.accept(self)
+
+    def visit_complex_expr(self, complex_expr):
+        complex_expr.first_operand.accept(self)
+        complex_expr.rest.accept(self)
+        op = MATH_OPS[complex_expr.math_rel.tokentype]
+        self.code.emit(op, 0, complex_expr.math_rel)
+
+    def visit_bool_expr(self, bool_expr):
+        bool_expr.first_expr.accept(self)
+        if bool_expr.bool_rel is not None:
+            bool_expr.second_expr.accept(self)
+            op = COMPARE_OPS[bool_expr.bool_rel.tokentype]
+            self.code.emit(op, 0, bool_expr.bool_rel)
+        if bool_expr.bool_connector is not None:
+            if bool_expr.bool_connector.tokentype == token.AND:
+                skip_jump = self.code.emit(JUMP_IF_FALSE_OR_POP)
+            else:
+                skip_jump = self.code.emit(JUMP_IF_TRUE_OR_POP)
+            bool_expr.rest.accept(self)
+            self.code.patch(skip_jump, self.code.here())
+        if bool_expr.negated:
+            self.code.emit(NOT)
+
+    def visit_simple_rvalue(self, simple_rvalue):
+        self.code.emit(CONST, self.code.constant(simple_rvalue.value))
+
+    def visit_new_rvalue(self, new_rvalue):
+        self.code.emit(NEW, self.struct_index[new_rvalue.struct_type.lexeme])
+
+    def visit_call_rvalue(self, call_rvalue):
+        for arg in call_rvalue.args:
+            arg.accept(self)
+        if call_rvalue.slot is not None:
+            self.code.emit(CALL, call_rvalue.slot, call_rvalue.fun)
+        else:
+            builtin = (call_rvalue.fun, len(call_rvalue.args))
+            self.code.emit(CALL_BUILTIN, self.code.constant(builtin), call_rvalue.fun)
+
+    def visit_id_rvalue(self, id_rvalue):
+        self.__load(id_rvalue)
+        for index in range(1, len(id_rvalue.path)):
+            self.code.emit(GET_FIELD, id_rvalue.offsets[index - 1], id_rvalue.path[index - 1])
+
+
+class VM(object):
+    """Runs a compiled Program"""
+    def __init__(self, program, output_stream=sys.stdout, input_stream=sys.stdin):
+        self.program = program
+        self.builtins = interpreter.Builtins(output_stream, input_stream)
+
+    def __error(self, error_msg, code_object, pc):
+        target_token = code_object.positions[pc - 1]
+        raise error.MyPLError(error_msg, target_token.line, target_token.column)
+
+    def run(self):
+        functions = self.program.functions
+        structs = self.program.structs
+        builtins = self.builtins
+        new_struct = interpreter.StructObject
+        global_frame = [None] * self.program.main.frame_size
+        code_object = self.program.main
+        code = code_object.instructions()
+        constants = code_object.constants
+        frame = global_frame
+        calls = []      # (code_object, pc, frame) of every active caller
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        pc = 0
+
+        while True:
+            op, arg = code[pc]
+            pc += 1
+            if op == LOAD_LOCAL:
+                push(frame[arg])
+            elif op == CONST:
+                push(constants[arg])
+            elif op == LOAD_GLOBAL:
+                push(global_frame[arg])
+            elif op == STORE_LOCAL:
+                frame[arg] = pop()
+            elif op == STORE_GLOBAL:
+                global_frame[arg] = pop()
+            elif op == JUMP_IF_FALSE:
+                if not pop():
+                    pc = arg
+            elif op == JUMP:
+                pc = arg
+            elif op <= MODULO:
+                rhs = pop()
+                lhs = stack[-1]
+                if lhs is None or rhs is None:
+                    self.__error('nil value in expression', code_object, pc)
+                if op == ADD:
+                    stack[-1] = lhs + rhs
+                elif op == SUBTRACT:
+                    stack[-1] = lhs - rhs
+                elif op == MULTIPLY:
+                    stack[-1] = lhs * rhs
+                elif rhs == 0:
+                    self.__error('division by zero', code_object, pc)
+                elif op == MODULO:
+                    stack[-1] = lhs % rhs
+                elif type(lhs) is int:
+                    stack[-1] = lhs // rhs
+                else:
+                    stack[-1] = lhs / rhs
+            elif op <= GREATER_THAN_EQUAL:
+                rhs = pop()
+                lhs = stack[-1]
+                if op == EQUAL:
+                    stack[-1] = lhs == rhs
+                elif op == NOT_EQUAL:
+                    stack[-1] = lhs != rhs
+                elif lhs is None or rhs is None:
+                    self.__error('nil value in comparison', code_object, pc)
+                elif op == LESS_THAN:
+                    stack[-1] = lhs < rhs
+                elif op == LESS_THAN_EQUAL:
+                    stack[-1] = lhs <= rhs
+                elif op == GREATER_THAN:
+                    stack[-1] = lhs > rhs
+                else:
+                    stack[-1] = lhs >= rhs
+            elif op == JUMP_IF_FALSE_OR_POP:
+                if stack[-1]:
+                    pop()
+                else:
+                    pc = arg
+            elif op == JUMP_IF_TRUE_OR_POP:
+                if stack[-1]:
+                    pc = arg
+                else:
+                    pop()
+            elif op == NOT:
+                stack[-1] = not stack[-1]
+            elif op == GET_FIELD:
+                if stack[-1] is None:
+                    self.__error('nil value in path', code_object, pc)
+                stack[-1] = stack[-1].fields[arg]
+            elif op == SET_FIELD:
+                struct_object = pop()
+                if struct_object is None:
+                    self.__error('nil value in path', code_object, pc)
+                struct_object.fields[arg] = pop()
+            elif op == CALL:
+                calls.append((code_object, pc, frame))
+                code_object = functions[arg]
+                count = code_object.param_count
+                frame = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                frame.extend([None] * (code_object.frame_size - count))
+                code = code_object.instructions()
+                constants = code_object.constants
+                pc = 0
+            elif op == CALL_BUILTIN:
+                fun_token, count = constants[arg]
+                args = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                push(builtins.call(fun_token, args))
+            elif op == RETURN:
+                if not calls:
+                    return
+                code_object, pc, frame = calls.pop()
+                code = code_object.instructions()
+                constants = code_object.constants
+            elif op == NEW:
+                calls.append((code_object, pc, frame))
+                code_object = structs[arg][2]
+                frame = global_frame
+                code = code_object.instructions()
+                constants = code_object.constants
+                pc = 0
+            elif op == BUILD_STRUCT:
+                name, count, init_code = structs[arg]
+                fields = stack[len(stack) - count:]
+                del stack[len(stack) - count:]
+                push(new_struct(name, fields))
+            elif op == POP:
+                pop()
+            elif op == DUP:
+                push(stack[-1])
+            elif op == HALT:
+                return
@@ -0,0 +1,115 @@
+#!/usr/bin/python3
+#
+# Description: Differential check of the error-recovering parser.
+# Over the given files (or the lexer_diff corpus, some generated
+# programs and random mutations of them) it checks that a parser in
+# recovery mode never fails, that its first diagnostic is the error
+# the normal parser raises, and that a source without errors gives
+# the same AST in both modes. The sources in CASES must report
+# exactly the errors listed with them (syntax errors, then the type
+# errors of what parsed, as hw5.py --all prints them).
+#     python3 recovery_diff.py [file ...]
+# ----------------------------------------------------------------------
+
+import io
+import random
+import sys
+
+import lexer_diff
+import mypl_ast_codec as ast_codec
+import mypl_error as error
+import mypl_lexer as lexer
+import mypl_parser as parser
+import mypl_type_checker as type_checker
+from benchmarks import generator
+
+
+# (source, the errors it reports)
+CASES = [
+    # a declaration that fails after its name still declares it
+    ('var x = 1 + ;\nvar y = x + 1;\n',
+     ['error: expecting an ID, found ";" in parser at line 1 column 13']),
+    ('fun int f(a int) return a; end\nvar z = f(1) + 1;\nprint(w);\n',
+     ['error: expecting \':\', found "int" in parser at line 1 column 13',
+      'error: undefined variable "w" at line 3 column 7']),
+    ('struct S var a = 1; 5 end\nvar s = new S;\nset s.a = 2;\n',
+     ['error: expecting end, found "5" in parser at line 1 column 21']),
+    # one that fails before its name does not
+    ('var = 1;\nvar y = x;\n',
+     ['error: expecting ID, found "=" in parser at line 1 column 5',
+      'error: undefined variable "x" at line 2 column 9']),
+    # a long and / or chain does not recurse once per connector
+    ('var x = 0;\nif ' + ' or '.join('not x == %i and x < 9' % i for i in range(2000))
+     + ' then\n  set x = 1;\nend\n', []),
+]
+
+
+def all_errors(source):
+    """The printed errors of source with a parser in recovery mode"""
+    the_parser = parser.Parser(lexer.Lexer(io.StringIO(source)), recover=True)
+    stmt_list = the_parser.parse()
+    errors = the_parser.diagnostics + type_checker.check_all(stmt_list)
+    errors.sort(key=lambda e: (e.line, e.column))
+    return [str(e) for e in errors]
+
+
+def compare(source):
+    """Returns None if the recovering parser agrees with the normal one
+    on source, otherwise a description"""
+    try:
+        expected = ast_codec.encode(parser.Parser(lexer.Lexer(io.StringIO(source))).parse())
+        expected_error = None
+    except error.MyPLError as e:
+        expected = None
+        expected_error = str(e)
+    try:
+        the_parser = parser.Parser(lexer.Lexer(io.StringIO(source)), recover=True)
+        stmt_list = the_parser.parse()
+        found = ast_codec.encode(stmt_list)
+        type_checker.check_all(stmt_list)
+    except Exception as e:
+        return 'recovery failed with %s: %s' % (type(e).__name__, e)
+    if expected_error is not None:
+        if not the_parser.diagnostics:
+            return 'no diagnostics, the parser raised %r' % expected_error
+        if str(the_parser.diagnostics[0]) != expected_error:
+            return 'first diagnostic %r, the parser raised %r' % (
+                str(the_parser.diagnostics[0]), expected_error)
+    elif the_parser.diagnostics:
+        return 'diagnostic %r for a source that parses' % str(the_parser.diagnostics[0])
+    elif found != expected:
+        return 'AST differs from the normal parse'
+    return None
+
+
+def main(filenames, mutations=2000, seed=0):
+    failures = 0
+    for index, (source, expected) in enumerate(CASES):
+        found = all_errors(source)
+        if found != expected:
+            failures += 1
+            print('case[%i]: reported %r, expected %r' % (index, found, expected))
+    sources = []
+    for filename in filenames:
+        with open(filename, 'r') as file_stream:
+            sources.append((filename, file_stream.read()))
+    if not filenames:
+        sources = [('corpus[%i]' % i, src) for i, src in enumerate(lexer_diff.CORPUS)]
+        sources += [('generated[%i]' % i, generator.generate(10, seed=i)) for i in range(5)]
+        rand = random.Random(seed)
+        originals = [source for _, source in sources] + [source for source, _ in CASES]
+        for i in range(mutations):
+            sources.append(('mutation[%i]' % i, lexer_diff.mutate(rand, rand.choice(originals))))
+    for name, source in sources:
+        message = compare(source)
+        if message is not None:
+            failures += 1
+            print('%s: %s' % (name, message))
+            print('    source: %r' % source)
+    print('%i of %i cases and sources differ' % (failures, len(CASES) + len(sources)))
+    return failures == 0
+
+
+if __name__ == '__main__':
+    if not main(sys.argv[1:]):
+        sys.exit(1)